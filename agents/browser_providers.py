@@ -0,0 +1,175 @@
+"""Browser backends for NovaAct.
+
+A provider hands out the keyword arguments NovaAct needs to reach a browser:
+
+- ``local``: headless Chromium launched inside this container, capped by a
+  slot count so parallel jobs cannot exhaust its CPU and memory.
+- ``agentcore``: remote AgentCore browser sessions, connected over CDP. A
+  small pool of sessions is started ahead of time so a job does not wait for
+  session start-up, and the signed WebSocket headers are regenerated before
+  they expire.
+
+Select one with BROWSER_BACKEND (default ``local``); BROWSER_POOL_SIZE sets the
+number of local slots or pre-created remote sessions. A job waits at most
+BROWSER_SLOT_TIMEOUT seconds (default 600) for a local slot.
+
+A provider that cannot hand out a browser raises BrowserUnavailable, so the
+job is reported as ``browser_unavailable`` rather than as a portal failure.
+"""
+
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from rich.console import Console
+
+from retry_policy import BrowserUnavailable, is_retryable
+
+console = Console()
+
+
+class LocalBrowserProvider:
+    name = "local"
+
+    def __init__(self, max_browsers=2, slot_timeout=600):
+        self._slots = threading.BoundedSemaphore(max_browsers)
+        self.slot_timeout = slot_timeout
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        timeout = self.slot_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise BrowserUnavailable(f"No local browser slot free after {timeout}s", retryable=True)
+        try:
+            yield {"headless": True}
+        finally:
+            self._slots.release()
+
+
+class AgentCoreBrowserPool:
+    """Pool of pre-created AgentCore browser sessions.
+
+    Sessions are never handed to a second job: after use a session is stopped
+    (it holds the previous client's cookies) and a replacement is started in
+    the background. Idle sessions are billed, so replacements are only started
+    while fewer than ``size`` are idle or starting.
+    """
+
+    name = "agentcore"
+
+    def __init__(self, region, size=2, header_ttl=240, session_timeout=3600, max_idle=1800):
+        """
+        Args:
+            region: AWS region of the AgentCore browser
+            size: Number of idle sessions kept ready
+            header_ttl: Seconds after which signed WebSocket headers are regenerated
+            session_timeout: AgentCore session timeout in seconds
+            max_idle: Idle sessions older than this are replaced rather than handed out
+        """
+        self.region = region
+        self.size = size
+        self.header_ttl = header_ttl
+        self.session_timeout = session_timeout
+        self.max_idle = min(max_idle, session_timeout - 60)
+        self._idle = queue.Queue()
+        self._starting = 0
+        self._lock = threading.Lock()
+        for _ in range(size):
+            self._replenish()
+
+    def _start_session(self):
+        from bedrock_agentcore.tools.browser_client import BrowserClient
+
+        client = BrowserClient(self.region)
+        client.start(session_timeout_seconds=self.session_timeout)
+        ws_url, headers = client.generate_ws_headers()
+        now = time.monotonic()
+        return {"client": client, "ws_url": ws_url, "headers": headers, "signed_at": now, "started_at": now}
+
+    def _replenish(self):
+        with self._lock:
+            if self._idle.qsize() + self._starting >= self.size:
+                return
+            self._starting += 1
+
+        def start():
+            try:
+                entry = self._start_session()
+                with self._lock:
+                    self._idle.put(entry)
+                    self._starting -= 1
+            except Exception as e:
+                with self._lock:
+                    self._starting -= 1
+                console.print(f"[yellow]Could not pre-create browser session: {repr(e)}[/yellow]")
+
+        threading.Thread(target=start, daemon=True).start()
+
+    def _take(self):
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return self._start_session()
+            if time.monotonic() - entry["started_at"] < self.max_idle:
+                return entry
+            # Too close to its session timeout to run a job; drop it and keep looking
+            self._stop(entry)
+            self._replenish()
+
+    def _stop(self, entry):
+        try:
+            entry["client"].stop()
+        except Exception as e:
+            console.print(f"[yellow]Could not stop browser session: {repr(e)}[/yellow]")
+
+    @contextmanager
+    def session(self):
+        """Take a session for one job; yields (BrowserClient, NovaAct keyword arguments).
+
+        The client is what a live viewer attaches to; most callers only need acquire().
+        """
+        try:
+            entry = self._take()
+        except Exception as e:
+            raise BrowserUnavailable(f"Could not start a browser session: {repr(e)}", retryable=is_retryable(e)) from e
+        self._replenish()
+        try:
+            if time.monotonic() - entry["signed_at"] > self.header_ttl:
+                entry["ws_url"], entry["headers"] = entry["client"].generate_ws_headers()
+                entry["signed_at"] = time.monotonic()
+        except Exception as e:
+            self._stop(entry)
+            raise BrowserUnavailable(f"Could not sign the browser session: {repr(e)}", retryable=is_retryable(e)) from e
+        try:
+            yield entry["client"], {
+                "cdp_endpoint_url": entry["ws_url"],
+                "cdp_headers": entry["headers"],
+                "preview": {"playwright_actuation": True},
+            }
+        finally:
+            self._stop(entry)
+
+    @contextmanager
+    def acquire(self):
+        with self.session() as (_, browser_options):
+            yield browser_options
+
+    def close(self):
+        while True:
+            try:
+                self._stop(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def get_browser_provider(backend=None, region=None, size=None):
+    backend = (backend or os.environ.get("BROWSER_BACKEND", "local")).lower()
+    size = int(os.environ.get("BROWSER_POOL_SIZE", "2")) if size is None else size
+    if backend == "local":
+        return LocalBrowserProvider(max_browsers=max(1, size), slot_timeout=int(os.environ.get("BROWSER_SLOT_TIMEOUT", "600")))
+    if backend == "agentcore":
+        return AgentCoreBrowserPool(region or os.environ.get("AWS_REGION", "us-east-1"), size=size)
+    raise ValueError(f"Unknown browser backend '{backend}', expected 'local' or 'agentcore'")
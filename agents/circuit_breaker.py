@@ -0,0 +1,156 @@
+"""Circuit breaker for client portals that keep failing.
+
+A portal that is down, or whose layout changed, makes every job for it run a
+full NovaAct session until it gives up. The breaker tracks outcomes per
+(domain, client):
+
+- ``closed``: jobs run normally; CIRCUIT_FAILURE_THRESHOLD consecutive
+  failures (default 3) open the circuit
+- ``open``: jobs are refused at once with status ``circuit_open`` until
+  CIRCUIT_COOLDOWN seconds (default 1800) have passed
+- ``half_open``: after the cooldown a single probe job is let through; its
+  success closes the circuit, its failure opens it for another cooldown, and
+  an outcome that says nothing about the portal (NEUTRAL_STATUSES: throttled,
+  S3 error, no browser available) releases the probe slot so the next job can
+  probe at once
+
+CIRCUIT_STORE selects where the state lives: ``local`` (default, this
+container only) or ``dynamodb`` (CIRCUIT_TABLE, partition key ``circuit``),
+which is needed for the breaker to remember failures across runtime sessions.
+"""
+
+import os
+import threading
+import time
+from decimal import Decimal
+
+from domain_limits import domain_of
+
+# A probe that never reports back (crashed container) stops blocking after this long
+PROBE_TIMEOUT = 1800
+# Job statuses caused by our own limits or infrastructure rather than by the portal
+NEUTRAL_STATUSES = {"throttled", "s3_error", "browser_unavailable"}
+
+
+class LocalCircuitStore:
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def update(self, key, change):
+        """Apply change(state) -> (state, result) atomically; returns result."""
+        with self._lock:
+            state, result = change(dict(self._states.get(key, {})))
+            if state is not None:
+                self._states[key] = state
+            return result
+
+
+class DynamoDBCircuitStore:
+    def __init__(self, table_name, region=None):
+        import boto3
+
+        self.table = boto3.resource("dynamodb", region_name=region).Table(table_name)
+        self._conflict = self.table.meta.client.exceptions.ConditionalCheckFailedException
+
+    def update(self, key, change):
+        while True:
+            item = self.table.get_item(Key={"circuit": key}, ConsistentRead=True).get("Item")
+            current = {name: (float(value) if isinstance(value, Decimal) else value)
+                       for name, value in (item or {}).items() if name not in ("circuit", "version")}
+            state, result = change(current)
+            if state is None:
+                return result
+            version = int(item["version"]) if item else 0
+            condition = {"ConditionExpression": "version = :v", "ExpressionAttributeValues": {":v": version}} if item \
+                else {"ConditionExpression": "attribute_not_exists(circuit)"}
+            stored = {name: (Decimal(str(round(value, 3))) if isinstance(value, float) else value)
+                      for name, value in state.items()}
+            try:
+                self.table.put_item(Item={"circuit": key, "version": version + 1, **stored}, **condition)
+                return result
+            except self._conflict:
+                continue
+
+
+class CircuitBreaker:
+    def __init__(self, store, failure_threshold=3, cooldown=1800):
+        """
+        Args:
+            store: LocalCircuitStore or DynamoDBCircuitStore
+            failure_threshold: Consecutive failures that open the circuit
+            cooldown: Seconds an open circuit refuses jobs before allowing a probe
+        """
+        self.store = store
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+    @staticmethod
+    def key(url, client_name):
+        return f"{domain_of(url)}|{client_name}"
+
+    def allow(self, key):
+        """Decide whether a job may run.
+
+        Returns:
+            (allowed, probe, retry_after): probe is True for the single job let
+            through a half-open circuit; retry_after is seconds until the next
+            probe when refused
+        """
+        def decide(state):
+            now = time.time()
+            status = state.get("status", "closed")
+            if status == "closed":
+                return None, (True, False, 0)
+            if status == "open" and now - state["opened_at"] < self.cooldown:
+                return None, (False, False, self.cooldown - (now - state["opened_at"]))
+            if status == "half_open" and state.get("probe_until", 0) > now:
+                return None, (False, False, state["probe_until"] - now)
+            # Cooldown over, or the previous probe never reported back: let one job through
+            return {**state, "status": "half_open", "probe_until": now + PROBE_TIMEOUT}, (True, True, 0)
+
+        return self.store.update(key, decide)
+
+    def record(self, key, success, probe=False):
+        """Record a job outcome; returns the circuit status afterwards."""
+        def apply(state):
+            now = time.time()
+            if success:
+                return {"status": "closed", "failures": 0, "last_success": now}, "closed"
+            failures = int(state.get("failures", 0)) + 1
+            status = state.get("status", "closed")
+            if probe or status == "half_open" or failures >= self.failure_threshold:
+                return {"status": "open", "failures": failures, "opened_at": now}, "open"
+            return {**state, "status": status, "failures": failures}, status
+
+        return self.store.update(key, apply)
+
+    def record_outcome(self, key, status, probe=False):
+        """Record a job by its result status; neutral statuses only free a probe slot.
+
+        Returns:
+            The circuit status afterwards
+        """
+        if status in NEUTRAL_STATUSES:
+            return self.release(key) if probe else None
+        return self.record(key, status == "success", probe=probe)
+
+    def release(self, key):
+        """Free the probe slot of a half-open circuit after a probe that ended with a neutral outcome."""
+        def apply(state):
+            if state.get("status") != "half_open":
+                return None, state.get("status", "closed")
+            return {**state, "probe_until": 0}, "half_open"
+
+        return self.store.update(key, apply)
+
+
+def get_circuit_breaker(store=None, region=None):
+    store = (store or os.environ.get("CIRCUIT_STORE", "local")).lower()
+    threshold = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "3"))
+    cooldown = int(os.environ.get("CIRCUIT_COOLDOWN", "1800"))
+    if store == "local":
+        return CircuitBreaker(LocalCircuitStore(), threshold, cooldown)
+    if store == "dynamodb":
+        return CircuitBreaker(DynamoDBCircuitStore(os.environ["CIRCUIT_TABLE"], region=region), threshold, cooldown)
+    raise ValueError(f"Unknown circuit store '{store}', expected 'local' or 'dynamodb'")
@@ -0,0 +1,215 @@
+"""Per-domain rate limits and concurrency caps for target portals.
+
+Many clients can share one portal. Starting all of their sessions at once
+triggers throttling, CAPTCHAs or lockouts, which cost far more than a short
+wait. Once it holds a browser and right before NovaAct opens the portal, a
+job takes a slot for the domain of its ``weburl``. A slot needs both a token from the domain's bucket
+(``rate_per_minute`` with bursts up to ``burst``) and a free place under
+``max_concurrent``.
+
+Limits are read from DOMAIN_LIMITS_FILE (default ``domain_limits.json`` next
+to this module)::
+
+    {
+      "default": {"rate_per_minute": 6, "burst": 2, "max_concurrent": 2},
+      "portal.example.com": {"rate_per_minute": 2, "burst": 1, "max_concurrent": 1}
+    }
+
+DOMAIN_LIMIT_STORE selects where the state lives:
+
+- ``local`` (default): in memory, shared by every job in this container
+- ``dynamodb``: one item per domain in DOMAIN_LIMIT_TABLE (partition key
+  ``domain``), shared across containers. Slots are leases that expire after
+  ``lease_seconds``, so a container that dies mid-job cannot hold a slot
+  forever.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+from urllib.parse import urlparse
+
+DEFAULT_LIMITS = {"rate_per_minute": 6, "burst": 2, "max_concurrent": 2, "lease_seconds": 1800}
+# How often a job waiting only for a concurrent slot re-checks
+POLL_INTERVAL = 5
+
+
+class DomainBusy(Exception):
+    def __init__(self, domain, waited):
+        super().__init__(f"No slot for {domain} after {waited:.0f}s")
+        self.domain = domain
+        self.waited = waited
+
+
+def domain_of(url):
+    host = (urlparse(url).hostname or url).lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _take(state, limits, lease_id, now):
+    """Try to take a slot from a domain's state.
+
+    Returns:
+        (new_state, wait): wait is 0 when the slot was taken, otherwise the
+        seconds to wait before trying again
+    """
+    leases = {key: expires for key, expires in state.get("leases", {}).items() if expires > now}
+    rate = limits.get("rate_per_minute")
+    burst = limits.get("burst", 1)
+    tokens = state.get("tokens", burst)
+    if rate:
+        tokens = min(burst, tokens + (now - state.get("refilled_at", now)) * rate / 60)
+    new_state = {"tokens": tokens, "refilled_at": now, "leases": leases}
+    if len(leases) >= limits["max_concurrent"]:
+        return new_state, POLL_INTERVAL
+    if rate and tokens < 1:
+        return new_state, (1 - tokens) * 60 / rate
+    leases[lease_id] = now + limits.get("lease_seconds", DEFAULT_LIMITS["lease_seconds"])
+    new_state["tokens"] = tokens - 1 if rate else tokens
+    return new_state, 0
+
+
+class LocalLimitStore:
+    def __init__(self):
+        self._states = {}
+        self._changed = threading.Condition()
+
+    def acquire(self, domain, limits, lease_id, timeout):
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                state, wait = _take(self._states.get(domain, {}), limits, lease_id, time.time())
+                if wait == 0:
+                    self._states[domain] = state
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DomainBusy(domain, timeout)
+                self._changed.wait(min(wait, remaining))
+
+    def release(self, domain, lease_id):
+        with self._changed:
+            self._states.get(domain, {}).get("leases", {}).pop(lease_id, None)
+            self._changed.notify_all()
+
+
+def _to_dynamo(state):
+    return {
+        "tokens": Decimal(str(round(state["tokens"], 6))),
+        "refilled_at": Decimal(str(round(state["refilled_at"], 3))),
+        "leases": {key: Decimal(str(round(expires, 3))) for key, expires in state["leases"].items()},
+    }
+
+
+def _from_dynamo(item):
+    if not item:
+        return {}
+    return {
+        "tokens": float(item["tokens"]),
+        "refilled_at": float(item["refilled_at"]),
+        "leases": {key: float(expires) for key, expires in item.get("leases", {}).items()},
+    }
+
+
+class DynamoDBLimitStore:
+    """Domain state in DynamoDB, updated with optimistic concurrency on a version attribute."""
+
+    def __init__(self, table_name, region=None):
+        import boto3
+
+        self.table = boto3.resource("dynamodb", region_name=region).Table(table_name)
+        self._conflict = self.table.meta.client.exceptions.ConditionalCheckFailedException
+
+    def _update(self, domain, change):
+        """Apply change(state) -> (state, result) until the conditional write wins; returns result."""
+        while True:
+            item = self.table.get_item(Key={"domain": domain}, ConsistentRead=True).get("Item")
+            state, result = change(_from_dynamo(item))
+            if state is None:
+                return result
+            version = int(item["version"]) if item else 0
+            condition = {"ConditionExpression": "version = :v", "ExpressionAttributeValues": {":v": version}} if item \
+                else {"ConditionExpression": "attribute_not_exists(#d)", "ExpressionAttributeNames": {"#d": "domain"}}
+            try:
+                self.table.put_item(Item={"domain": domain, "version": version + 1, **_to_dynamo(state)}, **condition)
+                return result
+            except self._conflict:
+                # Another container changed the domain first; re-read and try again
+                continue
+
+    def acquire(self, domain, limits, lease_id, timeout):
+        deadline = time.monotonic() + timeout
+
+        def take(state):
+            new_state, wait = _take(state, limits, lease_id, time.time())
+            return (new_state if wait == 0 else None), wait
+
+        while True:
+            wait = self._update(domain, take)
+            if wait == 0:
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DomainBusy(domain, timeout)
+            # Jitter spreads out containers that are waiting on the same domain
+            time.sleep(min(wait * random.uniform(1, 1.5), remaining))
+
+    def release(self, domain, lease_id):
+        def drop(state):
+            if lease_id not in state.get("leases", {}):
+                return None, None
+            state["leases"].pop(lease_id)
+            return state, None
+
+        self._update(domain, drop)
+
+
+class DomainLimiter:
+    def __init__(self, store, limits):
+        """
+        Args:
+            store: LocalLimitStore or DynamoDBLimitStore
+            limits: Dict of domain -> limits, with an optional "default" entry
+        """
+        self.store = store
+        self.limits = limits
+
+    def limits_for(self, domain):
+        return {**DEFAULT_LIMITS, **self.limits.get("default", {}), **self.limits.get(domain, {})}
+
+    @contextmanager
+    def slot(self, url, timeout=600):
+        """Hold a slot for the url's domain for the duration of the block.
+
+        Raises:
+            DomainBusy if no slot frees up within timeout seconds
+        """
+        domain = domain_of(url)
+        lease_id = uuid.uuid4().hex
+        self.store.acquire(domain, self.limits_for(domain), lease_id, timeout)
+        try:
+            yield domain
+        finally:
+            self.store.release(domain, lease_id)
+
+
+def get_domain_limiter(store=None, region=None):
+    path = os.environ.get(
+        "DOMAIN_LIMITS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "domain_limits.json")
+    )
+    try:
+        with open(path) as f:
+            limits = json.load(f)
+    except FileNotFoundError:
+        limits = {}
+    store = (store or os.environ.get("DOMAIN_LIMIT_STORE", "local")).lower()
+    if store == "local":
+        return DomainLimiter(LocalLimitStore(), limits)
+    if store == "dynamodb":
+        return DomainLimiter(DynamoDBLimitStore(os.environ["DOMAIN_LIMIT_TABLE"], region=region), limits)
+    raise ValueError(f"Unknown domain limit store '{store}', expected 'local' or 'dynamodb'")
@@ -1,17 +1,32 @@
 import os
 import sys
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from strands import Agent, tool
 from strands.models import BedrockModel
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
 import tempfile
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from rich.console import Console
 import time
 import glob
 import shutil
 import ast
 import json
+import hashlib
+import uuid
+from contextlib import contextmanager
+from prompt_templates import get_template, job_variables
+from step_runner import StepFailed, run_steps
+from browser_providers import get_browser_provider
+from request_filters import install_request_filter
+from trace_buffer import TraceBuffer
+from domain_limits import DomainBusy, get_domain_limiter
+from circuit_breaker import get_circuit_breaker
+from retry_policy import BrowserUnavailable, RetryBudget, classify_failure, is_retryable, retry_call
+from result_manifest import latest_document, read_manifest, record_download, result_key
+from http_download import DownloadCapture, DownloadNotReplayable, resume_partial_file, session_from_page, stream_to_s3
 
 app = BedrockAgentCoreApp()
 
@@ -27,36 +42,223 @@ response = ssm.get_parameter(
 nova_act_api_key = response['Parameter']['Value']
 print(f"✅ Nova Act API Key retrieved")
 
+# Local headless Chromium or pooled AgentCore remote sessions, see browser_providers.py
+browser_provider = get_browser_provider(region=REGION)
+print(f"✅ Browser backend: {browser_provider.name}")
+
+# Per-portal rate limits and concurrency caps, see domain_limits.py
+domain_limiter = get_domain_limiter(region=REGION)
+DOMAIN_SLOT_TIMEOUT = int(os.environ.get('DOMAIN_SLOT_TIMEOUT', '600'))
+
+# Stops running sessions against portals that keep failing for a client, see circuit_breaker.py
+circuit_breaker = get_circuit_breaker(region=REGION)
+
+# Attempts per step when a task is given as a step list
+STEP_MAX_ATTEMPTS = int(os.environ.get('STEP_MAX_ATTEMPTS', '3'))
+
+# "browser" saves downloads through Chromium; "http" re-fetches them with the session cookies, see http_download.py
+DOWNLOAD_MODE = os.environ.get('DOWNLOAD_MODE', 'browser')
+BUCKET_NAME = "bedrock-web-automation-dev-storage"
+
+# One S3 client per container; throttles and 5xx are retried by botocore first, then by retry_call
+# SigV4 presigning is local to this client; credentials are resolved once and cached
+boto_session = boto3.Session(region_name=REGION)
+s3 = boto_session.client('s3', config=Config(signature_version='s3v4', retries={'max_attempts': 5, 'mode': 'standard'}))
+# Seconds of backoff a job may spend retrying upload and presign after the browser work is done
+RETRY_BUDGET_SECONDS = int(os.environ.get('RETRY_BUDGET_SECONDS', '60'))
+# SigV4 URLs cannot be valid for more than 7 days, nor outlive the credentials that signed them
+MAX_PRESIGN_EXPIRES_IN = 7 * 24 * 3600
+# Cap for temporary credentials whose expiry is not exposed
+UNKNOWN_EXPIRY_MAX_EXPIRES_IN = 3600
+
+def _filter_report(request_filter, console):
+    """Log request filter stats; include the full capture in the result only in capture mode."""
+    if request_filter is None:
+        return {}
+    summary = request_filter.summary()
+    console.print(f"[cyan]Request filter: {summary['blocked']} blocked, {summary['allowed']} allowed[/cyan]")
+    return {"request_filter": summary} if request_filter.capture else {}
+
+def _record_result(client_name, job_id, s3_file_key, file_name, file_size, sha256, etag, source_url, console, retry_budget):
+    """Add the upload to the client's manifest; a manifest failure does not fail the job."""
+    entry = {
+        "client_name": client_name,
+        "key": s3_file_key,
+        "file_name": file_name,
+        "size": file_size,
+        "sha256": sha256,
+        "etag": etag,
+        "source_url": source_url.split("?", 1)[0],
+        "job_id": job_id,
+        "downloaded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    try:
+        retry_call(record_download, s3, BUCKET_NAME, entry, description="Manifest update", budget=retry_budget, console=console)
+    except Exception as e:
+        console.print(f"[yellow]Could not update manifest for {client_name}: {repr(e)}[/yellow]")
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _http_download(page, download_capture, client_name, console, retry_budget, job_id):
+    """Stream a captured download to S3 over HTTP; returns None to fall back to the browser."""
+    file_name = download_capture.suggested_filename
+    if callable(file_name):
+        file_name = file_name()
+    file_name = os.path.basename(file_name or "downloaded_file")
+    s3_file_key = result_key(client_name, job_id, file_name)
+    try:
+        console.print(f"[cyan]Streaming {download_capture.url} to S3 over HTTP...[/cyan]")
+        streamed = stream_to_s3(session_from_page(page), download_capture.url, s3, BUCKET_NAME, s3_file_key,
+                                console=console, job_id=job_id)
+    except DownloadNotReplayable as e:
+        console.print(f"[yellow]HTTP download not possible ({e}), falling back to the browser[/yellow]")
+        return None
+    except Exception as e:
+        console.print(f"[yellow]HTTP download failed ({repr(e)}), falling back to the browser[/yellow]")
+        return None
+    if streamed["size"] == 0:
+        console.print("[yellow]HTTP download was empty, falling back to the browser[/yellow]")
+        return None
+    # A retry that resumed an earlier attempt finishes that attempt's key, which may carry an earlier date
+    s3_file_key = streamed["key"]
+    presigned_url = retry_call(
+        s3.generate_presigned_url,
+        'get_object',
+        Params={'Bucket': BUCKET_NAME, 'Key': s3_file_key},
+        ExpiresIn=3600,
+        description="Presign", budget=retry_budget, console=console
+    )
+    console.print(f"✅ Streamed to S3: {s3_file_key} ({streamed['size']} bytes, {streamed['resumes']} resume(s))")
+    _record_result(client_name, job_id, s3_file_key, file_name, streamed["size"], streamed["sha256"],
+                   streamed["etag"], download_capture.url, console, retry_budget)
+    return {
+        "status": "success",
+        "s3_key": s3_file_key,
+        "s3_url": presigned_url,
+        "file_name": file_name,
+        "file_size": streamed["size"],
+        "method": "http_stream",
+        "job_id": job_id
+    }
+
+def _finish_partial_download(page, download_capture, file_path, console):
+    """Complete a .crdownload/.part file with HTTP Range requests; returns the final path or None."""
+    if not download_capture.captured:
+        console.print("[yellow]Download URL unknown, cannot resume[/yellow]")
+        return None
+    try:
+        size = resume_partial_file(session_from_page(page), download_capture.url, file_path, console=console)
+    except Exception as e:
+        console.print(f"[yellow]Resume failed: {repr(e)}[/yellow]")
+        return None
+    file_name = download_capture.suggested_filename
+    if callable(file_name):
+        file_name = file_name()
+    final_path = os.path.join(os.path.dirname(file_path), os.path.basename(file_name or os.path.splitext(file_path)[0]))
+    os.replace(file_path, final_path)
+    console.print(f"[green]✅ Resumed partial download to {size} bytes: {final_path}[/green]")
+    return final_path
+
 # tool to perform web automation and download files using Nova Act
 @tool
-def nova_act_download(instruction: str, starting_url: str, client_name: str):
+def nova_act_download(instruction: str, starting_url: str, client_name: str, steps: list[str] | None = None, download_mode: str | None = None, trace: bool = False, job_id: str | None = None):
     """Download files from websites using Nova Act automation
     
     Args:
         instruction: The task to perform (including login and actions)
         starting_url: The website URL to start automation
         client_name: Client identifier for S3 organization
+        steps: Optional ordered list of step instructions; when given, each step
+            runs separately and only a failed step is retried
+        download_mode: "browser" or "http"; defaults to DOWNLOAD_MODE
+        trace: Keep the session trace even when the download succeeds
+        job_id: Identifier of the scheduled job; generated when omitted
     
     Returns:
         dict: Status and file information or error details
     """
-    # Import inside function to avoid pydantic conflicts
+    circuit_key = circuit_breaker.key(starting_url, client_name)
+    allowed, probe, retry_after = circuit_breaker.allow(circuit_key)
+    if not allowed:
+        print(f"⛔ Circuit open for {circuit_key}, next probe in {retry_after:.0f}s")
+        return {
+            "output": {
+                "status": "circuit_open",
+                "reason": f"Recent jobs for {circuit_key} kept failing; skipped without opening a browser",
+                "retry_after": int(retry_after)
+            }
+        }
+    
+    # Recent network events and step snapshots stay in memory; they are written out only when needed
+    trace_buffer = TraceBuffer()
+    job_id = job_id or uuid.uuid4().hex[:12]
+    result = _nova_act_download(instruction, starting_url, client_name, steps, download_mode, trace_buffer, job_id)
+    output = result.get("output", result)
+    # Throttling, S3 errors and a missing browser say nothing about the portal and are not counted;
+    # a probe that ended that way frees its slot instead of blocking until PROBE_TIMEOUT
+    if circuit_breaker.record_outcome(circuit_key, output.get("status"), probe=probe) == "open":
+        print(f"⛔ Circuit for {circuit_key} is open after this failure")
+    trace_reason = trace_buffer.flush_reason(output.get("status"), requested=trace)
+    if trace_reason:
+        try:
+            output["trace_prefix"] = trace_buffer.flush(s3, BUCKET_NAME, client_name, trace_reason)
+            print(f"Trace saved to s3://{BUCKET_NAME}/{output['trace_prefix']}")
+        except Exception as e:
+            print(f"⚠️ Could not save trace: {repr(e)}")
+    return result
+
+
+@contextmanager
+def _nova_act_session(starting_url):
+    """Browser, domain slot and NovaAct session for one job.
+
+    A NovaAct that cannot be imported or configured raises BrowserUnavailable,
+    like a browser provider with no browser to hand out.
+    """
     try:
+        # Import inside function to avoid pydantic conflicts
         from nova_act import NovaAct
     except Exception as import_error:
-        return {"status": "error", "reason": f"Failed to import NovaAct: {str(import_error)}"}
+        raise BrowserUnavailable(f"Failed to import NovaAct: {repr(import_error)}") from import_error
 
+    with browser_provider.acquire() as browser_options:
+        try:
+            nova_act = NovaAct(
+                nova_act_api_key=nova_act_api_key,
+                starting_page=starting_url,
+                **browser_options
+            )
+        except Exception as config_error:
+            raise BrowserUnavailable(f"Failed to configure NovaAct: {repr(config_error)}") from config_error
+        # Take the portal's lease only once a browser is in hand, right before NovaAct opens the portal,
+        # so a job queued for a browser does not hold one of the portal's limited slots
+        with domain_limiter.slot(starting_url, timeout=DOMAIN_SLOT_TIMEOUT), nova_act:
+            yield nova_act
+
+
+def _nova_act_download(instruction, starting_url, client_name, steps, download_mode, trace_buffer, job_id):
+    """Run the NovaAct session and upload the file; see nova_act_download for the arguments."""
     console = Console()
     download_dir = tempfile.gettempdir()
     file_path = None
     download_triggered = False
+    retry_budget = RetryBudget(RETRY_BUDGET_SECONDS)
+    download_mode = download_mode or DOWNLOAD_MODE
 
     try:
-        with NovaAct(
-            headless=True,
-            nova_act_api_key=nova_act_api_key,
-            starting_page=starting_url
-        ) as nova_act:
+        with _nova_act_session(starting_url) as nova_act:
+            # Block analytics, ads and heavy media per the client's policy so pages settle faster
+            request_filter = install_request_filter(nova_act.page, client_name)
+            trace_buffer.install(nova_act.page)
+            # Remember the download URL so an interrupted transfer can be finished over HTTP;
+            # in http mode the browser copy is cancelled outright
+            download_capture = DownloadCapture(cancel=download_mode == "http")
+            download_capture.install(nova_act.page)
             
             prompt = """You are a helpful Web UI automation assistant.
 SYSTEM PROMPT:
@@ -70,8 +272,30 @@ USER PROMPT:
 """ + instruction
             
             console.print("[cyan]Starting NovaAct automation...[/cyan]")
-            result = nova_act.act(prompt)
-            console.print(result)
+            if steps:
+                try:
+                    step_results = run_steps(nova_act, steps, max_attempts=STEP_MAX_ATTEMPTS, console=console,
+                                             trace=trace_buffer, context=instruction)
+                    console.print(step_results)
+                except StepFailed as step_error:
+                    console.print(f"[red]❌ {step_error}[/red]")
+                    return {
+                        "output": {
+                            "status": "error",
+                            "reason": f"Step {step_error.step_index} of {len(steps)} failed after {step_error.attempts} attempt(s): {repr(step_error.error)}",
+                            "completed_steps": len(step_error.completed)
+                        }
+                    }
+            else:
+                result = nova_act.act(prompt)
+                console.print(result)
+                trace_buffer.snapshot(nova_act.page, "after-task")
+            
+            if download_mode == "http" and download_capture.captured:
+                http_result = _http_download(nova_act.page, download_capture, client_name, console, retry_budget, job_id)
+                if http_result:
+                    http_result.update(_filter_report(request_filter, console))
+                    return {"output": http_result}
                 
             # Check file system for recent downloads
             possible_download_dirs = []
@@ -117,9 +341,12 @@ USER PROMPT:
             
             if not file_path:
                 console.print("[yellow]No download detected, trying expect_download...[/yellow]")
+                # In http mode the capture cancels downloads; this one has to reach save_as
+                download_capture.keep_browser_downloads()
                 try:
                     with nova_act.page.expect_download(timeout=5000) as download_info:
                         result = nova_act.act("Click the download button once and IMMEDIATELY RETURN ACTION COMPLETE")
+                    trace_buffer.snapshot(nova_act.page, "download-retry")
                     
                     if download_info.value:
                         console.print("[green]✅ Download event captured[/green]")
@@ -144,23 +371,33 @@ USER PROMPT:
                     return {"status": "error", "reason": "File is empty"}
                 
                 if file_ext == '.crdownload' or file_ext == '.part':
-                    console.print("[red]File is still downloading (partial file detected)[/red]")
-                    return {"status": "error", "reason": "Partial download detected"}
+                    console.print("[yellow]Partial file detected, resuming over HTTP...[/yellow]")
+                    file_path = _finish_partial_download(nova_act.page, download_capture, file_path, console)
+                    if not file_path:
+                        console.print("[red]File is still downloading (partial file detected)[/red]")
+                        return {"status": "error", "reason": "Partial download detected"}
+                    file_size = os.path.getsize(file_path)
+                    file_ext = os.path.splitext(file_path)[1]
                 
                 console.print(f"[green]File size: {file_size} bytes, Extension: {file_ext}[/green]")
                 
-                s3 = boto3.client('s3', region_name=REGION)
-                bucket_name = "bedrock-web-automation-dev-storage"
-                s3_file_key = f"downloaded-files/{client_name}/{os.path.basename(file_path)}"
+                bucket_name = BUCKET_NAME
+                s3_file_key = result_key(client_name, job_id, os.path.basename(file_path))
                 
                 try:
-                    s3.upload_file(file_path, bucket_name, s3_file_key)
-                    presigned_url = s3.generate_presigned_url(
+                    # The browser work is done; retry these cheap stages in place rather than failing the job
+                    retry_call(s3.upload_file, file_path, bucket_name, s3_file_key,
+                               description="S3 upload", budget=retry_budget, console=console)
+                    presigned_url = retry_call(
+                        s3.generate_presigned_url,
                         'get_object',
                         Params={'Bucket': bucket_name, 'Key': s3_file_key},
-                        ExpiresIn=3600
+                        ExpiresIn=3600,
+                        description="Presign", budget=retry_budget, console=console
                     )
                     console.print(f"✅ Uploaded to S3: {s3_file_key}")
+                    _record_result(client_name, job_id, s3_file_key, os.path.basename(file_path), file_size,
+                                   _sha256_file(file_path), None, download_capture.url or starting_url, console, retry_budget)
                     return {
                         "output": {
                             "status": "success",
@@ -168,7 +405,9 @@ USER PROMPT:
                             "s3_url": presigned_url,
                             "file_name": os.path.basename(file_path),
                             "file_size": file_size,
-                            "method": "filesystem_check" if download_triggered else "event"
+                            "method": "filesystem_check" if download_triggered else "event",
+                            "job_id": job_id,
+                            **_filter_report(request_filter, console)
                         }
                     }
                 except Exception as s3_error:
@@ -176,38 +415,110 @@ USER PROMPT:
                     return {
                         "output": {
                             "status": "s3_error",
-                            "reason": repr(s3_error)
+                            "reason": repr(s3_error),
+                            "retryable": is_retryable(s3_error)
                         }
                      }
             else:
                 return {
                     "output": {
                         "status": "error",
-                        "reason": "File not downloaded - all methods failed"
+                        "reason": "File not downloaded - all methods failed",
+                        **_filter_report(request_filter, console)
                     }
                 }
                 
+    except DomainBusy as e:
+        console.print(f"[yellow]⏳ {e}[/yellow]")
+        return {
+            "output": {
+                "status": "throttled",
+                "reason": str(e)
+            }
+        }
     except Exception as e:
         console.print(f"[red]❌ Error in nova_act_download: {repr(e)}[/red]")
+        # One classification for both the retry flag and the circuit breaker
+        status, retryable = classify_failure(e)
         return {
             "output": {
-                "status": "error",
-                "reason": f"NovaAct execution failed: {repr(e)}"
+                "status": status,
+                "reason": f"NovaAct execution failed: {repr(e)}",
+                "retryable": retryable
             }
         }
 
 
+def _signing_lifetime():
+    """Seconds the runtime role's credentials remain valid, capped at MAX_PRESIGN_EXPIRES_IN."""
+    credentials = boto_session.get_credentials()
+    # Refreshes credentials that are close to expiry, so the lifetime below is current
+    frozen = credentials.get_frozen_credentials()
+    expiry = getattr(credentials, "_expiry_time", None)
+    if expiry is not None:
+        return max(0, min(MAX_PRESIGN_EXPIRES_IN, int((expiry - datetime.now(timezone.utc)).total_seconds())))
+    if frozen.token:
+        return UNKNOWN_EXPIRY_MAX_EXPIRES_IN
+    return MAX_PRESIGN_EXPIRES_IN
+
+def _presign_download_urls(client_name, keys=None, latest_only=False, limit=50, expires_in=3600):
+    """Sign download URLs for a client's files from explicit keys or the result manifest."""
+    if int(limit) <= 0 or int(expires_in) <= 0:
+        return {"status": "invalid_request", "reason": "limit and expires_in must be positive", "retryable": False}
+    client_prefix = f"downloaded-files/{client_name}/"
+    if keys is not None and not isinstance(keys, list):
+        return {"status": "invalid_request", "reason": "keys must be a list of strings", "retryable": False}
+    if keys is None:
+        if latest_only:
+            latest = latest_document(s3, BUCKET_NAME, client_name)
+            keys = [latest["key"]] if latest else []
+        else:
+            keys = [entry["key"] for entry in reversed(read_manifest(s3, BUCKET_NAME, client_name))][:limit]
+    # Only the client's own downloads may be signed; keys come straight from the payload
+    outside = [key for key in keys if not isinstance(key, str) or not key.startswith(client_prefix) or ".." in key]
+    if outside:
+        return {"status": "invalid_request", "reason": f"{len(outside)} key(s) are outside {client_prefix}", "retryable": False}
+    # A URL stops working when the credentials that signed it expire, whatever its X-Amz-Expires says
+    expires_in = min(int(expires_in), _signing_lifetime())
+    if expires_in <= 0:
+        return {"status": "error", "reason": "Signing credentials have expired", "retryable": True}
+    urls = {
+        key: s3.generate_presigned_url('get_object', Params={'Bucket': BUCKET_NAME, 'Key': key}, ExpiresIn=expires_in)
+        for key in keys[:limit]
+    }
+    expires_at = (datetime.now(timezone.utc) + timedelta(seconds=expires_in)).isoformat(timespec="seconds")
+    return {"status": "success", "client_name": client_name, "expires_in": expires_in, "expires_at": expires_at, "urls": urls}
+
+# tool to refresh download links without running a browser
+@tool
+def presign_download_urls(client_name: str, keys: list[str] | None = None, latest_only: bool = False, limit: int = 50, expires_in: int = 3600):
+    """Create fresh download URLs for files that were already downloaded
+    
+    Args:
+        client_name: Client identifier
+        keys: Optional S3 keys to sign; when omitted, the newest files from the client's manifest are used
+        latest_only: Sign only the client's most recent document
+        limit: Maximum number of URLs to return
+        expires_in: URL lifetime in seconds (at most 7 days, and never past the signing credentials' expiry)
+    
+    Returns:
+        dict: Status, the effective expires_in/expires_at and a map of S3 key to presigned URL
+    """
+    return {"output": _presign_download_urls(client_name, keys, latest_only, limit, expires_in)}
+
+
 model_id = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
 model = BedrockModel(model_id=model_id)
 agent = Agent(
     model=model,
-    tools=[nova_act_download],
+    tools=[nova_act_download, presign_download_urls],
     system_prompt="""You are a helpful Web UI automation assistant.
 
 IMPORTANT BEHAVIOR RULES:
 - Do NOT retry failed tool calls on your own. If a tool fails, explain the error and stop.
 - Never output the password in plain text in your responses.
 - Never make multiple attempts to run the same web automation in a single response.
+- If the request only asks for fresh download links for files already downloaded, use presign_download_urls and do NOT run nova_act_download.
 
 IMPORTANT:
 After running a tool, you MUST produce a final assistant message containing ONLY the JSON returned by the tool.
@@ -217,10 +528,14 @@ You will receive structured data with these fields:
 
 Follow this exact process:
 1. Extract the website URL, login credentials, and task instructions
-2. Use the nova_act_download tool with THREE arguments:
+2. Use the nova_act_download tool with these arguments:
    a. instruction: "Login using username: {username} and password: {password}. Then {task instructions}."
    b. starting_url: The website URL
    c. client_name: The client identifier
+   d. steps: ONLY if the data includes a Steps list, pass that list exactly as given; otherwise omit it
+   e. download_mode: ONLY if the data includes a Download Mode, pass it exactly as given; otherwise omit it
+   f. trace: ONLY if the data includes "Trace: true", pass true; otherwise omit it
+   g. job_id: ONLY if the data includes a Job ID, pass it exactly as given; otherwise omit it
 3. IMPORTANT: Return ONLY the JSON response from the tool, do not add any additional text or summary.
    Return the exact dict that the tool returns with these fields: status, s3_key, s3_url, file_name, file_size, method
 """
@@ -230,6 +545,23 @@ Follow this exact process:
 def invoke_agent(payload):
     """Process JSON payload and return structured result"""
     
+    # Refreshing links needs neither the browser nor the model
+    if payload.get("action") == "presign_urls":
+        if not payload.get("client_name"):
+            return {"status": "error", "message": "Missing required field: client_name"}
+        try:
+            return _presign_download_urls(
+                payload["client_name"],
+                keys=payload.get("keys"),
+                latest_only=bool(payload.get("latest_only")),
+                limit=int(payload.get("limit", 50)),
+                expires_in=int(payload.get("expires_in", 3600)),
+            )
+        except (TypeError, ValueError):
+            return {"status": "invalid_request", "message": "limit and expires_in must be integers", "retryable": False}
+        except ClientError as e:
+            return {"status": "error", "message": f"Failed to sign download URLs: {e}", "retryable": is_retryable(e)}
+    
     weburl = payload.get("weburl")
     username = payload.get("username")
     password = payload.get("password")
@@ -238,14 +570,34 @@ def invoke_agent(payload):
     
     if not all([weburl, username, password, promptfile, client_name]):
         return {"status": "error", "message": "Missing required fields"}
+
+    # Prompt files may be templates; they are parsed once per ETag and pinned by version
+    try:
+        template = get_template(promptfile, etag=payload.get("prompt_etag"))
+        pinned_version = payload.get("prompt_version")
+        if pinned_version is not None and str(pinned_version) != template.version:
+            return {"status": "error", "message": f"Prompt version {template.version} does not match pinned version {pinned_version}"}
+        rendered = template.render(**job_variables(
+            payload, username=username, password=password, weburl=weburl, client_name=client_name
+        ))
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid prompt template: {e}"}
     
     prompt = f"""Execute web automation with these details:
 - Website URL: {weburl}
 - Username: {username}
 - Password: {password}
-- Task: {promptfile}
+- Task: {rendered.instruction}
 - Client: {client_name}
 """
+    if rendered.steps:
+        prompt += f"- Steps: {json.dumps(rendered.steps)}\n"
+    if payload.get("download_mode"):
+        prompt += f"- Download Mode: {payload['download_mode']}\n"
+    if payload.get("trace"):
+        prompt += "- Trace: true\n"
+    if payload.get("job_id"):
+        prompt += f"- Job ID: {payload['job_id']}\n"
     
     print("🚀 Invoking agent with Claude...")
     response = agent(prompt)
@@ -274,6 +626,8 @@ def invoke_agent(payload):
         
     # Ensure we return a dict
     if isinstance(result, dict):
+        # Key the result to the exact prompt template version that produced it
+        result["prompt_template"] = rendered.template_id
         return result
     else:
         return {"status": "error", "message": f"Unexpected type: {type(result).__name__}"}
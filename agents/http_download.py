@@ -0,0 +1,384 @@
+"""HTTP fast path for downloads behind a browser login.
+
+Once NovaAct has logged in and clicked the download link, the browser's
+download is cancelled and the file is fetched again with a plain HTTP client
+that carries the session's cookies and user agent. The response body is
+streamed straight into an S3 multipart upload, so a large file never touches
+browser memory or local disk; at most one part is held in memory.
+
+Downloads that cannot be replayed outside the browser (``blob:``/``data:``
+URLs, or links that only work from a form POST) are reported as unusable and
+the caller falls back to the browser download.
+
+Transfers are resumable: progress is saved under ``download-progress/`` in
+the destination bucket, keyed by job id and source URL, and interrupted
+transfers continue with Range requests instead of starting over. Give the bucket an
+AbortIncompleteMultipartUpload lifecycle rule so uploads that are never
+retried do not linger.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# S3 multipart parts must be at least 5 MiB, except the last one
+PART_SIZE = 8 * 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+# Times a dropped connection is resumed with a Range request before giving up
+MAX_RESUMES = 5
+RESUME_BACKOFF = 1
+MAX_RESUME_BACKOFF = 30
+REQUEST_TIMEOUT = (10, 60)
+# Progress records for in-flight uploads live beside the data in the same bucket
+PROGRESS_PREFIX = "download-progress/"
+
+# One connection pool shared by every download in this container; cookies stay
+# per session so clients never see each other's logins
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+
+
+class DownloadNotReplayable(Exception):
+    pass
+
+
+class IncompleteDownload(Exception):
+    pass
+
+
+class TransientHTTPError(Exception):
+    pass
+
+
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    TransientHTTPError,
+)
+
+
+class DownloadCapture:
+    """Records the first download a page starts, optionally cancelling it in the browser."""
+
+    def __init__(self, cancel=True):
+        self.cancel = cancel
+        self.url = None
+        self.suggested_filename = None
+        self._captured = threading.Event()
+
+    def install(self, page):
+        page.on("download", self._on_download)
+        # Portals often open the export in a new tab
+        page.context.on("page", lambda new_page: new_page.on("download", self._on_download))
+
+    def _on_download(self, download):
+        if self._captured.is_set():
+            return
+        self.url = download.url
+        self.suggested_filename = download.suggested_filename
+        self._captured.set()
+        if not self.cancel:
+            return
+        try:
+            download.cancel()
+        except Exception:
+            # The browser copy is only wasted work; the HTTP fetch does not depend on it
+            pass
+
+    def keep_browser_downloads(self):
+        """Stop cancelling, so a download retried in the browser can be saved from the browser."""
+        self.cancel = False
+
+    @property
+    def captured(self):
+        return self._captured.is_set()
+
+
+def session_from_page(page):
+    """Build an HTTP session that presents the browser's cookies and user agent."""
+    session = requests.Session()
+    session.mount("https://", _adapter)
+    session.mount("http://", _adapter)
+    for cookie in page.context.cookies():
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie.get("path", "/"))
+    session.headers.update({
+        "User-Agent": page.evaluate("() => navigator.userAgent"),
+        "Referer": page.url,
+    })
+    return session
+
+
+def _get(session, url, offset, validator):
+    # Range offsets count bytes on the wire; a compressed body would be decoded and
+    # counted differently, so resumed ranges would not line up
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        if validator:
+            # Only honour the range if the file has not changed since the first response
+            headers["If-Range"] = validator
+    return session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT)
+
+
+def _content_range(response):
+    """Parse ``Content-Range: bytes start-end/total`` into (start, total); total may be None."""
+    match = re.fullmatch(r"bytes (\d+)-\d+/(\d+|\*)", response.headers.get("Content-Range", ""))
+    if not match:
+        return None, None
+    start, total = match.groups()
+    return int(start), None if total == "*" else int(total)
+
+
+def _resume(session, url, offset, progress):
+    """Continue a transfer at offset; raises TransientHTTPError when worth retrying later."""
+    response = _get(session, url, offset, progress["validator"])
+    start, _ = _content_range(response)
+    if response.status_code == 206 and start == offset:
+        etag = response.headers.get("ETag")
+        if progress.get("etag") and etag and etag != progress["etag"]:
+            response.close()
+            raise DownloadNotReplayable(f"ETag changed from {progress['etag']} to {etag} mid-download")
+        return response
+    response.close()
+    if response.status_code == 429 or response.status_code >= 500:
+        raise TransientHTTPError(f"HTTP {response.status_code} while resuming at byte {offset}")
+    raise DownloadNotReplayable(f"Server cannot resume at byte {offset} (HTTP {response.status_code})")
+
+
+def progress_key(url, job_id=None):
+    """Where the progress of a transfer is saved; stable across retries of the same job, whatever the date."""
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return f"{PROGRESS_PREFIX}{job_id}/{digest}.json" if job_id else f"{PROGRESS_PREFIX}{digest}.json"
+
+
+def load_progress(s3_client, bucket, record_key):
+    """Return the progress record saved under record_key, or None."""
+    try:
+        body = s3_client.get_object(Bucket=bucket, Key=record_key)["Body"].read()
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    return json.loads(body)
+
+
+def _save_progress(s3_client, bucket, record_key, progress):
+    s3_client.put_object(
+        Bucket=bucket, Key=record_key, Body=json.dumps(progress).encode("utf-8"), ContentType="application/json"
+    )
+
+
+def _abandon(s3_client, bucket, record_key, progress):
+    try:
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=progress["key"], UploadId=progress["upload_id"])
+    except Exception:
+        pass
+    s3_client.delete_object(Bucket=bucket, Key=record_key)
+
+
+def _start(session, url, s3_client, bucket, key, record_key):
+    response = _get(session, url, 0, None)
+    try:
+        response.raise_for_status()
+    except Exception:
+        # Return the pooled connection; an error body is never read
+        response.close()
+        raise
+    if "text/html" in response.headers.get("Content-Type", ""):
+        # A login page instead of the file means the cookies were not enough
+        response.close()
+        raise DownloadNotReplayable("Download URL returned an HTML page")
+    content_type = response.headers.get("Content-Type", "application/octet-stream")
+    length = response.headers.get("Content-Length")
+    encoding = response.headers.get("Content-Encoding", "identity").lower()
+    progress = {
+        "url": url,
+        # A resumed transfer finishes the upload it started, even if today's result key differs
+        "key": key,
+        "etag": response.headers.get("ETag"),
+        "validator": response.headers.get("ETag") or response.headers.get("Last-Modified"),
+        # A server that compresses anyway cannot be resumed: received bytes are decoded bytes
+        "resumable": encoding == "identity",
+        "total": int(length) if length and encoding == "identity" else None,
+        "content_type": content_type,
+        "received": 0,
+        "upload_id": s3_client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"],
+        "parts": [],
+    }
+    _save_progress(s3_client, bucket, record_key, progress)
+    return response, progress
+
+
+def stream_to_s3(session, url, s3_client, bucket, key, part_size=PART_SIZE, max_resumes=MAX_RESUMES, console=None, job_id=None):
+    """Stream a URL into an S3 object with a resumable multipart upload.
+
+    Progress (destination, validators, bytes uploaded, multipart parts) is saved
+    under progress_key(url, job_id) after every part. A dropped connection is
+    resumed from the last byte received; if the job gives up on a transient
+    error the upload is kept, and the next attempt of the same job for the same
+    URL continues from the saved progress, into the key it started with, as
+    long as the file's ETag/Last-Modified is unchanged. The final length is
+    checked against Content-Length and the ETag must not change between
+    responses. Bodies are requested with ``Accept-Encoding: identity``; a
+    response compressed anyway is streamed but never resumed.
+
+    Args:
+        session: HTTP session carrying the browser's cookies
+        url: Download URL captured from the browser
+        s3_client: boto3 S3 client
+        bucket: Destination bucket
+        key: Destination key of a new transfer
+        part_size: Bytes per multipart part
+        max_resumes: Range resumes allowed after transient errors in this attempt
+        job_id: Job the transfer belongs to; retries of the job share its progress
+    Returns:
+        dict with the destination key, size, etag of the S3 object,
+        content_type, resumes and sha256 (None when the transfer continued an
+        earlier attempt)
+    """
+    scheme = urlparse(url).scheme
+    if scheme not in ("http", "https"):
+        raise DownloadNotReplayable(f"{scheme}: URLs only exist inside the browser")
+
+    response = None
+    record_key = progress_key(url, job_id)
+    progress = load_progress(s3_client, bucket, record_key)
+    if progress and not progress.get("resumable", True):
+        _abandon(s3_client, bucket, record_key, progress)
+        progress = None
+    if progress:
+        if progress["total"] is not None and progress["received"] >= progress["total"]:
+            pass
+        else:
+            try:
+                response = _resume(session, url, progress["received"], progress)
+                if console:
+                    console.print(f"[cyan]Resuming saved download at byte {progress['received']}[/cyan]")
+            except DownloadNotReplayable as e:
+                if console:
+                    console.print(f"[yellow]Saved progress unusable ({e}), starting over[/yellow]")
+                _abandon(s3_client, bucket, record_key, progress)
+                progress = None
+    if progress is None:
+        response, progress = _start(session, url, s3_client, bucket, key, record_key)
+    key = progress["key"]
+
+    buffer = bytearray()
+    received = progress["received"]
+    resumes = 0
+    # The hash covers the whole file only when this attempt streamed it from the first byte
+    digest = hashlib.sha256() if received == 0 else None
+
+    def flush():
+        part_number = len(progress["parts"]) + 1
+        result = s3_client.upload_part(
+            Bucket=bucket, Key=key, UploadId=progress["upload_id"], PartNumber=part_number, Body=bytes(buffer)
+        )
+        progress["parts"].append({"PartNumber": part_number, "ETag": result["ETag"]})
+        buffer.clear()
+
+    try:
+        while progress["total"] is None or received < progress["total"]:
+            try:
+                if response is None:
+                    response = _resume(session, url, received, progress)
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    buffer.extend(chunk)
+                    received += len(chunk)
+                    if digest:
+                        digest.update(chunk)
+                    if len(buffer) >= part_size:
+                        flush()
+                        progress["received"] = received
+                        _save_progress(s3_client, bucket, record_key, progress)
+                break
+            except TRANSIENT_ERRORS as e:
+                if response is not None:
+                    response.close()
+                    response = None
+                if not progress.get("resumable", True):
+                    raise IncompleteDownload(f"Compressed response interrupted at {received} bytes cannot be resumed") from e
+                if resumes >= max_resumes:
+                    raise
+                resumes += 1
+                if console:
+                    console.print(f"[yellow]Download interrupted at {received} bytes ({repr(e)}), resuming[/yellow]")
+                time.sleep(min(RESUME_BACKOFF * 2 ** (resumes - 1), MAX_RESUME_BACKOFF))
+
+        if progress["total"] is not None and received != progress["total"]:
+            raise IncompleteDownload(f"Received {received} bytes, expected {progress['total']}")
+        if buffer or not progress["parts"]:
+            flush()
+        result = s3_client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=progress["upload_id"], MultipartUpload={"Parts": progress["parts"]}
+        )
+        stored = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+        if stored != received:
+            raise IncompleteDownload(f"S3 object has {stored} bytes, received {received}")
+    except TRANSIENT_ERRORS:
+        # Keep the parts and the progress record; the next attempt for this key picks them up
+        raise
+    except BaseException:
+        _abandon(s3_client, bucket, record_key, progress)
+        raise
+    finally:
+        if response is not None:
+            response.close()
+
+    s3_client.delete_object(Bucket=bucket, Key=record_key)
+    return {
+        "key": key,
+        "size": received,
+        "etag": result.get("ETag"),
+        "content_type": progress["content_type"],
+        "resumes": resumes,
+        "sha256": digest.hexdigest() if digest else None,
+    }
+
+
+def resume_partial_file(session, url, path, max_resumes=MAX_RESUMES, console=None):
+    """Finish a partial browser download (.crdownload/.part) over HTTP.
+
+    The missing bytes are requested with a Range starting at the partial file's
+    size and appended to it. The server must answer 206 at exactly that offset,
+    and the final size must match the total from Content-Range.
+
+    Returns:
+        Final size in bytes
+    """
+    received = os.path.getsize(path)
+    progress = {"validator": None, "etag": None}
+    total = None
+    resumes = 0
+    with open(path, "ab") as f:
+        while total is None or received < total:
+            response = None
+            try:
+                response = _resume(session, url, received, progress)
+                _, total = _content_range(response)
+                # Later ranges must come from the same file as this one
+                progress["etag"] = progress["etag"] or response.headers.get("ETag")
+                progress["validator"] = progress["validator"] or progress["etag"] or response.headers.get("Last-Modified")
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    received += len(chunk)
+                if total is None:
+                    break
+            except TRANSIENT_ERRORS as e:
+                if resumes >= max_resumes:
+                    raise
+                resumes += 1
+                if console:
+                    console.print(f"[yellow]Partial file resume interrupted at {received} bytes ({repr(e)}), retrying[/yellow]")
+                time.sleep(min(RESUME_BACKOFF * 2 ** (resumes - 1), MAX_RESUME_BACKOFF))
+            finally:
+                if response is not None:
+                    response.close()
+    if total is not None and received != total:
+        raise IncompleteDownload(f"Partial file has {received} bytes, expected {total}")
+    return received
@@ -0,0 +1,507 @@
+"""Scheduled download jobs with a durable queue and bounded dispatch.
+
+Each client has a cron-style schedule. When a schedule fires, a job is put on
+a durable queue, and the scheduler dispatches queued jobs to the deployed
+agent runtime:
+
+- highest priority first, oldest first within a priority
+- at most one queued or running job per client (per-client dedupe)
+- never more than ``--max-concurrent`` jobs in flight, so a nightly run of
+  hundreds of clients cannot overload Bedrock or the portals
+- failed jobs are retried with exponential backoff and full jitter, up to
+  ``--max-attempts``
+
+Queues:
+
+- ``sqlite:///path/to/jobs.db``: a local SQLite file; survives restarts, and
+  jobs left running by a crashed scheduler are re-queued on start-up
+- ``sqs:<queue url>[,<queue url>...]``: SQS queues listed from highest to
+  lowest priority, with ``--pending-table``: a DynamoDB table (partition key
+  ``client_name``) holding one marker per client with a queued or running
+  job. The marker is put conditionally before a message is sent and removed
+  when the job completes or fails for good; markers a crashed scheduler left
+  behind expire after ``--pending-ttl`` seconds
+
+Schedules file (times are evaluated in ``timezone``, default UTC)::
+
+    [
+      {"client_name": "ClientA", "cron": "0 2 * * *", "priority": 5},
+      {"client_name": "ClientB", "cron": "*/30 8-18 * * 1-5", "timezone": "America/New_York",
+       "payload": {"download_mode": "http"}}
+    ]
+
+The job payload is built at dispatch time from the client context Lambda
+(lambda/lambda_client_context.py), so credentials never sit in the queue.
+The runtime is invoked with SigV4, so its inbound auth must allow IAM callers.
+
+Usage:
+    python job_scheduler.py --schedules schedules.json --queue sqlite:///jobs.db \\
+        --agent-arn arn:aws:bedrock-agentcore:...:runtime/... --context-function client-context
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_PRIORITY = 5
+CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 6))
+
+
+class PermanentJobError(Exception):
+    """A job failure that retrying cannot fix, such as a client with no credentials."""
+
+
+class CronSchedule:
+    """Five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Fields accept ``*``, ``n``, ``a-b``, lists and ``/step``; day-of-week 0 and 7
+    are Sunday. As in cron, when both day fields are restricted a day matches
+    if either does.
+    """
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields")
+        self.expression = expression
+        self.values = {}
+        for text, (name, low, high) in zip(fields, CRON_FIELDS):
+            self.values[name] = self._parse_field(text, name, low, 7 if name == "weekday" else high)
+        self.values["weekday"] = {0 if day == 7 else day for day in self.values["weekday"]}
+        self.day_restricted = fields[2] != "*"
+        self.weekday_restricted = fields[4] != "*"
+
+    @staticmethod
+    def _parse_field(text, name, low, high):
+        values = set()
+        for part in text.split(","):
+            range_text, _, step_text = part.partition("/")
+            step = int(step_text) if step_text else 1
+            if range_text == "*":
+                start, end = low, high
+            elif "-" in range_text:
+                start, end = (int(value) for value in range_text.split("-", 1))
+            else:
+                start = int(range_text)
+                end = high if step_text else start
+            if not (low <= start <= end <= high) or step < 1:
+                raise ValueError(f"Invalid cron {name} field '{text}'")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        day = moment.day in self.values["day"]
+        # Python weekday() is Monday=0; cron is Sunday=0
+        weekday = (moment.weekday() + 1) % 7 in self.values["weekday"]
+        if self.day_restricted and self.weekday_restricted:
+            return day or weekday
+        return day and weekday
+
+    def matches(self, moment):
+        return (
+            moment.minute in self.values["minute"]
+            and moment.hour in self.values["hour"]
+            and moment.month in self.values["month"]
+            and self._day_matches(moment)
+        )
+
+
+class SQLiteQueue:
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                client_name TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_error TEXT
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, not_before)")
+
+    def requeue_running(self):
+        """Jobs marked running by a scheduler that died are put back on the queue."""
+        with self._lock:
+            return self._db.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+
+    def enqueue(self, client_name, payload, priority=DEFAULT_PRIORITY, dedupe_id=None):
+        """Queue a job unless the client already has one queued or running; returns the job id or None."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                pending = self._db.execute(
+                    "SELECT 1 FROM jobs WHERE client_name = ? AND status IN ('queued', 'running')", (client_name,)
+                ).fetchone()
+                if pending:
+                    self._db.execute("COMMIT")
+                    return None
+                job_id = uuid.uuid4().hex
+                now = time.time()
+                self._db.execute(
+                    "INSERT INTO jobs (id, client_name, priority, payload, status, not_before, created_at) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                    (job_id, client_name, priority, json.dumps(payload), now, now),
+                )
+                self._db.execute("COMMIT")
+                return job_id
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def claim(self):
+        """Mark the next ready job as running and return it, or None when nothing is ready."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id, client_name, priority, payload, attempts FROM jobs "
+                    "WHERE status = 'queued' AND not_before <= ? ORDER BY priority DESC, not_before, created_at LIMIT 1",
+                    (time.time(),),
+                ).fetchone()
+                if row:
+                    self._db.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1 WHERE id = ?", (row[0],))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if not row:
+            return None
+        return {"id": row[0], "client_name": row[1], "priority": row[2], "payload": json.loads(row[3]), "attempts": row[4] + 1}
+
+    def get(self, job_id):
+        """Status, attempts and last error of a job, or None if unknown."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT client_name, status, attempts, last_error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"id": job_id, "client_name": row[0], "status": row[1], "attempts": row[2], "last_error": row[3]}
+
+    def complete(self, job):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = 'done', last_error = NULL WHERE id = ?", (job["id"],))
+
+    def retry(self, job, delay, error):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', not_before = ?, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, job["id"]),
+            )
+
+    def fail(self, job, error):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = 'failed', last_error = ? WHERE id = ?", (error, job["id"]))
+
+
+class SQSQueue:
+    """Jobs as SQS messages; queue_urls are ordered from highest to lowest priority.
+
+    A claimed message stays invisible while the job runs; a retry shortens its
+    visibility to the backoff delay, and attempts come from the receive count.
+    Per-client dedupe is a conditional put of a marker item in pending_table,
+    which works for standard and FIFO queues alike; FIFO queues also get the
+    client name as message group. Give the queues a visibility timeout longer
+    than the longest job, and pending_ttl longer than a job with all its retries.
+    """
+
+    def __init__(self, queue_urls, pending_table, region=None, pending_ttl=24 * 3600):
+        self.queue_urls = list(queue_urls)
+        self.sqs = boto3.client("sqs", region_name=region)
+        self.pending = boto3.resource("dynamodb", region_name=region).Table(pending_table)
+        self.pending_ttl = pending_ttl
+        self._conflict = self.pending.meta.client.exceptions.ConditionalCheckFailedException
+
+    def requeue_running(self):
+        # Unacknowledged messages reappear on their own once their visibility timeout passes
+        return 0
+
+    def _queue_for(self, priority):
+        # Priorities 0-9 are spread over the queues, highest priority to the first URL
+        index = (9 - min(max(priority, 0), 9)) * len(self.queue_urls) // 10
+        return self.queue_urls[index]
+
+    def enqueue(self, client_name, payload, priority=DEFAULT_PRIORITY, dedupe_id=None):
+        """Queue a job unless the client already has one queued or running; returns the job id or None."""
+        job_id = uuid.uuid4().hex
+        now = int(time.time())
+        try:
+            self.pending.put_item(
+                Item={"client_name": client_name, "job_id": job_id, "expires_at": now + self.pending_ttl},
+                ConditionExpression="attribute_not_exists(client_name) OR expires_at < :now",
+                ExpressionAttributeValues={":now": now},
+            )
+        except self._conflict:
+            return None
+        queue_url = self._queue_for(priority)
+        message = {
+            "QueueUrl": queue_url,
+            "MessageBody": json.dumps({"id": job_id, "client_name": client_name, "priority": priority, "payload": payload}),
+        }
+        if queue_url.endswith(".fifo"):
+            message["MessageGroupId"] = client_name
+            message["MessageDeduplicationId"] = dedupe_id or job_id
+        try:
+            self.sqs.send_message(**message)
+        except BaseException:
+            self._clear_pending(client_name, job_id)
+            raise
+        return job_id
+
+    def _clear_pending(self, client_name, job_id):
+        try:
+            # Only this job's marker; a newer job for the client keeps its own
+            self.pending.delete_item(
+                Key={"client_name": client_name},
+                ConditionExpression="job_id = :job",
+                ExpressionAttributeValues={":job": job_id},
+            )
+        except self._conflict:
+            pass
+
+    def claim(self):
+        for queue_url in self.queue_urls:
+            messages = self.sqs.receive_message(
+                QueueUrl=queue_url, MaxNumberOfMessages=1, AttributeNames=["ApproximateReceiveCount"]
+            ).get("Messages", [])
+            if messages:
+                message = messages[0]
+                job = json.loads(message["Body"])
+                job["attempts"] = int(message["Attributes"]["ApproximateReceiveCount"])
+                job["_queue_url"] = queue_url
+                job["_receipt"] = message["ReceiptHandle"]
+                return job
+        return None
+
+    def complete(self, job):
+        self.sqs.delete_message(QueueUrl=job["_queue_url"], ReceiptHandle=job["_receipt"])
+        self._clear_pending(job["client_name"], job["id"])
+
+    def retry(self, job, delay, error):
+        self.sqs.change_message_visibility(
+            QueueUrl=job["_queue_url"], ReceiptHandle=job["_receipt"], VisibilityTimeout=int(delay)
+        )
+
+    def fail(self, job, error):
+        # Configure a dead-letter queue on the source queue to keep these for inspection
+        self.sqs.delete_message(QueueUrl=job["_queue_url"], ReceiptHandle=job["_receipt"])
+        self._clear_pending(job["client_name"], job["id"])
+
+
+def open_queue(spec, region=None, pending_table=None, pending_ttl=24 * 3600):
+    if spec.startswith("sqlite:///"):
+        return SQLiteQueue(spec[len("sqlite:///"):])
+    if spec.startswith("sqs:"):
+        if not pending_table:
+            raise ValueError("SQS queues need a pending table (--pending-table) for per-client dedupe")
+        return SQSQueue(spec[len("sqs:"):].split(","), pending_table, region=region, pending_ttl=pending_ttl)
+    raise ValueError(f"Unknown queue '{spec}', expected sqlite:///<path> or sqs:<queue url>")
+
+
+class AgentRuntimeDispatcher:
+    """Builds a job's payload from the client context Lambda and invokes the agent runtime."""
+
+    def __init__(self, agent_arn, context_function, region=None, qualifier="DEFAULT"):
+        self.agent_arn = agent_arn
+        self.context_function = context_function
+        self.qualifier = qualifier
+        self.lambda_client = boto3.client("lambda", region_name=region)
+        # A NovaAct session runs for minutes; the default 60s read timeout would abandon it.
+        # botocore must not retry the invocation: a read timeout would start a second browser
+        # session against the portal while the first is still running. The Scheduler owns retries.
+        self.agentcore = boto3.client(
+            "bedrock-agentcore", region_name=region, config=Config(read_timeout=900, retries={"total_max_attempts": 1})
+        )
+
+    def _client_context(self, client_name):
+        response = self.lambda_client.invoke(
+            FunctionName=self.context_function, Payload=json.dumps({"client_name": client_name}).encode("utf-8")
+        )
+        result = json.loads(response["Payload"].read())
+        body = json.loads(result.get("body", "{}"))
+        if result.get("statusCode") == 400 or (not body.get("success") and body.get("retryable") is False):
+            raise PermanentJobError(body.get("error", f"No context for {client_name}"))
+        if not body.get("success"):
+            raise RuntimeError(body.get("error", f"Client context lookup failed for {client_name}"))
+        return body
+
+    def __call__(self, job):
+        context = self._client_context(job["client_name"])
+        credentials = context["credentials"]
+        payload = {
+            "weburl": context["weburl"],
+            "username": credentials["login_credentials"],
+            "password": credentials["login_password"],
+            "promptfile": context["prompt"]["file_content"],
+            "prompt_etag": context["prompt"]["etag"],
+            "client_name": job["client_name"],
+            # Retries keep the job id, so they write to the same result key and resume its saved progress
+            "job_id": job["id"],
+            **job["payload"],
+        }
+        response = self.agentcore.invoke_agent_runtime(
+            agentRuntimeArn=self.agent_arn,
+            qualifier=self.qualifier,
+            # Session ids must be at least 33 characters
+            runtimeSessionId=f"job-{job['id']}-{job['attempts']}".ljust(33, "0"),
+            payload=json.dumps(payload),
+        )
+        result = json.loads(response["response"].read())
+        output = result.get("output", result)
+        if output.get("status") == "circuit_open":
+            # Retrying before the breaker's cooldown would only be refused again
+            raise PermanentJobError(output.get("reason", "Circuit open"))
+        if output.get("retryable") is False:
+            raise PermanentJobError(output.get("reason") or f"Job returned {output.get('status')}")
+        if output.get("status") != "success":
+            raise RuntimeError(output.get("reason") or result.get("message") or f"Job returned {output.get('status')}")
+        return result
+
+
+class Scheduler:
+    def __init__(self, queue, schedules, dispatch, max_concurrent=4, max_attempts=3, base_delay=60, max_delay=1800):
+        """
+        Args:
+            queue: SQLiteQueue or SQSQueue
+            schedules: List of schedule dicts (client_name, cron, optional priority, timezone, payload)
+            dispatch: Callable running one job; raises on failure
+            max_concurrent: Jobs in flight at once across all clients
+            max_attempts: Attempts per job, including the first
+            base_delay: First retry delay in seconds, doubled per attempt
+            max_delay: Upper bound for a retry delay
+        """
+        self.queue = queue
+        self.schedules = [
+            {**schedule, "_cron": CronSchedule(schedule["cron"]), "_tz": ZoneInfo(schedule.get("timezone", "UTC"))}
+            for schedule in schedules
+        ]
+        self.dispatch = dispatch
+        self.max_concurrent = max_concurrent
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent)
+        self._in_flight = threading.Semaphore(max_concurrent)
+        # Last minute whose schedules were enqueued; start-up does not replay missed runs
+        self._last_minute = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+
+    def enqueue(self, schedule, slot):
+        job_id = self.queue.enqueue(
+            schedule["client_name"],
+            schedule.get("payload", {}),
+            priority=schedule.get("priority", DEFAULT_PRIORITY),
+            dedupe_id=f"{schedule['client_name']}:{slot:%Y%m%d%H%M}",
+        )
+        if job_id:
+            print(f"📥 Queued {schedule['client_name']} ({job_id})")
+        else:
+            print(f"⏭️  {schedule['client_name']}: a job is already queued or running")
+
+    def enqueue_due(self, now=None):
+        """Queue every schedule that fired since the last call, one check per elapsed minute."""
+        now = (now or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+        minute = self._last_minute + timedelta(minutes=1)
+        while minute <= now:
+            for schedule in self.schedules:
+                if schedule["_cron"].matches(minute.astimezone(schedule["_tz"])):
+                    self.enqueue(schedule, minute)
+            minute += timedelta(minutes=1)
+        self._last_minute = max(self._last_minute, now)
+
+    def retry_delay(self, attempts):
+        # Full jitter keeps a batch of failed clients from retrying in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+
+    def _run(self, job):
+        try:
+            self.dispatch(job)
+            self.queue.complete(job)
+            print(f"✅ {job['client_name']} done (attempt {job['attempts']})")
+        except PermanentJobError as e:
+            self.queue.fail(job, str(e))
+            print(f"❌ {job['client_name']} failed permanently: {e}")
+        except Exception as e:
+            if job["attempts"] >= self.max_attempts:
+                self.queue.fail(job, repr(e))
+                print(f"❌ {job['client_name']} failed after {job['attempts']} attempt(s): {repr(e)}")
+            else:
+                delay = self.retry_delay(job["attempts"])
+                self.queue.retry(job, delay, repr(e))
+                print(f"🔁 {job['client_name']} attempt {job['attempts']} failed ({repr(e)}), retrying in {delay:.0f}s")
+        finally:
+            self._in_flight.release()
+
+    def dispatch_ready(self):
+        """Start queued jobs until the concurrency cap is reached; returns the number started."""
+        started = 0
+        while self._in_flight.acquire(blocking=False):
+            try:
+                job = self.queue.claim()
+            except BaseException:
+                self._in_flight.release()
+                raise
+            if job is None:
+                self._in_flight.release()
+                break
+            self._executor.submit(self._run, job)
+            started += 1
+        return started
+
+    def run_forever(self, tick=15):
+        recovered = self.queue.requeue_running()
+        if recovered:
+            print(f"♻️  Re-queued {recovered} job(s) left running by a previous scheduler")
+        while True:
+            try:
+                self.enqueue_due()
+                self.dispatch_ready()
+            except Exception as e:
+                # A queue hiccup should cost one tick, not the scheduler
+                print(f"⚠️  Scheduler tick failed: {repr(e)}")
+            time.sleep(tick)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run scheduled download jobs against the agent runtime")
+    parser.add_argument("--schedules", required=True, help="JSON file with per-client schedules")
+    parser.add_argument("--queue", default="sqlite:///jobs.db", help="sqlite:///<path> or sqs:<queue url>[,...]")
+    parser.add_argument("--agent-arn", required=True, help="AgentCore runtime ARN")
+    parser.add_argument("--context-function", required=True, help="Name of the client context Lambda")
+    parser.add_argument("--pending-table", default=None, help="DynamoDB table of pending jobs per client (required for sqs:)")
+    parser.add_argument("--pending-ttl", type=int, default=24 * 3600, help="Seconds before an orphaned pending marker expires")
+    parser.add_argument("--region", default=None)
+    parser.add_argument("--max-concurrent", type=int, default=4, help="Jobs in flight at once")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per job")
+    parser.add_argument("--run-now", nargs="*", metavar="CLIENT", help="Queue these clients immediately, then keep scheduling")
+    args = parser.parse_args()
+
+    with open(args.schedules) as f:
+        schedules = json.load(f)
+    scheduler = Scheduler(
+        open_queue(args.queue, region=args.region, pending_table=args.pending_table, pending_ttl=args.pending_ttl),
+        schedules,
+        AgentRuntimeDispatcher(args.agent_arn, args.context_function, region=args.region),
+        max_concurrent=args.max_concurrent,
+        max_attempts=args.max_attempts,
+    )
+    now = datetime.now(timezone.utc)
+    for schedule in scheduler.schedules:
+        if args.run_now and schedule["client_name"] in args.run_now:
+            scheduler.enqueue(schedule, now)
+    scheduler.run_forever()
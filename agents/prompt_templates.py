@@ -0,0 +1,184 @@
+"""Prompt templates for client prompt files.
+
+A prompt file stored at ``prompt-files/{client_name}/prompt.txt`` may start
+with a header that declares its version, the variables it expects and an
+optional list of steps::
+
+    ---
+    version: 3
+    variables: username, password
+    steps:
+      - Login using username: {username} and password: {password}
+      - Open the Documents tab
+      - Download the most recent statement
+    ---
+    Only download PDF files.
+
+Files without a header are treated as plain instructions (version ``0``) and
+are passed through untouched, so existing prompt files keep working.
+
+username, password, weburl and client_name are always available; any other
+declared variable is taken from the job payload's ``variables`` object.
+
+Templates are parsed once and cached by ETag (or content hash when no ETag is
+known); rendering a cached template is a list join.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from string import Formatter
+
+HEADER_DELIMITER = "---"
+CACHE_SIZE = 128
+
+_template_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _compile(text):
+    """Split text into (literal, variable) segments once, so rendering never re-parses."""
+    segments = []
+    for literal, name, format_spec, conversion in Formatter().parse(text):
+        if format_spec or conversion:
+            raise ValueError(f"Unsupported placeholder '{{{name}!{conversion}:{format_spec}}}' - use plain {{name}}")
+        if name is not None and not name.isidentifier():
+            raise ValueError(f"Invalid template variable '{{{name}}}'")
+        segments.append((literal, name))
+    return tuple(segments)
+
+
+def _render(segments, values):
+    parts = []
+    for literal, name in segments:
+        parts.append(literal)
+        if name is not None:
+            parts.append(str(values[name]))
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    instruction: str
+    steps: list
+    template_id: str
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    version: str
+    etag: str
+    variables: tuple
+    body: tuple = ()
+    steps: tuple = ()
+    plain_text: str = None
+    metadata: dict = field(default_factory=dict)
+
+    @property
+    def template_id(self):
+        """Identifier pinned to this exact template version, for keying replay and result caches."""
+        return f"v{self.version}-{self.etag}"
+
+    def render(self, **values):
+        """Substitute variables and return the instruction and step list for one job."""
+        if self.plain_text is not None:
+            return RenderedPrompt(self.plain_text, [], self.template_id)
+
+        missing = [name for name in self.variables if values.get(name) is None]
+        if missing:
+            raise ValueError(f"Missing template variables: {', '.join(missing)}")
+
+        steps = [_render(step, values) for step in self.steps]
+        instruction = _render(self.body, values).strip()
+        if steps:
+            numbered = "\n".join(f"{index}. {step}" for index, step in enumerate(steps, start=1))
+            instruction = f"{instruction}\n\n{numbered}" if instruction else numbered
+        return RenderedPrompt(instruction, steps, self.template_id)
+
+
+def job_variables(payload, **builtins):
+    """Template values for one job: the payload's ``variables`` plus the built-ins, which take precedence."""
+    extra = payload.get("variables") or {}
+    if not isinstance(extra, dict):
+        raise ValueError("'variables' must be an object mapping variable names to values")
+    return {**extra, **builtins}
+
+
+def _parse_header(lines):
+    metadata = {}
+    steps = []
+    current_list = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and current_list is not None:
+            current_list.append(stripped[2:].strip())
+            continue
+        key, sep, value = stripped.partition(":")
+        if not sep:
+            raise ValueError(f"Invalid prompt header line: '{stripped}'")
+        key = key.strip().lower()
+        value = value.strip()
+        if key == "steps":
+            current_list = steps
+            if value:
+                raise ValueError("Prompt header 'steps:' must be followed by '- step' lines")
+        else:
+            current_list = None
+            metadata[key] = value
+    return metadata, steps
+
+
+def parse_template(content, etag):
+    """Parse prompt file content into a PromptTemplate (uncached)."""
+    lines = content.splitlines()
+    if not lines or lines[0].strip() != HEADER_DELIMITER:
+        return PromptTemplate(version="0", etag=etag, variables=(), plain_text=content)
+
+    try:
+        end = next(i for i in range(1, len(lines)) if lines[i].strip() == HEADER_DELIMITER)
+    except StopIteration:
+        raise ValueError("Prompt header is not closed with '---'")
+
+    metadata, step_texts = _parse_header(lines[1:end])
+    body = _compile("\n".join(lines[end + 1:]))
+    steps = tuple(_compile(step) for step in step_texts)
+
+    used = {name for segments in (body, *steps) for _, name in segments if name is not None}
+    declared = [name.strip() for name in metadata.pop("variables", "").split(",") if name.strip()]
+    undeclared = sorted(used - set(declared))
+    if declared and undeclared:
+        raise ValueError(f"Template uses undeclared variables: {', '.join(undeclared)}")
+
+    return PromptTemplate(
+        version=metadata.pop("version", "1"),
+        etag=etag,
+        variables=tuple(declared or sorted(used)),
+        body=body,
+        steps=steps,
+        metadata=metadata,
+    )
+
+
+def get_template(content, etag=None):
+    """Return the parsed template for this prompt file, parsing it only on first use.
+
+    Args:
+        content: Raw prompt file text
+        etag: S3 ETag of the prompt object; a content hash is used when omitted
+    """
+    etag = (etag or hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]).strip('"')
+    with _cache_lock:
+        template = _template_cache.get(etag)
+        if template is not None:
+            _template_cache.move_to_end(etag)
+            return template
+
+    template = parse_template(content, etag)
+    with _cache_lock:
+        _template_cache[etag] = template
+        while len(_template_cache) > CACHE_SIZE:
+            _template_cache.popitem(last=False)
+    return template
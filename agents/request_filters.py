@@ -0,0 +1,177 @@
+"""Per-client network request filtering for NovaAct sessions.
+
+Blocking analytics, ads and heavy media lets portal pages settle sooner, which
+shortens every act() step. Policies are read from REQUEST_POLICIES_FILE
+(default ``request_policies.json`` next to this module), keyed by client name,
+with a ``default`` entry applied to clients that have none::
+
+    {
+      "default": {"block_resource_types": ["media"], "block_domains": ["hotjar.com"]},
+      "ClientA": {"block_resource_types": ["media", "image"], "allow_domains": ["cdn.clienta.com"], "capture": true}
+    }
+
+Lists are merged, not replaced: a client's ``block_domains`` and
+``block_resource_types`` add to the built-in and ``default`` ones. To lift an
+inherited block, list the domain in ``allow_domains`` or the resource type in
+``allow_resource_types``.
+
+Images and fonts are not blocked by default: NovaAct reads the page from
+screenshots, and icon fonts or image buttons are often what it clicks on.
+
+With ``"capture": true`` the filter records what it blocked together with any
+page errors and failed requests, so a policy that breaks a page can be traced
+back to the request it blocked. Set REQUEST_FILTERING=off to disable filtering.
+
+Note that Playwright disables the HTTP cache for a context once routing is on.
+"""
+
+import json
+import os
+import threading
+from urllib.parse import urlparse
+
+DEFAULT_BLOCKED_RESOURCE_TYPES = ["media"]
+
+# Analytics, tag managers, session recorders and ad networks
+DEFAULT_BLOCKED_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "adservice.google.com",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "fullstory.com",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "nr-data.net",
+    "newrelic.com",
+    "optimizely.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+]
+
+# Policy lists that accumulate across the built-ins, the "default" entry and the client entry
+MERGED_LIST_KEYS = ("block_resource_types", "block_domains", "allow_domains", "allow_resource_types")
+
+# Keep a bounded record in capture mode; a chatty page should not grow memory unbounded
+MAX_CAPTURED = 200
+
+_policies = None
+_policies_lock = threading.Lock()
+
+
+def _load_policies():
+    global _policies
+    with _policies_lock:
+        if _policies is None:
+            path = os.environ.get(
+                "REQUEST_POLICIES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "request_policies.json")
+            )
+            try:
+                with open(path) as f:
+                    _policies = json.load(f)
+            except FileNotFoundError:
+                _policies = {}
+        return _policies
+
+
+def get_request_policy(client_name):
+    """Return the effective policy for a client, or None when filtering is disabled."""
+    if os.environ.get("REQUEST_FILTERING", "on").lower() in ("off", "false", "0"):
+        return None
+    policies = _load_policies()
+    policy = {
+        "block_resource_types": DEFAULT_BLOCKED_RESOURCE_TYPES,
+        "block_domains": DEFAULT_BLOCKED_DOMAINS,
+        "allow_domains": [],
+        "allow_resource_types": [],
+        "capture": False,
+    }
+    for layer in (policies.get("default", {}), policies.get(client_name, {})):
+        for key, value in layer.items():
+            # Lists add to the built-in and default entries, so a client adding one domain keeps every default block
+            policy[key] = list(dict.fromkeys([*policy[key], *value])) if key in MERGED_LIST_KEYS else value
+    if policy.get("enabled") is False:
+        return None
+    return policy
+
+
+def _matches(host, domains):
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class RequestFilter:
+    def __init__(self, policy):
+        self.block_resource_types = frozenset(policy.get("block_resource_types", ())) - frozenset(policy.get("allow_resource_types", ()))
+        self.block_domains = tuple(policy.get("block_domains", ()))
+        self.allow_domains = tuple(policy.get("allow_domains", ()))
+        self.capture = bool(policy.get("capture"))
+        self.blocked_count = 0
+        self.allowed_count = 0
+        self.blocked = []
+        self.page_errors = []
+        self.failed_requests = []
+
+    def block_reason(self, url, resource_type):
+        host = (urlparse(url).hostname or "").lower()
+        if not host or _matches(host, self.allow_domains):
+            return None
+        if resource_type in self.block_resource_types:
+            return f"type:{resource_type}"
+        if _matches(host, self.block_domains):
+            return f"domain:{host}"
+        return None
+
+    def _handle(self, route, request):
+        reason = self.block_reason(request.url, request.resource_type)
+        if reason is None:
+            self.allowed_count += 1
+            route.continue_()
+            return
+        self.blocked_count += 1
+        if self.capture and len(self.blocked) < MAX_CAPTURED:
+            self.blocked.append({"url": request.url, "resource_type": request.resource_type, "reason": reason})
+        route.abort("blockedbyclient")
+
+    def install(self, page):
+        """Route every request of the page's browser context through this filter."""
+        page.context.route("**/*", self._handle)
+        if self.capture:
+            page.on("pageerror", self._on_page_error)
+            page.on("requestfailed", self._on_request_failed)
+
+    def _on_page_error(self, error):
+        if len(self.page_errors) < MAX_CAPTURED:
+            self.page_errors.append(str(error))
+
+    def _on_request_failed(self, request):
+        if len(self.failed_requests) < MAX_CAPTURED and request.failure != "net::ERR_BLOCKED_BY_CLIENT":
+            self.failed_requests.append({"url": request.url, "failure": request.failure})
+
+    def summary(self):
+        result = {"blocked": self.blocked_count, "allowed": self.allowed_count}
+        if self.capture:
+            blocked_hosts = {urlparse(entry["url"]).hostname for entry in self.blocked}
+            result.update({
+                "blocked_requests": self.blocked,
+                "page_errors": self.page_errors,
+                "failed_requests": self.failed_requests,
+                # Page errors that mention a blocked host are the likely breakages
+                "suspects": [error for error in self.page_errors if any(host and host in error for host in blocked_hosts)],
+            })
+        return result
+
+
+def install_request_filter(page, client_name):
+    """Install the client's policy on a page; returns the RequestFilter, or None if disabled."""
+    policy = get_request_policy(client_name)
+    if policy is None:
+        return None
+    request_filter = RequestFilter(policy)
+    request_filter.install(page)
+    return request_filter
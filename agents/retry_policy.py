@@ -0,0 +1,142 @@
+"""Classify failures as retryable or permanent, and retry cheap stages in place.
+
+The browser session is the expensive part of a job. When a later, cheap stage
+(S3 upload, presigning) hits a throttle or a 5xx, it is retried right there
+with backoff instead of failing the whole job. Every retry sleeps out of one
+per-job budget, so a bad S3 day cannot stretch a job indefinitely. Errors
+that will not go away on retry (access denied, missing bucket, bad input)
+fail at once.
+
+A job that never got a browser (no free slot, a remote session that would not
+start, NovaAct missing or misconfigured) fails with BrowserUnavailable, which
+classify_failure reports as status ``browser_unavailable``: the portal was
+never reached, so the circuit breaker does not count it against the portal.
+"""
+
+import random
+import re
+import time
+
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+
+RETRYABLE_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "ProvisionedThroughputExceededException",
+    "SlowDown",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "InternalError",
+    "InternalFailure",
+    "InternalServerError",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+}
+RETRYABLE_BOTOCORE_ERRORS = (ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError)
+# Chromium network errors that mean the portal or the link hiccuped, not that the page is wrong
+RETRYABLE_NET_ERRORS = (
+    "net::ERR_CONNECTION_RESET",
+    "net::ERR_CONNECTION_CLOSED",
+    "net::ERR_CONNECTION_REFUSED",
+    "net::ERR_CONNECTION_TIMED_OUT",
+    "net::ERR_TIMED_OUT",
+    "net::ERR_NETWORK_CHANGED",
+    "net::ERR_INTERNET_DISCONNECTED",
+    "net::ERR_NAME_NOT_RESOLVED",
+    "net::ERR_HTTP2_PROTOCOL_ERROR",
+)
+
+
+class BrowserUnavailable(Exception):
+    """No browser could be set up for the job; nothing was sent to the portal."""
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def is_retryable(error):
+    """True when the same call could succeed if made again shortly."""
+    if isinstance(error, BrowserUnavailable):
+        return error.retryable
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+        return code in RETRYABLE_ERROR_CODES or status == 429 or status >= 500
+    if isinstance(error, RETRYABLE_BOTOCORE_ERRORS):
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # Playwright, requests and boto3 transfer errors are matched by name so none has to be imported here
+    name = type(error).__name__
+    if name == "S3UploadFailedError":
+        # upload_file wraps the S3 ClientError; classify the wrapped error, or its code in the message
+        cause = error.__cause__ or error.__context__
+        if cause is not None:
+            return is_retryable(cause)
+        match = re.search(r"An error occurred \((\w+)\)", str(error))
+        return bool(match) and match.group(1) in RETRYABLE_ERROR_CODES
+    if name in ("TimeoutError", "ConnectionError", "ReadTimeout", "ConnectTimeout", "ChunkedEncodingError"):
+        return True
+    message = str(error)
+    return any(net_error in message for net_error in RETRYABLE_NET_ERRORS)
+
+
+def classify_failure(error):
+    """(status, retryable) for an error that ended a job.
+
+    The status is ``browser_unavailable`` for BrowserUnavailable and ``error``
+    otherwise; both the job result and the circuit breaker use it.
+    """
+    status = "browser_unavailable" if isinstance(error, BrowserUnavailable) else "error"
+    return status, is_retryable(error)
+
+
+class RetryBudget:
+    """Seconds of retry sleep a job may still spend, shared by all of its stages."""
+
+    def __init__(self, seconds=60):
+        self.remaining = seconds
+
+    def take(self, delay):
+        delay = min(delay, self.remaining)
+        self.remaining -= delay
+        return delay
+
+
+def retry_call(fn, *args, description="call", budget=None, max_attempts=4, base_delay=0.5, max_delay=8, console=None, **kwargs):
+    """Call fn(*args, **kwargs), retrying retryable errors with exponential backoff and full jitter.
+
+    Args:
+        fn: Callable to run
+        description: Stage name used in log lines
+        budget: RetryBudget shared with the job's other stages; no retries once it is spent
+        max_attempts: Attempts including the first
+    Returns:
+        fn's return value
+    Raises:
+        The last error, when it is permanent, attempts run out or the budget is spent
+    """
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_attempts or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            if budget is not None:
+                if budget.remaining <= 0:
+                    raise
+                delay = budget.take(delay)
+            if console:
+                console.print(f"[yellow]{description} failed ({repr(e)}), retry {attempt}/{max_attempts - 1} in {delay:.1f}s[/yellow]")
+            time.sleep(delay)
@@ -0,0 +1,92 @@
+"""Step-by-step NovaAct execution with checkpoints.
+
+Instead of one large prompt, a task can be a list of steps (for example the
+``steps:`` list of a prompt template). After each successful step the page URL
+and cookies are checkpointed; a failed step is retried from the last
+checkpoint, so a failure late in the task costs one step rather than the
+whole session.
+"""
+
+from rich.console import Console
+
+STEP_PROMPT_PREFIX = """You are a helpful Web UI automation assistant.
+SYSTEM PROMPT:
+- Perform ONLY the step below, then return.
+- YOU SHOULD NEVER REPEAT THE SAME ACTION MORE THAN ONCE.
+- After clicked on download, even if the page looks like it does not change, immediately return ACTION COMPLETE !!!!!
+- YOU SHOULD NEVER DISPLAY the password in plan task during execution.
+
+"""
+
+
+def step_prompt(step, context=None):
+    """Prompt for one step; context carries the task's login details and constraints to every step."""
+    prompt = STEP_PROMPT_PREFIX
+    if context:
+        prompt += f"TASK CONTEXT (applies to every step; do not perform the other steps it lists):\n\n{context}\n\n"
+    return f"{prompt}STEP:\n\n{step}"
+
+
+class StepFailed(Exception):
+    def __init__(self, step_index, step, attempts, error, completed):
+        super().__init__(f"Step {step_index} failed after {attempts} attempt(s): {error!r}")
+        self.step_index = step_index
+        self.step = step
+        self.attempts = attempts
+        self.error = error
+        self.completed = completed
+
+
+def capture_checkpoint(page):
+    """Snapshot what is needed to resume from the current page: its URL and cookies."""
+    return {"url": page.url, "cookies": page.context.cookies()}
+
+
+def restore_checkpoint(page, checkpoint):
+    """Return the browser to a checkpoint, skipping the reload if it is already there."""
+    page.context.add_cookies(checkpoint["cookies"])
+    if page.url != checkpoint["url"]:
+        page.goto(checkpoint["url"], wait_until="domcontentloaded")
+
+
+def run_steps(nova_act, steps, max_attempts=3, console=None, trace=None, context=None):
+    """Run steps in order, retrying only the failing step from the last checkpoint.
+
+    Args:
+        nova_act: Started NovaAct instance
+        steps: List of step instructions
+        max_attempts: Attempts per step before giving up
+        trace: Optional TraceBuffer that receives a snapshot after every attempt
+        context: Task instruction (login details, constraints such as "Only download
+            PDF files.") sent with every step
+    Returns:
+        List of per-step results ({"step", "attempts", "response"})
+    Raises:
+        StepFailed when a step exhausts its attempts
+    """
+    console = console or Console()
+    checkpoint = capture_checkpoint(nova_act.page)
+    completed = []
+
+    for step_index, step in enumerate(steps, start=1):
+        for attempt in range(1, max_attempts + 1):
+            try:
+                console.print(f"[cyan]Step {step_index}/{len(steps)} (attempt {attempt}/{max_attempts})[/cyan]")
+                result = nova_act.act(step_prompt(step, context))
+                if trace:
+                    trace.snapshot(nova_act.page, f"step-{step_index}")
+                checkpoint = capture_checkpoint(nova_act.page)
+                completed.append({"step": step_index, "attempts": attempt, "response": getattr(result, "response", None)})
+                break
+            except Exception as e:
+                console.print(f"[yellow]Step {step_index} attempt {attempt} failed: {repr(e)}[/yellow]")
+                if trace:
+                    trace.snapshot(nova_act.page, f"step-{step_index}-failed-{attempt}")
+                if attempt == max_attempts:
+                    raise StepFailed(step_index, step, attempt, e, completed)
+                try:
+                    restore_checkpoint(nova_act.page, checkpoint)
+                except Exception as restore_error:
+                    console.print(f"[yellow]Could not restore checkpoint: {repr(restore_error)}[/yellow]")
+
+    return completed
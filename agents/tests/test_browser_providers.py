@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("rich")
+
+from browser_providers import AgentCoreBrowserPool, LocalBrowserProvider, get_browser_provider
+from retry_policy import BrowserUnavailable
+
+
+def test_local_slot_is_released_when_the_job_raises():
+    provider = LocalBrowserProvider(max_browsers=1, slot_timeout=0)
+    with pytest.raises(RuntimeError):
+        with provider.acquire():
+            raise RuntimeError("portal crashed")
+    with provider.acquire() as options:
+        assert options == {"headless": True}
+
+
+def test_local_slots_are_capped():
+    provider = LocalBrowserProvider(max_browsers=2, slot_timeout=0)
+    with provider.acquire(), provider.acquire():
+        with pytest.raises(BrowserUnavailable) as unavailable:
+            with provider.acquire():
+                pass
+    assert unavailable.value.retryable
+
+
+class FakeClient:
+    def __init__(self, number):
+        self.number = number
+        self.stopped = False
+        self.signed = 1
+
+    def generate_ws_headers(self):
+        self.signed += 1
+        return f"wss://browser/{self.number}", {"Authorization": f"signed-{self.signed}"}
+
+    def stop(self):
+        self.stopped = True
+
+
+class FakePool(AgentCoreBrowserPool):
+    """Pool whose sessions are FakeClients, started on demand by the test."""
+
+    def __init__(self, *args, **kwargs):
+        self.started = []
+        self.release_starts = threading.Event()
+        self.release_starts.set()
+        super().__init__("us-east-1", *args, **kwargs)
+
+    def _start_session(self):
+        self.release_starts.wait(5)
+        client = FakeClient(len(self.started))
+        self.started.append(client)
+        now = time.monotonic()
+        return {"client": client, "ws_url": f"wss://browser/{client.number}", "headers": {},
+                "signed_at": now, "started_at": now}
+
+    def settle(self):
+        deadline = time.monotonic() + 5
+        while self._starting and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+def test_pool_keeps_at_most_size_sessions_idle_or_starting():
+    pool = FakePool(size=2)
+    pool.settle()
+    assert len(pool.started) == 2
+    # Extra replenish calls while the pool is full start nothing
+    pool._replenish()
+    pool._replenish()
+    pool.settle()
+    assert len(pool.started) == 2 and pool._idle.qsize() == 2
+
+
+def test_pool_does_not_overshoot_while_starts_are_in_flight():
+    pool = FakePool(size=2)
+    pool.settle()
+    pool.release_starts.clear()
+    with pool.acquire(), pool.acquire():
+        # Both idle sessions were taken; one replacement each is starting, no more
+        assert pool._starting == 2
+        pool._replenish()
+        assert pool._starting == 2
+        pool.release_starts.set()
+    pool.settle()
+    assert len(pool.started) == 4 and pool._idle.qsize() == 2
+
+
+def test_used_session_is_stopped_and_never_reused():
+    pool = FakePool(size=1)
+    pool.settle()
+    with pytest.raises(RuntimeError):
+        with pool.acquire() as options:
+            first = pool.started[0]
+            assert options["cdp_endpoint_url"] == "wss://browser/0"
+            raise RuntimeError("portal crashed")
+    assert first.stopped
+    pool.settle()
+    with pool.acquire() as options:
+        assert options["cdp_endpoint_url"] == "wss://browser/1"
+
+
+def test_stale_idle_session_is_replaced_and_old_headers_are_resigned():
+    pool = FakePool(size=1, header_ttl=0, max_idle=1800)
+    pool.settle()
+    stale = pool._idle.get_nowait()
+    stale["started_at"] -= 3600
+    pool._idle.put(stale)
+    with pool.acquire() as options:
+        assert stale["client"].stopped
+        assert options["cdp_endpoint_url"] != stale["ws_url"]
+        assert options["cdp_headers"]["Authorization"].startswith("signed-")
+
+
+def test_failed_session_start_raises_browser_unavailable():
+    class BrokenPool(FakePool):
+        def _start_session(self):
+            raise RuntimeError("quota exceeded")
+
+    pool = BrokenPool(size=1)
+    pool.settle()
+    with pytest.raises(BrowserUnavailable):
+        with pool.acquire():
+            pass
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_browser_provider("remote")
+
+
+def test_session_exposes_the_client_for_a_viewer():
+    pool = FakePool(size=1)
+    pool.settle()
+    with pool.session() as (client, options):
+        assert options["cdp_endpoint_url"] == f"wss://browser/{client.number}"
+    assert client.stopped
@@ -0,0 +1,62 @@
+import pytest
+
+from circuit_breaker import CircuitBreaker, LocalCircuitStore
+
+KEY = "portal.example.com|ClientA"
+
+
+def _open_circuit():
+    breaker = CircuitBreaker(LocalCircuitStore(), failure_threshold=1, cooldown=0)
+    breaker.record(KEY, success=False)
+    return breaker
+
+
+def test_only_one_probe_at_a_time():
+    breaker = _open_circuit()
+    assert breaker.allow(KEY)[:2] == (True, True)
+    assert breaker.allow(KEY)[0] is False
+
+
+def test_released_probe_lets_the_next_job_probe():
+    breaker = _open_circuit()
+    assert breaker.allow(KEY)[:2] == (True, True)
+    # The probe ended throttled or with an S3 error
+    assert breaker.release(KEY) == "half_open"
+    assert breaker.allow(KEY)[:2] == (True, True)
+
+
+def test_release_leaves_a_closed_circuit_alone():
+    breaker = CircuitBreaker(LocalCircuitStore())
+    assert breaker.release(KEY) == "closed"
+    assert breaker.allow(KEY) == (True, False, 0)
+
+
+def test_browser_slot_timeout_leaves_the_circuit_closed():
+    pytest.importorskip("botocore")
+    pytest.importorskip("rich")
+    from browser_providers import LocalBrowserProvider
+    from retry_policy import BrowserUnavailable, classify_failure
+
+    provider = LocalBrowserProvider(max_browsers=1, slot_timeout=0)
+    breaker = CircuitBreaker(LocalCircuitStore(), failure_threshold=1)
+    with provider.acquire():
+        for _ in range(3):
+            with pytest.raises(BrowserUnavailable) as timed_out:
+                with provider.acquire():
+                    pass
+            status, retryable = classify_failure(timed_out.value)
+            assert (status, retryable) == ("browser_unavailable", True)
+            breaker.record_outcome(KEY, status)
+    assert breaker.allow(KEY) == (True, False, 0)
+
+
+def test_portal_failure_still_opens_the_circuit():
+    breaker = CircuitBreaker(LocalCircuitStore(), failure_threshold=1)
+    assert breaker.record_outcome(KEY, "error") == "open"
+
+
+def test_neutral_probe_outcome_releases_the_probe():
+    breaker = _open_circuit()
+    assert breaker.allow(KEY)[:2] == (True, True)
+    assert breaker.record_outcome(KEY, "browser_unavailable", probe=True) == "half_open"
+    assert breaker.allow(KEY)[:2] == (True, True)
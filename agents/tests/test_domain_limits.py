@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from domain_limits import DomainBusy, DomainLimiter, LocalLimitStore, _take, domain_of
+
+LIMITS = {"rate_per_minute": 6, "burst": 2, "max_concurrent": 5, "lease_seconds": 60}
+
+
+def _take_all(state, limits, now, count):
+    waits = []
+    for index in range(count):
+        state, wait = _take(state, limits, f"lease{now}-{index}", now)
+        waits.append(wait)
+    return state, waits
+
+
+def test_burst_then_wait_for_the_next_token():
+    state, waits = _take_all({}, LIMITS, now=0, count=3)
+    # Two tokens in the burst, then one token every 10s at 6 per minute
+    assert waits[:2] == [0, 0]
+    assert waits[2] == pytest.approx(10)
+
+
+def test_tokens_refill_with_time_up_to_the_burst():
+    state, _ = _take_all({}, LIMITS, now=0, count=2)
+    state, wait = _take(state, LIMITS, "later", 5)
+    assert wait == pytest.approx(5)
+    state, wait = _take(state, LIMITS, "later", 10)
+    assert wait == 0
+    # A long idle period never banks more than the burst
+    state, waits = _take_all(state, LIMITS, now=1000, count=3)
+    assert waits[:2] == [0, 0] and waits[2] > 0
+
+
+def test_concurrency_cap_counts_only_live_leases():
+    limits = {**LIMITS, "rate_per_minute": None, "max_concurrent": 1}
+    state, wait = _take({}, limits, "first", 0)
+    assert wait == 0
+    _, wait = _take(state, limits, "second", 30)
+    assert wait > 0
+    # The first lease expired with a container that never released it
+    _, wait = _take(state, limits, "second", 61)
+    assert wait == 0
+
+
+def test_slot_times_out_while_the_domain_is_full(monkeypatch):
+    monkeypatch.setattr("domain_limits.POLL_INTERVAL", 0.01)
+    limiter = DomainLimiter(LocalLimitStore(), {"default": {"rate_per_minute": None, "max_concurrent": 1}})
+    with limiter.slot("https://www.portal.example.com/login"):
+        with pytest.raises(DomainBusy) as busy:
+            with limiter.slot("https://portal.example.com/reports", timeout=0.05):
+                pass
+    assert busy.value.domain == "portal.example.com"
+    # Other domains have their own cap
+    with limiter.slot("https://other.example.com", timeout=0):
+        pass
+
+
+def test_released_slot_wakes_a_waiting_job():
+    limiter = DomainLimiter(LocalLimitStore(), {"default": {"rate_per_minute": None, "max_concurrent": 1}})
+    entered = []
+    with limiter.slot("https://portal.example.com"):
+        waiter = threading.Thread(target=lambda: entered.append(limiter.slot("https://portal.example.com", 5).__enter__()))
+        waiter.start()
+        waiter.join(0.1)
+        assert not entered
+    waiter.join(5)
+    assert entered == ["portal.example.com"]
+
+
+def test_domain_limits_override_the_default():
+    limiter = DomainLimiter(LocalLimitStore(), {
+        "default": {"max_concurrent": 3},
+        "portal.example.com": {"max_concurrent": 1},
+    })
+    assert limiter.limits_for("portal.example.com")["max_concurrent"] == 1
+    assert limiter.limits_for("other.example.com")["max_concurrent"] == 3
+    assert limiter.limits_for("other.example.com")["rate_per_minute"] == 6
+
+
+def test_domain_of_ignores_www_and_case():
+    assert domain_of("https://WWW.Portal.Example.com:8443/login") == "portal.example.com"
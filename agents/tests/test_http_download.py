@@ -0,0 +1,206 @@
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from http_download import DownloadCapture, IncompleteDownload, stream_to_s3
+
+
+class FakeDownload:
+    def __init__(self, url, suggested_filename):
+        self.url = url
+        self.suggested_filename = suggested_filename
+        self.cancelled = False
+        self.saved_to = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def save_as(self, path):
+        if self.cancelled:
+            raise RuntimeError("canceled")
+        self.saved_to = path
+
+
+class FakeContext:
+    def on(self, event, handler):
+        pass
+
+
+class FakePage:
+    def __init__(self):
+        self.context = FakeContext()
+        self.handlers = []
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    def start_download(self, download):
+        for handler in self.handlers:
+            handler(download)
+
+
+def test_http_mode_cancels_the_browser_copy():
+    page = FakePage()
+    capture = DownloadCapture(cancel=True)
+    capture.install(page)
+    download = FakeDownload("https://portal.example.com/export?id=1", "report.pdf")
+    page.start_download(download)
+    assert capture.captured and capture.url == download.url
+    assert download.cancelled
+
+
+def test_http_mode_fallback_download_is_saved_by_the_browser(tmp_path):
+    page = FakePage()
+    capture = DownloadCapture(cancel=True)
+    capture.install(page)
+    # The main act triggered no download, so the agent falls back to expect_download and re-clicks
+    assert not capture.captured
+    capture.keep_browser_downloads()
+    download = FakeDownload("https://portal.example.com/export?id=1", "report.pdf")
+    page.start_download(download)
+
+    download.save_as(str(tmp_path / "report.pdf"))
+    assert not download.cancelled
+    assert download.saved_to == str(tmp_path / "report.pdf")
+    # The URL is still known, so a partial browser file can be finished over HTTP
+    assert capture.url == download.url
+
+
+class FakeResponse:
+    def __init__(self, headers, chunks, fail_after=None):
+        self.status_code = 200
+        self.headers = headers
+        self._chunks = chunks
+        self._fail_after = fail_after
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for index, chunk in enumerate(self._chunks):
+            if index == self._fail_after:
+                raise requests.ConnectionError("connection reset")
+            yield chunk
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def get(self, url, headers, stream, timeout):
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+
+class FakeS3:
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+        self.aborted = []
+
+    def get_object(self, Bucket, Key):
+        raise self.exceptions.NoSuchKey(Key)
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[Key] = Body
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        return {"ETag": f'"part{PartNumber}"'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(UploadId)
+
+
+def test_downloads_request_an_uncompressed_body():
+    session = FakeSession([FakeResponse({"Content-Type": "application/pdf"}, [b"x"], fail_after=0)] * 6)
+    with pytest.raises(requests.ConnectionError):
+        stream_to_s3(session, "https://portal.example.com/report.pdf", FakeS3(), "bucket", "key", max_resumes=0)
+    assert session.requests[0]["Accept-Encoding"] == "identity"
+
+
+def test_compressed_response_is_not_resumed(monkeypatch):
+    monkeypatch.setattr("http_download.time.sleep", lambda seconds: None)
+    s3 = FakeS3()
+    session = FakeSession([
+        FakeResponse({"Content-Type": "text/csv", "Content-Encoding": "gzip", "Content-Length": "10"},
+                     [b"a" * 4, b"b" * 4], fail_after=1),
+    ])
+    with pytest.raises(IncompleteDownload):
+        stream_to_s3(session, "https://portal.example.com/export.csv", s3, "bucket", "key", part_size=4)
+    # No Range request was made against the decoded offset, and the upload was not kept for a later resume
+    assert len(session.requests) == 1
+    assert s3.aborted == ["upload-1"]
+    assert not s3.objects
+
+
+class ProgressS3(FakeS3):
+    """FakeS3 that keeps progress records readable, as a retried job sees them."""
+
+    class Body:
+        def __init__(self, data):
+            self.data = data
+
+        def read(self):
+            return self.data
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        return {"Body": self.Body(self.objects[Key])}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.completed = Key
+        return {"ETag": '"done"'}
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": 8}
+
+
+def test_resume_after_midnight_finds_the_saved_progress(monkeypatch):
+    monkeypatch.setattr("http_download.time.sleep", lambda seconds: None)
+    s3 = ProgressS3()
+    url = "https://portal.example.com/report.pdf"
+    headers = {"Content-Type": "application/pdf", "Content-Length": "8", "ETag": '"v1"'}
+    first = FakeSession([FakeResponse(headers, [b"a" * 4, b"b" * 4], fail_after=1)])
+    with pytest.raises(requests.ConnectionError):
+        stream_to_s3(first, url, s3, "bucket", "downloaded-files/ClientA/2026/01/01/job1/report.pdf",
+                     part_size=4, max_resumes=0, job_id="job1")
+
+    resumed = FakeResponse({**headers, "Content-Range": "bytes 4-7/8"}, [b"b" * 4])
+    resumed.status_code = 206
+    second = FakeSession([resumed])
+    # The retry runs on the next day, so the agent offers a result key with a new date
+    result = stream_to_s3(second, url, s3, "bucket", "downloaded-files/ClientA/2026/01/02/job1/report.pdf",
+                          part_size=4, job_id="job1")
+    assert second.requests[0]["Range"] == "bytes=4-"
+    assert result["key"] == s3.completed == "downloaded-files/ClientA/2026/01/01/job1/report.pdf"
+    assert not s3.objects
+
+
+def test_http_error_closes_the_response():
+    class ErrorResponse(FakeResponse):
+        closed = False
+
+        def raise_for_status(self):
+            raise requests.HTTPError("403 Forbidden")
+
+        def close(self):
+            self.closed = True
+
+    response = ErrorResponse({"Content-Type": "application/pdf"}, [])
+    with pytest.raises(requests.HTTPError):
+        stream_to_s3(FakeSession([response]), "https://portal.example.com/report.pdf", FakeS3(), "bucket", "key")
+    assert response.closed
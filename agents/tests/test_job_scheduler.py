@@ -0,0 +1,344 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from job_scheduler import (
+    DEFAULT_PRIORITY,
+    AgentRuntimeDispatcher,
+    CronSchedule,
+    PermanentJobError,
+    Scheduler,
+    SQLiteQueue,
+    SQSQueue,
+    open_queue,
+)
+
+
+class FlakyQueue:
+    """Queue whose claim fails until told otherwise, then hands out one job."""
+
+    def __init__(self):
+        self.failing = True
+        self.jobs = [{"id": "job-1", "client_name": "ClientA", "payload": {}, "attempts": 1}]
+
+    def claim(self):
+        if self.failing:
+            raise sqlite3.OperationalError("database is locked")
+        return self.jobs.pop() if self.jobs else None
+
+    def complete(self, job):
+        pass
+
+
+def test_claim_error_does_not_leak_a_dispatch_slot():
+    queue = FlakyQueue()
+    scheduler = Scheduler(queue, [], dispatch=lambda job: None, max_concurrent=1)
+    for _ in range(2):
+        with pytest.raises(sqlite3.OperationalError):
+            scheduler.dispatch_ready()
+    queue.failing = False
+    # The only slot is still free
+    assert scheduler.dispatch_ready() == 1
+
+
+def test_claim_rolls_back_on_error(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = SQLiteQueue(path)
+    queue.enqueue("ClientA", {})
+    # Another process's trigger makes the claim's UPDATE fail inside its transaction
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("CREATE TRIGGER refuse_claims BEFORE UPDATE ON jobs BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+    with pytest.raises(sqlite3.IntegrityError):
+        queue.claim()
+    other.execute("DROP TRIGGER refuse_claims")
+    other.close()
+    # A transaction left open would make the next BEGIN IMMEDIATE fail
+    assert queue.enqueue("ClientB", {})
+    assert queue.claim()["client_name"] == "ClientA"
+
+
+def test_runtime_invocation_is_never_retried_by_botocore():
+    dispatcher = AgentRuntimeDispatcher("arn:aws:bedrock-agentcore:us-east-1:123456789012:runtime/agent", "client-context",
+                                        region="us-east-1")
+    assert dispatcher.agentcore.meta.config.retries["total_max_attempts"] == 1
+
+
+class ConditionalCheckFailedException(Exception):
+    pass
+
+
+class FakePendingTable:
+    """DynamoDB table stand-in that evaluates the two conditions SQSQueue uses."""
+
+    class meta:
+        class client:
+            class exceptions:
+                ConditionalCheckFailedException = ConditionalCheckFailedException
+
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, Item, ConditionExpression, ExpressionAttributeValues):
+        current = self.items.get(Item["client_name"])
+        if current and current["expires_at"] >= ExpressionAttributeValues[":now"]:
+            raise ConditionalCheckFailedException()
+        self.items[Item["client_name"]] = Item
+
+    def delete_item(self, Key, ConditionExpression, ExpressionAttributeValues):
+        current = self.items.get(Key["client_name"])
+        if not current or current["job_id"] != ExpressionAttributeValues[":job"]:
+            raise ConditionalCheckFailedException()
+        del self.items[Key["client_name"]]
+
+
+class FakeDynamoDB:
+    def __init__(self, table):
+        self.table = table
+
+    def Table(self, name):
+        return self.table
+
+
+class FakeSQS:
+    def __init__(self):
+        self.messages = []
+        self.deleted = []
+
+    def send_message(self, **message):
+        self.messages.append(message)
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages, AttributeNames):
+        pending = [message for message in self.messages if message["QueueUrl"] == QueueUrl]
+        if not pending:
+            return {}
+        message = pending[0]
+        self.messages.remove(message)
+        return {"Messages": [{"Body": message["MessageBody"], "ReceiptHandle": "r1",
+                              "Attributes": {"ApproximateReceiveCount": "1"}}]}
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self.deleted.append(ReceiptHandle)
+
+
+@pytest.fixture
+def sqs_queue(monkeypatch):
+    table, sqs = FakePendingTable(), FakeSQS()
+    monkeypatch.setattr("job_scheduler.boto3.client", lambda service, region_name=None: sqs)
+    monkeypatch.setattr("job_scheduler.boto3.resource", lambda service, region_name=None: FakeDynamoDB(table))
+    # A standard queue: SQS itself would accept any number of messages per client
+    return SQSQueue(["https://sqs.us-east-1.amazonaws.com/123456789012/jobs"], "pending-jobs", region="us-east-1")
+
+
+def test_sqs_queue_keeps_one_pending_job_per_client(sqs_queue):
+    job_id = sqs_queue.enqueue("ClientA", {})
+    assert job_id
+    assert sqs_queue.enqueue("ClientA", {}) is None
+    assert sqs_queue.enqueue("ClientB", {})
+    job = sqs_queue.claim()
+    assert job["id"] == job_id
+    # Still running: no second job for the client
+    assert sqs_queue.enqueue("ClientA", {}) is None
+    sqs_queue.complete(job)
+    assert sqs_queue.enqueue("ClientA", {})
+
+
+def test_sqs_queue_clears_the_marker_when_send_fails(sqs_queue):
+    def send_message(**message):
+        raise ConnectionError("endpoint unreachable")
+
+    sqs_queue.sqs.send_message = send_message
+    with pytest.raises(ConnectionError):
+        sqs_queue.enqueue("ClientA", {})
+    sqs_queue.sqs.send_message = FakeSQS().send_message
+    assert sqs_queue.enqueue("ClientA", {})
+
+
+def test_sqs_queue_reclaims_an_expired_marker(sqs_queue, monkeypatch):
+    assert sqs_queue.enqueue("ClientA", {})
+    later = time.time() + sqs_queue.pending_ttl + 1
+    monkeypatch.setattr("job_scheduler.time.time", lambda: later)
+    assert sqs_queue.enqueue("ClientA", {})
+
+
+def test_sqs_queue_requires_a_pending_table():
+    with pytest.raises(ValueError):
+        open_queue("sqs:https://sqs.us-east-1.amazonaws.com/123456789012/jobs")
+
+
+# CronSchedule
+
+def test_cron_fields_accept_lists_ranges_and_steps():
+    cron = CronSchedule("*/15 8-10,18 1 */6 1-5")
+    assert cron.values["minute"] == {0, 15, 30, 45}
+    assert cron.values["hour"] == {8, 9, 10, 18}
+    assert cron.values["day"] == {1}
+    assert cron.values["month"] == {1, 7}
+    assert cron.values["weekday"] == {1, 2, 3, 4, 5}
+
+
+def test_cron_weekday_seven_is_sunday():
+    assert CronSchedule("0 0 * * 7").values["weekday"] == {0}
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "*/0 * * * *", "5-1 * * * *"])
+def test_cron_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_cron_restricted_day_fields_match_either_day():
+    cron = CronSchedule("0 2 1 * 1")
+    # 2026-06-01 is a Monday, 2026-06-08 a Monday, 2026-07-01 a Wednesday
+    assert cron.matches(datetime(2026, 6, 8, 2, 0))
+    assert cron.matches(datetime(2026, 7, 1, 2, 0))
+    assert not cron.matches(datetime(2026, 6, 9, 2, 0))
+    assert not cron.matches(datetime(2026, 6, 8, 2, 1))
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.enqueued = []
+
+    def enqueue(self, client_name, payload, priority=DEFAULT_PRIORITY, dedupe_id=None):
+        self.enqueued.append((client_name, priority, dedupe_id))
+        return f"job-{len(self.enqueued)}"
+
+
+def _next_minutes(count):
+    """The next count whole minutes after now; the scheduler starts counting at construction."""
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    return [now + timedelta(minutes=offset) for offset in range(1, count + 1)]
+
+
+def test_enqueue_due_fires_each_elapsed_minute_once():
+    queue = RecordingQueue()
+    scheduler = Scheduler(queue, [{"client_name": "ClientA", "cron": "* * * * *", "priority": 7}], dispatch=None)
+    minutes = _next_minutes(3)
+    scheduler.enqueue_due(minutes[-1] + timedelta(seconds=30))
+    assert queue.enqueued == [("ClientA", 7, f"ClientA:{minute:%Y%m%d%H%M}") for minute in minutes]
+    # The same minute again fires nothing
+    scheduler.enqueue_due(minutes[-1] + timedelta(seconds=50))
+    assert len(queue.enqueued) == 3
+
+
+def test_enqueue_due_evaluates_the_schedule_timezone():
+    queue = RecordingQueue()
+    fire_at = _next_minutes(2)[1].astimezone(ZoneInfo("America/New_York"))
+    schedules = [
+        {"client_name": "ClientB", "cron": f"{fire_at.minute} {fire_at.hour} * * *", "timezone": "America/New_York"},
+        # The same wall-clock time in UTC is a different moment, unless New York is on UTC
+        {"client_name": "ClientC", "cron": f"{fire_at.minute} {fire_at.hour} * * *"},
+    ]
+    scheduler = Scheduler(queue, schedules, dispatch=None)
+    scheduler.enqueue_due(fire_at + timedelta(minutes=1))
+    assert [client for client, _, _ in queue.enqueued] == ["ClientB"]
+
+
+# SQLiteQueue
+
+def test_sqlite_queue_keeps_one_pending_job_per_client(tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "jobs.db"))
+    first = queue.enqueue("ClientA", {"download_mode": "http"})
+    assert first
+    assert queue.enqueue("ClientA", {}) is None
+    job = queue.claim()
+    assert job["id"] == first and job["payload"] == {"download_mode": "http"}
+    # Running counts as pending too
+    assert queue.enqueue("ClientA", {}) is None
+    queue.complete(job)
+    assert queue.get(first)["status"] == "done"
+    assert queue.enqueue("ClientA", {})
+
+
+def test_sqlite_queue_claims_highest_priority_then_oldest(tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue("Low", {}, priority=1)
+    queue.enqueue("HighOld", {}, priority=9)
+    queue.enqueue("HighNew", {}, priority=9)
+    queue.enqueue("Default", {})
+    assert [queue.claim()["client_name"] for _ in range(4)] == ["HighOld", "HighNew", "Default", "Low"]
+    assert queue.claim() is None
+
+
+def test_sqlite_queue_holds_a_retried_job_until_its_backoff_passes(tmp_path, monkeypatch):
+    queue = SQLiteQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.enqueue("ClientA", {})
+    queue.retry(queue.claim(), 120, "RuntimeError('portal down')")
+    assert queue.claim() is None
+    later = time.time() + 121
+    monkeypatch.setattr("job_scheduler.time.time", lambda: later)
+    job = queue.claim()
+    assert job["id"] == job_id and job["attempts"] == 2
+
+
+def test_sqlite_queue_requeues_jobs_left_running(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    SQLiteQueue(path).enqueue("ClientA", {})
+    SQLiteQueue(path).claim()
+    restarted = SQLiteQueue(path)
+    assert restarted.requeue_running() == 1
+    assert restarted.claim()["client_name"] == "ClientA"
+
+
+# Scheduler
+
+def test_retry_delay_is_full_jitter_under_a_doubling_cap(monkeypatch):
+    scheduler = Scheduler(RecordingQueue(), [], dispatch=None, base_delay=60, max_delay=300)
+    monkeypatch.setattr("job_scheduler.random.uniform", lambda low, high: (low, high))
+    assert [scheduler.retry_delay(attempts) for attempts in (1, 2, 3, 4)] == [(0, 60), (0, 120), (0, 240), (0, 300)]
+
+
+def _run_until_settled(scheduler, queue, job_id, timeout=5):
+    """Dispatch until the job is done or failed, the way run_forever's ticks would."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        scheduler.dispatch_ready()
+        job = queue.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job still {queue.get(job_id)['status']}")
+
+
+def test_failing_job_is_retried_then_marked_failed(tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.enqueue("ClientA", {})
+    attempts = []
+
+    def dispatch(job):
+        attempts.append(job["attempts"])
+        raise RuntimeError("portal down")
+
+    scheduler = Scheduler(queue, [], dispatch, max_attempts=3, base_delay=0)
+    job = _run_until_settled(scheduler, queue, job_id)
+    assert attempts == [1, 2, 3]
+    assert job["status"] == "failed" and job["attempts"] == 3
+    assert "portal down" in job["last_error"]
+    # A failed job no longer blocks the client
+    assert queue.enqueue("ClientA", {})
+
+
+def test_permanent_error_fails_without_retrying(tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.enqueue("ClientA", {})
+    attempts = []
+
+    def dispatch(job):
+        attempts.append(job["attempts"])
+        raise PermanentJobError("No credentials for ClientA")
+
+    job = _run_until_settled(Scheduler(queue, [], dispatch, max_attempts=3, base_delay=0), queue, job_id)
+    assert attempts == [1]
+    assert job["status"] == "failed" and job["last_error"] == "No credentials for ClientA"
+
+
+def test_successful_job_is_completed(tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.enqueue("ClientA", {})
+    job = _run_until_settled(Scheduler(queue, [], lambda job: None), queue, job_id)
+    assert job["status"] == "done" and job["attempts"] == 1
@@ -0,0 +1,32 @@
+import pytest
+
+from prompt_templates import get_template, job_variables
+
+PROMPT = """---
+version: 2
+variables: username, password, account_id
+---
+Login using username: {username} and password: {password}. Open account {account_id} and download the statement.
+"""
+
+
+def test_payload_variables_are_rendered():
+    payload = {"variables": {"account_id": "ACC-42"}}
+    rendered = get_template(PROMPT).render(**job_variables(payload, username="user", password="secret",
+                                                           weburl="https://portal.example.com", client_name="ClientA"))
+    assert "Open account ACC-42" in rendered.instruction
+
+
+def test_missing_payload_variable_is_reported():
+    with pytest.raises(ValueError, match="account_id"):
+        get_template(PROMPT).render(**job_variables({}, username="user", password="secret"))
+
+
+def test_builtins_take_precedence_over_payload_variables():
+    values = job_variables({"variables": {"username": "other", "account_id": "ACC-42"}}, username="user")
+    assert values == {"username": "user", "account_id": "ACC-42"}
+
+
+def test_variables_must_be_an_object():
+    with pytest.raises(ValueError):
+        job_variables({"variables": ["account_id"]}, username="user")
@@ -0,0 +1,32 @@
+import json
+
+import request_filters
+from request_filters import DEFAULT_BLOCKED_DOMAINS, RequestFilter, get_request_policy
+
+
+def _use_policies(monkeypatch, tmp_path, policies):
+    path = tmp_path / "request_policies.json"
+    path.write_text(json.dumps(policies))
+    monkeypatch.setenv("REQUEST_POLICIES_FILE", str(path))
+    monkeypatch.setattr(request_filters, "_policies", None)
+
+
+def test_client_block_domains_extend_the_defaults(monkeypatch, tmp_path):
+    _use_policies(monkeypatch, tmp_path, {
+        "default": {"block_domains": ["tracker.example.net"]},
+        "ClientA": {"block_domains": ["chat.example.com"], "block_resource_types": ["image"]},
+    })
+    policy = get_request_policy("ClientA")
+    assert set(DEFAULT_BLOCKED_DOMAINS) <= set(policy["block_domains"])
+    assert {"tracker.example.net", "chat.example.com"} <= set(policy["block_domains"])
+    assert set(policy["block_resource_types"]) == {"media", "image"}
+
+
+def test_inherited_blocks_can_be_lifted(monkeypatch, tmp_path):
+    _use_policies(monkeypatch, tmp_path, {
+        "ClientA": {"allow_domains": ["hotjar.com"], "allow_resource_types": ["media"]},
+    })
+    request_filter = RequestFilter(get_request_policy("ClientA"))
+    assert request_filter.block_reason("https://script.hotjar.com/x.js", "script") is None
+    assert request_filter.block_reason("https://portal.example.com/intro.mp4", "media") is None
+    assert request_filter.block_reason("https://www.google-analytics.com/ga.js", "script") == "domain:www.google-analytics.com"
@@ -0,0 +1,86 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from botocore.exceptions import ClientError
+
+import result_manifest
+
+
+class FakeS3:
+    """In-memory bucket with the conditional-write semantics of S3 put_object."""
+
+    class exceptions:
+        ClientError = ClientError
+
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+        self.versions = 0
+        self.before_put = None
+
+    def _etag(self):
+        self.versions += 1
+        return f'"{self.versions}"'
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        body, etag = self.objects[Key]
+        return {"Body": io.BytesIO(body), "ETag": etag}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, IfMatch=None, IfNoneMatch=None):
+        if self.before_put:
+            hook, self.before_put = self.before_put, None
+            hook(Key)
+        current = self.objects.get(Key)
+        if (IfMatch and (current is None or current[1] != IfMatch)) or (IfNoneMatch and current is not None):
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "PutObject")
+        self.objects[Key] = (Body, self._etag())
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete["Objects"]:
+            self.objects.pop(item["Key"], None)
+
+    def get_paginator(self, name):
+        bucket = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                yield {"Contents": [{"Key": key} for key in sorted(bucket.objects) if key.startswith(Prefix)]}
+
+        return Paginator()
+
+
+def _entry(job_id, second):
+    return {
+        "client_name": "ClientA",
+        "key": f"downloaded-files/ClientA/2026/10/19/{job_id}/report.pdf",
+        "job_id": job_id,
+        "downloaded_at": f"2026-10-19T10:00:{second:02d}+00:00",
+    }
+
+
+def test_concurrent_compactions_keep_every_entry():
+    s3 = FakeS3()
+    for second in range(3):
+        result_manifest.record_download(s3, "bucket", _entry(f"job{second}", second), compact_every=100)
+
+    def rival_compaction(key):
+        # Another job records a download and compacts after this one has read the manifest
+        if key.endswith("manifest.jsonl"):
+            result_manifest.record_download(s3, "bucket", _entry("job9", 9), compact_every=1)
+
+    s3.before_put = rival_compaction
+    result_manifest.compact(s3, "bucket", "ClientA")
+
+    body = s3.objects["manifests/ClientA/manifest.jsonl"][0].decode("utf-8")
+    job_ids = [json.loads(line)["job_id"] for line in body.splitlines()]
+    assert job_ids == ["job0", "job1", "job2", "job9"]
+    assert not any("/deltas/" in key for key in s3.objects)
+    assert result_manifest.read_manifest(s3, "bucket", "ClientA")[-1]["job_id"] == "job9"
@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("boto3")
+
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import ClientError
+
+from retry_policy import BrowserUnavailable, RetryBudget, classify_failure, is_retryable, retry_call
+
+SLOW_DOWN = "An error occurred (SlowDown) when calling the UploadPart operation: Please reduce your request rate."
+
+
+def _upload_failed(code, message):
+    """Raise S3UploadFailedError the way boto3's upload_file does, from inside the ClientError handler."""
+    try:
+        raise ClientError({"Error": {"Code": code, "Message": message}}, "UploadPart")
+    except ClientError as e:
+        try:
+            raise S3UploadFailedError(f"Failed to upload report.pdf to bucket/key: {e}")
+        except S3UploadFailedError as wrapped:
+            return wrapped
+
+
+def test_upload_failed_slow_down_is_retryable():
+    assert is_retryable(_upload_failed("SlowDown", "Please reduce your request rate."))
+
+
+def test_upload_failed_message_only_is_classified():
+    assert is_retryable(S3UploadFailedError(f"Failed to upload report.pdf to bucket/key: {SLOW_DOWN}"))
+    assert not is_retryable(S3UploadFailedError(
+        "Failed to upload report.pdf to bucket/key: An error occurred (AccessDenied) when calling the PutObject operation"
+    ))
+
+
+def test_upload_failed_access_denied_is_permanent():
+    assert not is_retryable(_upload_failed("AccessDenied", "Access Denied"))
+
+
+def test_retry_call_retries_upload_failed_slow_down(monkeypatch):
+    monkeypatch.setattr("retry_policy.time.sleep", lambda seconds: None)
+    calls = []
+
+    def upload_file(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise _upload_failed("SlowDown", "Please reduce your request rate.")
+        return None
+
+    retry_call(upload_file, "report.pdf", "bucket", "key", budget=RetryBudget(10))
+    assert len(calls) == 2
+
+
+def test_browser_unavailable_keeps_its_own_retry_flag():
+    assert classify_failure(BrowserUnavailable("No local browser slot free after 600s", retryable=True)) == ("browser_unavailable", True)
+    assert classify_failure(BrowserUnavailable("Failed to import NovaAct")) == ("browser_unavailable", False)
+
+
+def test_other_failures_are_classified_as_errors():
+    assert classify_failure(ConnectionError("reset")) == ("error", True)
+    assert classify_failure(ValueError("Element not found")) == ("error", False)
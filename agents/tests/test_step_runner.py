@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("rich")
+
+from step_runner import run_steps
+
+
+class FakeContext:
+    def cookies(self):
+        return []
+
+
+class FakePage:
+    url = "https://portal.example.com/home"
+    context = FakeContext()
+
+
+class FakeNovaAct:
+    def __init__(self):
+        self.page = FakePage()
+        self.prompts = []
+
+    def act(self, prompt):
+        self.prompts.append(prompt)
+
+
+def test_every_step_prompt_carries_the_task_context():
+    nova_act = FakeNovaAct()
+    steps = ["Open the Documents tab", "Download the most recent statement"]
+    context = "Login using username: user and password: secret. Then Only download PDF files."
+    run_steps(nova_act, steps, context=context)
+
+    assert len(nova_act.prompts) == 2
+    for prompt, step in zip(nova_act.prompts, steps):
+        assert context in prompt
+        assert prompt.endswith(step)
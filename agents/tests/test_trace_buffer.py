@@ -0,0 +1,98 @@
+import json
+
+from trace_buffer import TraceBuffer
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[Key] = Body
+
+
+class FakeRequest:
+    method = "GET"
+    resource_type = "document"
+    failure = "net::ERR_ABORTED"
+
+    def __init__(self, url):
+        self.url = url
+
+
+class FakeResponse:
+    status = 200
+
+    def __init__(self, url):
+        self.url = url
+        self.request = FakeRequest(url)
+
+
+class FakePage:
+    url = "https://portal.example.com/reports?session=secret"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def screenshot(self, type, quality):
+        if self.fail:
+            raise RuntimeError("target closed")
+        return b"jpeg"
+
+    def content(self):
+        return "<html>report</html>"
+
+
+def test_ring_keeps_the_most_recent_events():
+    buffer = TraceBuffer(max_events=3)
+    for number in range(5):
+        buffer._on_response(FakeResponse(f"https://portal.example.com/page{number}"))
+    assert [event["url"] for event in buffer.events] == [
+        "https://portal.example.com/page2",
+        "https://portal.example.com/page3",
+        "https://portal.example.com/page4",
+    ]
+    assert buffer.dropped_events == 2
+
+
+def test_snapshots_are_bounded_and_never_raise():
+    buffer = TraceBuffer(max_snapshots=2)
+    for label in ("login", "search", "download"):
+        buffer.snapshot(FakePage(), label)
+    buffer.snapshot(FakePage(fail=True), "after-task")
+    assert [snap["label"] for snap in buffer.snapshots] == ["search", "download"]
+    assert buffer.events[-1]["type"] == "snapshot_failed"
+
+
+def test_recorded_urls_drop_the_query_string():
+    buffer = TraceBuffer()
+    buffer._on_request_failed(FakeRequest("https://portal.example.com/export?token=secret"))
+    buffer.snapshot(FakePage(), "login")
+    assert buffer.events[0]["url"] == "https://portal.example.com/export"
+    assert buffer.snapshots[0]["url"] == "https://portal.example.com/reports"
+
+
+def test_trace_is_kept_only_on_failure_or_request():
+    buffer = TraceBuffer()
+    assert buffer.flush_reason("error") is None
+    buffer._on_page_error(RuntimeError("boom"))
+    assert buffer.flush_reason("success") is None
+    assert buffer.flush_reason("error") == "failure"
+    assert buffer.flush_reason("success", requested=True) == "requested"
+
+
+def test_flush_writes_index_events_and_snapshots():
+    buffer = TraceBuffer(max_events=2)
+    for number in range(3):
+        buffer._on_response(FakeResponse(f"https://portal.example.com/page{number}"))
+    buffer.snapshot(FakePage(), "after-task")
+    s3 = FakeS3()
+    prefix = buffer.flush(s3, "bucket", "ClientA", buffer.flush_reason("error"))
+    assert prefix.startswith("traces/ClientA/")
+    index = json.loads(s3.objects[f"{prefix}index.json"])
+    assert index["reason"] == "failure"
+    assert index["dropped_events"] == 2 and index["events"] == 2
+    assert index["snapshots"][0]["label"] == "after-task"
+    assert s3.objects[f"{prefix}snapshot-01.jpg"] == b"jpeg"
+    events = s3.objects[f"{prefix}events.jsonl"].decode("utf-8").splitlines()
+    assert [json.loads(line)["type"] for line in events] == ["response", "snapshot"]
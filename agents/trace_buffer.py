@@ -0,0 +1,126 @@
+"""Low-overhead trace capture for NovaAct sessions.
+
+Every session keeps a bounded ring buffer of recent network events, console
+messages and page errors, plus a few screenshots and DOM snapshots taken at
+step boundaries. Nothing leaves memory unless the job fails or the payload
+sets ``trace``; only then is the buffer written to S3 under
+``traces/{client_name}/...``. Older entries are dropped as new ones arrive,
+so a long session costs the same as a short one.
+
+Query strings are stripped from recorded URLs and no headers or cookies are
+kept, so the trace does not carry session tokens.
+"""
+
+import json
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+MAX_EVENTS = 500
+MAX_SNAPSHOTS = 5
+# DOM snapshots of heavy portals can run to megabytes; the head of the page is what matters
+MAX_DOM_BYTES = 256 * 1024
+SCREENSHOT_QUALITY = 40
+
+
+def _strip_query(url):
+    return url.split("?", 1)[0][:500]
+
+
+class TraceBuffer:
+    def __init__(self, max_events=MAX_EVENTS, max_snapshots=MAX_SNAPSHOTS):
+        self.events = deque(maxlen=max_events)
+        self.snapshots = deque(maxlen=max_snapshots)
+        self.dropped_events = 0
+        self.started_at = time.time()
+
+    def _record(self, event_type, **fields):
+        if len(self.events) == self.events.maxlen:
+            self.dropped_events += 1
+        self.events.append({"t": round(time.time() - self.started_at, 3), "type": event_type, **fields})
+
+    def install(self, page):
+        """Listen to the page's browser context for network events and the page for console output."""
+        context = page.context
+        context.on("response", self._on_response)
+        context.on("requestfailed", self._on_request_failed)
+        page.on("console", self._on_console)
+        page.on("pageerror", self._on_page_error)
+        page.on("framenavigated", self._on_navigated)
+
+    def _on_response(self, response):
+        request = response.request
+        self._record("response", method=request.method, url=_strip_query(response.url),
+                     status=response.status, resource_type=request.resource_type)
+
+    def _on_request_failed(self, request):
+        self._record("requestfailed", method=request.method, url=_strip_query(request.url),
+                     failure=request.failure, resource_type=request.resource_type)
+
+    def _on_console(self, message):
+        if message.type in ("error", "warning"):
+            self._record("console", level=message.type, text=message.text[:1000])
+
+    def _on_page_error(self, error):
+        self._record("pageerror", text=str(error)[:1000])
+
+    def _on_navigated(self, frame):
+        if frame.parent_frame is None:
+            self._record("navigation", url=_strip_query(frame.url))
+
+    def snapshot(self, page, label):
+        """Keep a screenshot and DOM snapshot of the page; failures here never fail the job."""
+        try:
+            screenshot = page.screenshot(type="jpeg", quality=SCREENSHOT_QUALITY)
+            dom = page.content().encode("utf-8")[:MAX_DOM_BYTES]
+        except Exception as e:
+            self._record("snapshot_failed", label=label, error=repr(e))
+            return
+        self.snapshots.append({
+            "label": label,
+            "t": round(time.time() - self.started_at, 3),
+            "url": _strip_query(page.url),
+            "screenshot": screenshot,
+            "dom": dom,
+        })
+        self._record("snapshot", label=label)
+
+    def flush_reason(self, status, requested=False):
+        """Why the buffer should be written out after a job, or None to drop it.
+
+        Args:
+            status: The job's final status
+            requested: Whether the payload asked for the trace
+        """
+        if not (self.events or self.snapshots):
+            return None
+        if requested:
+            return "requested"
+        return None if status == "success" else "failure"
+
+    def flush(self, s3_client, bucket, client_name, reason):
+        """Write the buffer to S3 and return the trace prefix.
+
+        Args:
+            s3_client: boto3 S3 client
+            bucket: Destination bucket
+            client_name: Client identifier, used in the key
+            reason: Why the trace was kept ("failure" or "requested")
+        Returns:
+            S3 prefix holding index.json, events.jsonl and the snapshots
+        """
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        prefix = f"traces/{client_name}/{stamp}-{uuid.uuid4().hex[:8]}/"
+        index = {"reason": reason, "dropped_events": self.dropped_events, "events": len(self.events), "snapshots": []}
+        for number, snap in enumerate(self.snapshots, start=1):
+            base = f"{prefix}snapshot-{number:02d}"
+            s3_client.put_object(Bucket=bucket, Key=f"{base}.jpg", Body=snap["screenshot"], ContentType="image/jpeg")
+            s3_client.put_object(Bucket=bucket, Key=f"{base}.html", Body=snap["dom"], ContentType="text/html")
+            index["snapshots"].append({"label": snap["label"], "t": snap["t"], "url": snap["url"], "key": base})
+        events = "\n".join(json.dumps(event) for event in self.events)
+        s3_client.put_object(Bucket=bucket, Key=f"{prefix}events.jsonl", Body=events.encode("utf-8"),
+                             ContentType="application/x-ndjson")
+        s3_client.put_object(Bucket=bucket, Key=f"{prefix}index.json", Body=json.dumps(index).encode("utf-8"),
+                             ContentType="application/json")
+        return prefix
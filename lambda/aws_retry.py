@@ -0,0 +1,29 @@
+"""Retry settings and error classification shared by the Lambda handlers.
+
+Clients built with RETRY_CONFIG retry throttles, 5xx and connection errors
+inside botocore with backoff. Whatever still fails is classified with
+is_retryable, and responses carry a 'retryable' flag so callers can tell a
+throttle worth retrying later from a missing secret that will never appear.
+"""
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+
+# Lambda time is billed; keep retries short and let the caller retry the invocation
+RETRY_CONFIG = Config(retries={'max_attempts': 4, 'mode': 'standard'}, connect_timeout=5, read_timeout=10)
+
+RETRYABLE_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'TooManyRequestsException', 'RequestLimitExceeded',
+    'SlowDown', 'RequestTimeout', 'InternalError', 'InternalFailure', 'InternalServerError',
+    'InternalServiceError', 'ServiceUnavailable', 'ServiceUnavailableException',
+}
+
+
+def is_retryable(error):
+    """True when the same call could succeed if made again shortly."""
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code', '')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        return code in RETRYABLE_ERROR_CODES or status == 429 or status >= 500
+    if isinstance(error, (ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError)):
+        return True
+    return getattr(error, 'retryable', False)
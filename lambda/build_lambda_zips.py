@@ -0,0 +1,89 @@
+"""Build deployment zips for the Lambda handlers in this folder.
+
+Handlers import sibling modules (aws_retry, secret_backends, result_manifest,
+other handlers) by bare name, so a zip holding only the handler file fails at
+import time. Each zip gets the handler plus every sibling module it imports,
+directly or through another sibling. Entries carry a fixed timestamp, so an
+unchanged handler rebuilds to an identical zip.
+
+result_manifest.py is a copy of agents/result_manifest.py; the build refuses
+to run while the two differ.
+
+Usage:
+    python lambda/build_lambda_zips.py                      # every handler, into lambda/dist
+    python lambda/build_lambda_zips.py lambda_credentials lambda_get_prompt_file \\
+        --out samples/first_stage_development
+"""
+import argparse
+import ast
+import os
+import sys
+import zipfile
+
+LAMBDA_DIR = os.path.dirname(os.path.abspath(__file__))
+SHARED_COPIES = {'result_manifest.py': os.path.join(LAMBDA_DIR, '..', 'agents', 'result_manifest.py')}
+# 1980-01-01, the earliest time a zip entry can carry
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+
+
+def handler_names():
+    return sorted(name[:-3] for name in os.listdir(LAMBDA_DIR) if name.startswith('lambda_') and name.endswith('.py'))
+
+
+def sibling_imports(module):
+    """Modules in this folder that module imports directly."""
+    with open(os.path.join(LAMBDA_DIR, f'{module}.py')) as f:
+        tree = ast.parse(f.read())
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    return {name for name in names if os.path.isfile(os.path.join(LAMBDA_DIR, f'{name}.py'))}
+
+
+def bundle_modules(handler):
+    """The handler and every sibling module it needs, in a stable order."""
+    needed, pending = set(), [handler]
+    while pending:
+        module = pending.pop()
+        if module not in needed:
+            needed.add(module)
+            pending.extend(sibling_imports(module))
+    return sorted(needed)
+
+
+def check_shared_copies():
+    for name, source in SHARED_COPIES.items():
+        with open(os.path.join(LAMBDA_DIR, name), 'rb') as copy, open(source, 'rb') as original:
+            if copy.read() != original.read():
+                raise SystemExit(f'lambda/{name} differs from {os.path.relpath(source, os.path.dirname(LAMBDA_DIR))}; copy it over first')
+
+
+def build_zip(handler, out_dir):
+    path = os.path.join(out_dir, f'{handler}.zip')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        for module in bundle_modules(handler):
+            info = zipfile.ZipInfo(f'{module}.py', date_time=ZIP_TIMESTAMP)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            with open(os.path.join(LAMBDA_DIR, f'{module}.py'), 'rb') as f:
+                bundle.writestr(info, f.read())
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bundle Lambda handlers with the sibling modules they import')
+    parser.add_argument('handlers', nargs='*', help='Handler modules to build (default: every lambda_*.py)')
+    parser.add_argument('--out', default=os.path.join(LAMBDA_DIR, 'dist'), help='Directory for the zips')
+    args = parser.parse_args()
+
+    unknown = set(args.handlers) - set(handler_names())
+    if unknown:
+        sys.exit(f"Unknown handler(s): {', '.join(sorted(unknown))}")
+    check_shared_copies()
+    os.makedirs(args.out, exist_ok=True)
+    for handler in args.handlers or handler_names():
+        path = build_zip(handler, args.out)
+        print(f"{path}: {', '.join(f'{module}.py' for module in bundle_modules(handler))}")
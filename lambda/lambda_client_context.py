@@ -0,0 +1,78 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+# Reuses the clients and warm caches of lambda_credentials.py and lambda_get_prompt_file.py;
+# build_lambda_zips.py bundles them, with secret_backends.py and aws_retry.py, into this handler's zip.
+from aws_retry import is_retryable
+from lambda_credentials import get_client_credentials
+from lambda_get_prompt_file import get_prompt_file
+
+# One pool per container; each invocation issues exactly two concurrent reads
+_executor = ThreadPoolExecutor(max_workers=2)
+
+
+def lambda_handler(event, context):
+    """Lambda function to retrieve everything a job needs for a client in one call
+    Args:
+        event: Contains client_name, and optional version_id to pin the prompt file
+    Returns:
+        Dictionary with credentials, web URL, file_info and prompt content
+    """
+    client_name = event.get('client_name')
+    if not client_name:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'success': False,
+                'error': 'Missing required parameter: client_name',
+                'message': 'Please provide a client_name in the event'
+            })
+        }
+
+    # SSM and S3 reads run concurrently, so the call costs the slower of the two
+    credentials_future = _executor.submit(get_client_credentials, client_name)
+    prompt_future = _executor.submit(get_prompt_file, client_name, event.get('version_id'))
+
+    errors = []
+    retryable = []
+    try:
+        credentials = credentials_future.result()
+    except Exception as e:
+        credentials = None
+        errors.append(str(e))
+        retryable.append(is_retryable(e))
+
+    prompt = prompt_future.result()
+    if not prompt['success']:
+        errors.append(prompt['error'])
+        retryable.append(prompt.get('retryable', False))
+
+    if errors:
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'success': False,
+                'error': '; '.join(errors),
+                # Only worth retrying when every failure was transient
+                'retryable': all(retryable),
+                'message': f'Failed to retrieve context for {client_name}'
+            })
+        }
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'success': True,
+            'client_name': client_name,
+            'credentials': credentials,
+            'weburl': credentials['starting_url'],
+            'file_info': credentials['file_info'],
+            'prompt': {
+                'file_key': prompt['file_key'],
+                'etag': prompt['etag'],
+                'version_id': prompt['version_id'],
+                'file_content': prompt['file_content']
+            },
+            'message': f'Successfully retrieved credentials and prompt file for {client_name}'
+        })
+    }
@@ -1,15 +1,182 @@
 import json
+import os
+import threading
+from collections import OrderedDict
 import boto3
 from botocore.exceptions import ClientError
+from aws_retry import RETRY_CONFIG, is_retryable
+from concurrent.futures import ThreadPoolExecutor
+
+BUCKET_NAME = 'bedrock-web-automation-dev-storage'
+
+# Bounded pool for batch requests; S3 GETs are I/O bound so a handful of
+# threads saturates a small Lambda without blowing its memory.
+MAX_WORKERS = int(os.environ.get('PROMPT_FETCH_WORKERS', '8'))
+# Clients handled per invocation when a batch is paginated with next_token
+DEFAULT_PAGE_SIZE = int(os.environ.get('PROMPT_PAGE_SIZE', '25'))
+# Synchronous Lambda responses are capped at 6 MB; keep headroom for the envelope
+MAX_RESPONSE_BYTES = int(os.environ.get('PROMPT_MAX_RESPONSE_BYTES', str(5 * 1024 * 1024)))
+# Prompt objects above this size are reported but not inlined
+MAX_INLINE_BYTES = int(os.environ.get('PROMPT_MAX_INLINE_BYTES', str(1024 * 1024)))
+# Cached prompts kept per warm container; least recently used entries are dropped first
+MAX_CACHE_ENTRIES = int(os.environ.get('PROMPT_CACHE_ENTRIES', '128'))
+
+# Created once per container so warm invocations reuse the connection pool
+s3 = boto3.client('s3', config=RETRY_CONFIG)
+
+# (client_name, version_id) -> last successful entry, in LRU order; revalidated with If-None-Match
+_prompt_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_prompt_file(client_name, version_id=None):
+    """Fetch the prompt object for one client.
+    Args:
+        client_name: Client whose prompt-files/{client_name}/prompt.txt to read
+        version_id: Optional S3 object version to pin the prompt template to
+    Returns:
+        Dictionary with file_key, etag, version_id and file_content, or an error entry
+    """
+    file_key = f'prompt-files/{client_name}/prompt.txt'
+    request = {'Bucket': BUCKET_NAME, 'Key': file_key}
+    if version_id:
+        request['VersionId'] = version_id
+    cache_key = (client_name, version_id)
+    with _cache_lock:
+        cached = _prompt_cache.get(cache_key)
+        if cached:
+            _prompt_cache.move_to_end(cache_key)
+    if cached:
+        request['IfNoneMatch'] = cached['etag']
+    try:
+        response = s3.get_object(**request)
+        content_length = response.get('ContentLength', 0)
+        if content_length > MAX_INLINE_BYTES:
+            response['Body'].close()
+            return {
+                'success': False,
+                'file_key': file_key,
+                'etag': response.get('ETag'),
+                'size': content_length,
+                'error': f"File '{file_key}' is {content_length} bytes, above the {MAX_INLINE_BYTES} byte inline limit"
+            }
+        entry = {
+            'success': True,
+            'file_key': file_key,
+            'etag': response.get('ETag'),
+            'version_id': response.get('VersionId'),
+            'size': content_length,
+            'file_content': response['Body'].read().decode('utf-8')
+        }
+        with _cache_lock:
+            _prompt_cache[cache_key] = entry
+            _prompt_cache.move_to_end(cache_key)
+            while len(_prompt_cache) > MAX_CACHE_ENTRIES:
+                _prompt_cache.popitem(last=False)
+        return entry
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        if cached and error_code in ('304', 'NotModified'):
+            # Unchanged since the last read: S3 sent no body, serve the cached copy
+            return cached
+        if error_code == 'NoSuchKey':
+            error_msg = f"File '{file_key}' not found in bucket '{BUCKET_NAME}'"
+        elif error_code == 'AccessDenied':
+            error_msg = f"Access denied to file '{file_key}' - check IAM permissions"
+        else:
+            error_msg = f"Error retrieving file '{file_key}': {str(e)}"
+        return {'success': False, 'file_key': file_key, 'error': error_msg, 'retryable': is_retryable(e)}
+    except Exception as e:
+        return {'success': False, 'file_key': file_key, 'error': str(e), 'retryable': is_retryable(e)}
+
+
+def _parse_next_token(next_token):
+    """Offset encoded in next_token; anything but a non-negative integer is rejected."""
+    if next_token is None or next_token == '':
+        return 0
+    if isinstance(next_token, bool) or not isinstance(next_token, (int, str)) or not str(next_token).isdigit():
+        raise ValueError(f"Invalid next_token: {next_token!r}")
+    return int(next_token)
+
+
+def get_prompt_files(client_names, next_token=None, page_size=DEFAULT_PAGE_SIZE):
+    """Fetch prompt objects for many clients concurrently.
+    Args:
+        client_names: List of client names
+        next_token: Offset returned by a previous call, if paginating
+        page_size: Maximum number of clients fetched in this call
+    Returns:
+        Tuple of (per-client result map, next_token or None)
+    """
+    start = _parse_next_token(next_token)
+    page = client_names[start:start + page_size]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(page)))) as executor:
+        fetched = list(executor.map(get_prompt_file, page))
+
+    # Keep the response under the Lambda payload limit; anything that does not
+    # fit is left for the next page rather than truncated.
+    files = {}
+    response_bytes = 0
+    for offset, (client_name, entry) in enumerate(zip(page, fetched)):
+        entry_bytes = len(json.dumps(entry))
+        if files and response_bytes + entry_bytes > MAX_RESPONSE_BYTES:
+            return files, str(start + offset)
+        files[client_name] = entry
+        response_bytes += entry_bytes
+
+    end = start + len(page)
+    return files, (str(end) if end < len(client_names) else None)
+
 
 def lambda_handler(event, context):
     """
-    Lambda function to retrieve a prompt file from S3 based on client_name.
+    Lambda function to retrieve prompt files from S3 based on client_name.
     Args:
-        event: Contains client_name for which to retrieve the file
+        event: Contains client_name (and optional version_id) for a single file,
+               or client_names (list) with optional next_token and page_size for a batch
     Returns:
         Dictionary with file content or error message
     """
+    client_names = event.get('client_names')
+    if client_names is not None:
+        if not isinstance(client_names, list) or not all(isinstance(name, str) and name for name in client_names):
+            return {
+                'statusCode': 400,
+                'body': json.dumps({
+                    'success': False,
+                    'error': 'Invalid parameter: client_names',
+                    'message': 'client_names must be a list of non-empty strings'
+                })
+            }
+
+        # Preserve order while dropping duplicates so each object is read once
+        client_names = list(dict.fromkeys(client_names))
+        try:
+            page_size = max(1, int(event.get('page_size', DEFAULT_PAGE_SIZE)))
+            files, next_token = get_prompt_files(client_names, event.get('next_token'), page_size)
+        except (TypeError, ValueError):
+            return {
+                'statusCode': 400,
+                'body': json.dumps({
+                    'success': False,
+                    'error': 'Invalid parameter: next_token or page_size',
+                    'message': 'next_token must be a non-negative integer and page_size an integer'
+                })
+            }
+
+        failed = [name for name, entry in files.items() if not entry['success']]
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'success': not failed,
+                'files': files,
+                'failed': failed,
+                'next_token': next_token,
+                'message': f'Retrieved {len(files) - len(failed)} of {len(files)} prompt files from S3'
+            })
+        }
+
     client_name = event.get('client_name')
     if not client_name:
         return {
@@ -17,51 +184,30 @@ def lambda_handler(event, context):
             'body': json.dumps({
                 'success': False,
                 'error': 'Missing required parameter: client_name',
-                'message': 'Please provide a client_name in the event'
+                'message': 'Please provide a client_name or client_names in the event'
             })
         }
 
-    bucket_name = 'bedrock-web-automation-dev-storage'
-    file_key = f'prompt-files/{client_name}/prompt.txt'
-
-    s3 = boto3.client('s3')
-
-    try:
-        response = s3.get_object(Bucket=bucket_name, Key=file_key)
-        file_content = response['Body'].read().decode('utf-8')
-
+    result = get_prompt_file(client_name, event.get('version_id'))
+    if result['success']:
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'success': True,
                 'client_name': client_name,
-                'file_key': file_key,
-                'file_content': file_content,
+                'file_key': result['file_key'],
+                'etag': result['etag'],
+                'version_id': result['version_id'],
+                'file_content': result['file_content'],
                 'message': f'Successfully retrieved file for {client_name} from S3'
             })
         }
-    except ClientError as e:
-        error_code = e.response['Error']['Code']
-        if error_code == 'NoSuchKey':
-            error_msg = f"File '{file_key}' not found in bucket '{bucket_name}'"
-        elif error_code == 'AccessDenied':
-            error_msg = f"Access denied to file '{file_key}' - check IAM permissions"
-        else:
-            error_msg = f"Error retrieving file '{file_key}': {str(e)}"
-        return {
-            'statusCode': 500,
-            'body': json.dumps({
-                'success': False,
-                'error': error_msg,
-                'message': f'Failed to retrieve file for {client_name} from S3'
-            })
-        }
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'body': json.dumps({
-                'success': False,
-                'error': str(e),
-                'message': f'Unexpected error retrieving file for {client_name} from S3'
-            })
-        }
\ No newline at end of file
+    return {
+        'statusCode': 500,
+        'body': json.dumps({
+            'success': False,
+            'error': result['error'],
+            'retryable': result.get('retryable', False),
+            'message': f'Failed to retrieve file for {client_name} from S3'
+        })
+    }
@@ -0,0 +1,175 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+import boto3
+from botocore.config import Config
+from aws_retry import RETRY_CONFIG
+# Copy of agents/result_manifest.py, bundled by build_lambda_zips.py
+from result_manifest import latest_document, read_manifest
+
+BUCKET_NAME = 'bedrock-web-automation-dev-storage'
+
+# SigV4 URLs cannot outlive 7 days, and never outlive the credentials that signed them
+MAX_EXPIRES_IN = int(os.environ.get('PRESIGN_MAX_EXPIRES_IN', str(7 * 24 * 3600)))
+# Cap for temporary credentials whose expiry is not exposed (e.g. the Lambda role's environment credentials)
+UNKNOWN_EXPIRY_MAX_EXPIRES_IN = int(os.environ.get('PRESIGN_UNKNOWN_EXPIRY_MAX_EXPIRES_IN', '3600'))
+DEFAULT_EXPIRES_IN = int(os.environ.get('PRESIGN_DEFAULT_EXPIRES_IN', '3600'))
+# Keys signed per call; signing is local, the cap only bounds the response size
+MAX_KEYS = int(os.environ.get('PRESIGN_MAX_KEYS', '1000'))
+
+# Created once per container: credentials are resolved on first use and cached,
+# so signing a batch is pure computation with no call to S3 or STS
+boto_session = boto3.Session()
+s3 = boto_session.client(
+    's3',
+    region_name=os.environ.get('AWS_REGION'),
+    config=RETRY_CONFIG.merge(Config(signature_version='s3v4'))
+)
+
+
+def signing_lifetime():
+    """Seconds the signing credentials remain valid, capped at MAX_EXPIRES_IN."""
+    credentials = boto_session.get_credentials()
+    # Refreshes credentials that are close to expiry, so the lifetime below is current
+    frozen = credentials.get_frozen_credentials()
+    expiry = getattr(credentials, '_expiry_time', None)
+    if expiry is not None:
+        return max(0, min(MAX_EXPIRES_IN, int((expiry - datetime.now(timezone.utc)).total_seconds())))
+    if frozen.token:
+        return min(MAX_EXPIRES_IN, UNKNOWN_EXPIRY_MAX_EXPIRES_IN)
+    return MAX_EXPIRES_IN
+
+
+def manifest_keys(client_name, latest_only=False, limit=MAX_KEYS):
+    """Keys from the client's result manifest, newest first."""
+    if latest_only:
+        latest = latest_document(s3, BUCKET_NAME, client_name)
+        return [latest['key']] if latest else []
+    return [entry['key'] for entry in reversed(read_manifest(s3, BUCKET_NAME, client_name))][:limit]
+
+
+def prefix_keys(prefix, limit=MAX_KEYS):
+    keys = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix, PaginationConfig={'MaxItems': limit}):
+        keys.extend(item['Key'] for item in page.get('Contents', []))
+    return keys
+
+
+def presign_keys(keys, expires_in=DEFAULT_EXPIRES_IN):
+    """Sign GET URLs for many keys locally.
+    Args:
+        keys: Object keys in BUCKET_NAME
+        expires_in: URL lifetime in seconds
+    Returns:
+        Dictionary of key -> presigned URL
+    """
+    return {
+        key: s3.generate_presigned_url('get_object', Params={'Bucket': BUCKET_NAME, 'Key': key}, ExpiresIn=expires_in)
+        for key in keys
+    }
+
+
+def lambda_handler(event, context):
+    """Lambda function to refresh download links for a client in bulk
+    Args:
+        event: Contains client_name, and one of keys (list), source='manifest' (optionally
+               latest_only) or prefix (relative to the client's folder); optional
+               expires_in and limit
+    Returns:
+        Dictionary with key -> presigned URL for the requested documents, and the
+        effective expires_in/expires_at (never past the signing credentials' expiry)
+    """
+    client_name = event.get('client_name')
+    if not client_name:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'success': False,
+                'error': 'Missing required parameter: client_name',
+                'message': 'Please provide a client_name in the event'
+            })
+        }
+
+    try:
+        requested_expires_in = int(event.get('expires_in', DEFAULT_EXPIRES_IN))
+        limit = min(int(event.get('limit', MAX_KEYS)), MAX_KEYS)
+        if requested_expires_in <= 0 or limit <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'success': False,
+                'error': 'Invalid parameter: expires_in or limit',
+                'message': 'expires_in and limit must be positive integers'
+            })
+        }
+
+    if event.get('keys') is not None and not isinstance(event['keys'], list):
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'success': False,
+                'error': 'Invalid parameter: keys',
+                'message': 'keys must be a list of object keys'
+            })
+        }
+
+    client_prefix = f'downloaded-files/{client_name}/'
+    try:
+        if event.get('keys') is not None:
+            keys = event['keys'][:limit]
+        elif event.get('prefix') is not None:
+            keys = prefix_keys(client_prefix + event['prefix'].lstrip('/'), limit)
+        else:
+            keys = manifest_keys(client_name, latest_only=bool(event.get('latest_only')), limit=limit)
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'success': False,
+                'error': str(e),
+                'message': f'Failed to resolve documents for {client_name}'
+            })
+        }
+
+    # Callers may only sign their own client's downloads, never arbitrary bucket objects
+    rejected = [key for key in keys if not isinstance(key, str) or not key.startswith(client_prefix) or '..' in key]
+    if rejected:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'success': False,
+                'error': f'{len(rejected)} key(s) are outside {client_prefix}',
+                'message': 'Only keys under the client download folder can be signed'
+            })
+        }
+
+    # A URL stops working when the credentials that signed it expire, whatever its X-Amz-Expires says
+    expires_in = min(requested_expires_in, signing_lifetime())
+    if expires_in <= 0:
+        return {
+            'statusCode': 503,
+            'body': json.dumps({
+                'success': False,
+                'error': 'Signing credentials have expired',
+                'message': 'Retry the request once the credentials are refreshed',
+                'retryable': True
+            })
+        }
+    urls = presign_keys(keys, expires_in)
+    message = f'Signed {len(urls)} download URL(s) for {client_name}'
+    if expires_in < requested_expires_in:
+        message += f'; expiry shortened to {expires_in}s by the signing credentials'
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'success': True,
+            'client_name': client_name,
+            'expires_in': expires_in,
+            'expires_at': (datetime.now(timezone.utc) + timedelta(seconds=expires_in)).isoformat(timespec='seconds'),
+            'urls': urls,
+            'message': message
+        })
+    }
@@ -0,0 +1,181 @@
+"""Per-client manifest of downloaded documents.
+
+Files are stored under date-partitioned keys that include the job id, so a
+portal that always names its export ``report.pdf`` no longer overwrites the
+previous one::
+
+    downloaded-files/{client}/{YYYY}/{MM}/{DD}/{job_id}/{file_name}
+
+Every upload is recorded under ``manifests/{client}/``:
+
+- ``latest.json``: the newest entry; "latest document for client X" is one GET
+- ``deltas/{timestamp}-{job_id}.jsonl``: one small object per job, so
+  concurrent jobs never rewrite a shared file
+- ``manifest.jsonl``: compacted history; once ``COMPACT_EVERY`` deltas have
+  accumulated, the job that crosses the threshold folds them in
+
+Each entry holds key, file_name, size, sha256, etag, source_url (without its
+query string), job_id and downloaded_at.
+"""
+
+import json
+import re
+from datetime import datetime, timezone
+
+# Deltas written before the next job compacts them into manifest.jsonl
+COMPACT_EVERY = 20
+
+
+class ManifestConflict(Exception):
+    pass
+
+
+def manifest_prefix(client_name):
+    return f"manifests/{client_name}/"
+
+
+def result_key(client_name, job_id, file_name, now=None):
+    now = now or datetime.now(timezone.utc)
+    return f"downloaded-files/{client_name}/{now:%Y/%m/%d}/{job_id}/{file_name}"
+
+
+def _read_json(s3_client, bucket, key):
+    """Return (value, etag), or (None, None) when the object does not exist."""
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return None, None
+    return json.loads(response["Body"].read()), response["ETag"]
+
+
+def _conditional_put(s3_client, bucket, key, body, etag, content_type="application/json"):
+    """Write only if the object is unchanged since it was read (or still absent)."""
+    condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+    try:
+        s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType=content_type, **condition)
+    except s3_client.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] in ("PreconditionFailed", "ConditionalRequestConflict"):
+            raise ManifestConflict(key)
+        raise
+
+
+def record_download(s3_client, bucket, entry, compact_every=COMPACT_EVERY):
+    """Add one download to the client's manifest.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket: Bucket holding the files and the manifest
+        entry: Manifest entry; must include client_name, key, job_id and downloaded_at
+        compact_every: Deltas that trigger compaction
+    Returns:
+        Number of deltas not yet compacted
+    """
+    prefix = manifest_prefix(entry["client_name"])
+    # 2026-10-19T10:00:03+00:00 -> 20261019T100003, so delta keys sort by time
+    stamp = re.sub(r"[^0-9T]", "", entry["downloaded_at"])[:15]
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=f"{prefix}deltas/{stamp}-{entry['job_id']}.jsonl",
+        Body=(json.dumps(entry) + "\n").encode("utf-8"),
+        ContentType="application/x-ndjson",
+    )
+
+    # latest.json is read-compare-write with S3 conditional writes, so two jobs
+    # finishing together cannot leave the older one as "latest"
+    while True:
+        latest, etag = _read_json(s3_client, bucket, f"{prefix}latest.json")
+        pending = (latest or {}).get("pending_deltas", 0) + 1
+        newest = entry if not latest or entry["downloaded_at"] >= latest["entry"]["downloaded_at"] else latest["entry"]
+        try:
+            _conditional_put(s3_client, bucket, f"{prefix}latest.json",
+                             json.dumps({"entry": newest, "pending_deltas": pending}).encode("utf-8"), etag)
+            break
+        except ManifestConflict:
+            continue
+
+    if pending >= compact_every:
+        compact(s3_client, bucket, entry["client_name"])
+        return 0
+    return pending
+
+
+def _list_deltas(s3_client, bucket, client_name):
+    paginator = s3_client.get_paginator("list_objects_v2")
+    keys = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{manifest_prefix(client_name)}deltas/"):
+        keys.extend(item["Key"] for item in page.get("Contents", []))
+    return sorted(keys)
+
+
+def _read_jsonl(s3_client, bucket, key):
+    """Return (entries, etag), or ([], None) when the object does not exist."""
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return [], None
+    body = response["Body"].read().decode("utf-8")
+    return [json.loads(line) for line in body.splitlines() if line.strip()], response["ETag"]
+
+
+def read_manifest(s3_client, bucket, client_name):
+    """All entries for a client, oldest first: the compacted manifest plus pending deltas."""
+    manifest, _ = _read_jsonl(s3_client, bucket, f"{manifest_prefix(client_name)}manifest.jsonl")
+    entries = {item["key"]: item for item in manifest}
+    for key in _list_deltas(s3_client, bucket, client_name):
+        for item in _read_jsonl(s3_client, bucket, key)[0]:
+            entries[item["key"]] = item
+    return sorted(entries.values(), key=lambda item: item["downloaded_at"])
+
+
+def latest_document(s3_client, bucket, client_name):
+    """The newest manifest entry for a client, or None; a single GET."""
+    latest, _ = _read_json(s3_client, bucket, f"{manifest_prefix(client_name)}latest.json")
+    return latest["entry"] if latest else None
+
+
+def compact(s3_client, bucket, client_name):
+    """Fold pending deltas into manifest.jsonl and delete them.
+
+    The manifest is written only if it is unchanged since it was read, so two
+    jobs compacting at once cannot drop each other's entries; the loser
+    re-reads and folds whatever is still pending. Deltas are deleted only after
+    the manifest that contains them is written, so a crash in between leaves
+    duplicates (merged by key on read) rather than gaps.
+    """
+    prefix = manifest_prefix(client_name)
+    while True:
+        delta_keys = _list_deltas(s3_client, bucket, client_name)
+        manifest, manifest_etag = _read_jsonl(s3_client, bucket, f"{prefix}manifest.jsonl")
+        entries = {item["key"]: item for item in manifest}
+        folded = []
+        for key in delta_keys:
+            items, _ = _read_jsonl(s3_client, bucket, key)
+            # A delta gone since listing was deleted by a compaction whose manifest this write must match
+            if items:
+                folded.append(key)
+            for item in items:
+                entries[item["key"]] = item
+        body = "".join(json.dumps(item) + "\n" for item in sorted(entries.values(), key=lambda item: item["downloaded_at"]))
+        try:
+            _conditional_put(s3_client, bucket, f"{prefix}manifest.jsonl", body.encode("utf-8"), manifest_etag,
+                             content_type="application/x-ndjson")
+            break
+        except ManifestConflict:
+            continue
+    for start in range(0, len(folded), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket, Delete={"Objects": [{"Key": key} for key in folded[start:start + 1000]], "Quiet": True}
+        )
+
+    while True:
+        latest, etag = _read_json(s3_client, bucket, f"{prefix}latest.json")
+        if not latest:
+            break
+        # Deltas written while compacting are still pending; keep them counted
+        latest["pending_deltas"] = max(0, latest.get("pending_deltas", 0) - len(folded))
+        try:
+            _conditional_put(s3_client, bucket, f"{prefix}latest.json", json.dumps(latest).encode("utf-8"), etag)
+            break
+        except ManifestConflict:
+            continue
+    return len(entries)
@@ -0,0 +1,194 @@
+"""Secret backends for client website credentials.
+
+Each backend returns the same three values for a client (login, password and
+web URL) together with a version string. VersionedSecretCache keeps the last
+values per client and only re-reads the secret when the backend reports a new
+version, so rotation is picked up without a full secret read on every job.
+
+Select a backend with the SECRET_BACKEND environment variable:
+    ssm             {client}_Login / {client}_Password / {client}_WebURL parameters (default)
+    secretsmanager  one JSON secret {SECRET_PREFIX}{client} with login, password, weburl keys
+    file            JSON file at LOCAL_SECRETS_FILE, {client: {login, password, weburl}}, for tests
+"""
+import json
+import os
+import threading
+import time
+import boto3
+from botocore.exceptions import ClientError
+from aws_retry import RETRY_CONFIG, is_retryable
+
+
+class SecretNotFound(Exception):
+    pass
+
+
+class SecretBackendError(Exception):
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class SSMBackend:
+    label = 'AWS_SSM_Parameter_Store'
+
+    def __init__(self, client=None):
+        self.ssm = client or boto3.client('ssm', config=RETRY_CONFIG)
+
+    def parameter_names(self, client_name):
+        return [f"{client_name}_Login", f"{client_name}_Password", f"{client_name}_WebURL"]
+
+    def _get_parameters(self, client_name, decrypt):
+        names = self.parameter_names(client_name)
+        try:
+            response = self.ssm.get_parameters(Names=names, WithDecryption=decrypt)
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in ('AccessDenied', 'AccessDeniedException'):
+                raise SecretBackendError(f"Access denied to parameters {', '.join(names)} - check IAM permissions")
+            raise SecretBackendError(f"Error retrieving parameters {', '.join(names)}: {str(e)}", retryable=is_retryable(e))
+        parameters = {parameter['Name']: parameter for parameter in response['Parameters']}
+        missing = [name for name in names if name not in parameters]
+        if missing:
+            raise SecretNotFound(f"Missing required parameters: {', '.join(missing)}")
+        version = ':'.join(str(parameters[name]['Version']) for name in names)
+        return names, parameters, version
+
+    def get_version(self, client_name):
+        # Undecrypted read: returns parameter versions without a KMS call
+        return self._get_parameters(client_name, decrypt=False)[2]
+
+    def fetch(self, client_name):
+        names, parameters, version = self._get_parameters(client_name, decrypt=True)
+        login, password, weburl = (parameters[name]['Value'] for name in names)
+        return version, {'login': login, 'password': password, 'weburl': weburl}, names
+
+
+class SecretsManagerBackend:
+    label = 'AWS_Secrets_Manager'
+
+    def __init__(self, client=None, prefix=None):
+        self.secretsmanager = client or boto3.client('secretsmanager', config=RETRY_CONFIG)
+        self.prefix = os.environ.get('SECRET_PREFIX', 'web-automation/') if prefix is None else prefix
+
+    def secret_id(self, client_name):
+        return f"{self.prefix}{client_name}"
+
+    def _call(self, method, secret_id):
+        try:
+            return method(SecretId=secret_id)
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code == 'ResourceNotFoundException':
+                raise SecretNotFound(f"Secret '{secret_id}' not found")
+            if error_code == 'AccessDeniedException':
+                raise SecretBackendError(f"Access denied to secret '{secret_id}' - check IAM permissions")
+            raise SecretBackendError(f"Error retrieving '{secret_id}': {str(e)}", retryable=is_retryable(e))
+
+    def get_version(self, client_name):
+        # DescribeSecret returns metadata only; the current version carries the AWSCURRENT stage
+        response = self._call(self.secretsmanager.describe_secret, self.secret_id(client_name))
+        for version_id, stages in response.get('VersionIdsToStages', {}).items():
+            if 'AWSCURRENT' in stages:
+                return version_id
+        return None
+
+    def fetch(self, client_name):
+        secret_id = self.secret_id(client_name)
+        response = self._call(self.secretsmanager.get_secret_value, secret_id)
+        try:
+            values = json.loads(response['SecretString'])
+        except (KeyError, ValueError):
+            raise Exception(f"Secret '{secret_id}' must be a JSON object with login, password and weburl")
+        missing = [key for key in ('login', 'password', 'weburl') if not values.get(key)]
+        if missing:
+            raise Exception(f"Secret '{secret_id}' is missing: {', '.join(missing)}")
+        secret = {key: values[key] for key in ('login', 'password', 'weburl')}
+        return response['VersionId'], secret, [secret_id]
+
+
+class LocalFileBackend:
+    label = 'Local_File'
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('LOCAL_SECRETS_FILE', 'secrets.local.json')
+
+    def get_version(self, client_name):
+        try:
+            return str(os.stat(self.path).st_mtime_ns)
+        except FileNotFoundError:
+            raise SecretNotFound(f"Secrets file '{self.path}' not found")
+
+    def fetch(self, client_name):
+        version = self.get_version(client_name)
+        with open(self.path) as f:
+            values = json.load(f).get(client_name)
+        if not values:
+            raise SecretNotFound(f"Client '{client_name}' not found in '{self.path}'")
+        secret = {key: values.get(key) for key in ('login', 'password', 'weburl')}
+        missing = [key for key, value in secret.items() if not value]
+        if missing:
+            raise Exception(f"Client '{client_name}' is missing: {', '.join(missing)}")
+        return version, secret, [self.path]
+
+
+BACKENDS = {
+    'ssm': SSMBackend,
+    'secretsmanager': SecretsManagerBackend,
+    'file': LocalFileBackend,
+}
+
+
+def get_backend(name=None):
+    name = (name or os.environ.get('SECRET_BACKEND', 'ssm')).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown secret backend '{name}', expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+class VersionedSecretCache:
+    """Per-client secret cache that re-reads a secret only when its version changes.
+
+    Within check_interval seconds of the last check a cached secret is returned
+    with no API call at all; after that one metadata call confirms the version.
+    """
+
+    def __init__(self, backend, check_interval=None):
+        self.backend = backend
+        self.check_interval = int(os.environ.get('SECRET_VERSION_CHECK_INTERVAL', '60')) if check_interval is None else check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, client_name):
+        """Return (secret, parameters_used) for a client."""
+        with self._lock:
+            entry = self._entries.get(client_name)
+        now = time.monotonic()
+
+        if entry:
+            version, secret, sources, checked_at = entry
+            if now - checked_at < self.check_interval:
+                return secret, sources
+            try:
+                current_version = self.backend.get_version(client_name)
+            except SecretBackendError as e:
+                if not e.retryable:
+                    raise
+                # A throttled version check should not fail the job; the cached secret was valid moments ago
+                return secret, sources
+            if current_version == version:
+                with self._lock:
+                    self._entries[client_name] = (version, secret, sources, now)
+                return secret, sources
+
+        version, secret, sources = self.backend.fetch(client_name)
+        with self._lock:
+            self._entries[client_name] = (version, secret, sources, time.monotonic())
+        return secret, sources
+
+    def invalidate(self, client_name=None):
+        with self._lock:
+            if client_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(client_name, None)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Handlers import their sibling modules by bare name, as they do inside the Lambda zip
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Module-level boto3 clients need a region; nothing here reaches AWS
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_REGION', 'us-east-1')
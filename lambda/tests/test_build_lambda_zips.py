@@ -0,0 +1,34 @@
+import os
+import zipfile
+
+import build_lambda_zips
+
+
+def test_every_handler_is_bundled_with_the_modules_it_imports():
+    assert build_lambda_zips.bundle_modules('lambda_credentials') == ['aws_retry', 'lambda_credentials', 'secret_backends']
+    assert build_lambda_zips.bundle_modules('lambda_client_context') == [
+        'aws_retry', 'lambda_client_context', 'lambda_credentials', 'lambda_get_prompt_file', 'secret_backends'
+    ]
+    assert build_lambda_zips.bundle_modules('lambda_presign_urls') == ['aws_retry', 'lambda_presign_urls', 'result_manifest']
+
+
+def test_result_manifest_copy_matches_the_agent():
+    build_lambda_zips.check_shared_copies()
+
+
+def test_rebuilt_zip_is_identical(tmp_path):
+    first = build_lambda_zips.build_zip('lambda_get_prompt_file', str(tmp_path))
+    with open(first, 'rb') as f:
+        data = f.read()
+    os.makedirs(tmp_path / 'again')
+    with open(build_lambda_zips.build_zip('lambda_get_prompt_file', str(tmp_path / 'again')), 'rb') as f:
+        assert f.read() == data
+    assert zipfile.ZipFile(first).namelist() == ['aws_retry.py', 'lambda_get_prompt_file.py']
+
+
+def test_sample_zips_are_current(tmp_path):
+    samples = os.path.join(build_lambda_zips.LAMBDA_DIR, '..', 'samples', 'first_stage_development')
+    for handler in ('lambda_credentials', 'lambda_get_prompt_file'):
+        with open(build_lambda_zips.build_zip(handler, str(tmp_path)), 'rb') as built, \
+                open(os.path.join(samples, f'{handler}.zip'), 'rb') as shipped:
+            assert built.read() == shipped.read(), f'Rebuild {handler}.zip with build_lambda_zips.py'
@@ -0,0 +1,96 @@
+import json
+import threading
+
+import pytest
+
+import lambda_client_context
+from secret_backends import SecretBackendError
+
+CREDENTIALS = {
+    'starting_url': 'https://portal.example.com',
+    'login_credentials': 'user',
+    'login_password': 'pw',
+    'file_info': {'upload_path': '/uploads'},
+}
+PROMPT = {
+    'success': True,
+    'file_key': 'prompts/ClientA/prompt.txt',
+    'etag': '"abc"',
+    'version_id': 'v1',
+    'file_content': 'Download the latest statement',
+}
+
+
+def _body(response):
+    return json.loads(response['body'])
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Replaces both reads; each test sets the result or error it needs."""
+    state = {'credentials': CREDENTIALS, 'prompt': PROMPT, 'calls': []}
+
+    def get_client_credentials(client_name):
+        state['calls'].append(('credentials', client_name, threading.current_thread().name))
+        if isinstance(state['credentials'], Exception):
+            raise state['credentials']
+        return state['credentials']
+
+    def get_prompt_file(client_name, version_id=None):
+        state['calls'].append(('prompt', client_name, version_id))
+        return state['prompt']
+
+    monkeypatch.setattr(lambda_client_context, 'get_client_credentials', get_client_credentials)
+    monkeypatch.setattr(lambda_client_context, 'get_prompt_file', get_prompt_file)
+    return state
+
+
+def test_returns_credentials_and_prompt_in_one_response(reads):
+    response = lambda_client_context.lambda_handler({'client_name': 'ClientA', 'version_id': 'v1'}, None)
+    body = _body(response)
+    assert response['statusCode'] == 200 and body['success']
+    assert body['weburl'] == 'https://portal.example.com'
+    assert body['file_info'] == {'upload_path': '/uploads'}
+    assert body['prompt'] == {key: PROMPT[key] for key in ('file_key', 'etag', 'version_id', 'file_content')}
+    assert ('prompt', 'ClientA', 'v1') in reads['calls']
+
+
+def test_both_reads_run_off_the_handler_thread(reads):
+    lambda_client_context.lambda_handler({'client_name': 'ClientA'}, None)
+    credentials_call = next(call for call in reads['calls'] if call[0] == 'credentials')
+    assert credentials_call[2] != threading.current_thread().name
+
+
+def test_missing_client_name_is_rejected(reads):
+    response = lambda_client_context.lambda_handler({}, None)
+    assert response['statusCode'] == 400
+    assert not reads['calls']
+
+
+def test_credentials_error_is_reported(reads):
+    reads['credentials'] = SecretBackendError('Access denied')
+    body = _body(lambda_client_context.lambda_handler({'client_name': 'ClientA'}, None))
+    assert body['error'] == 'Access denied'
+    assert body['retryable'] is False
+
+
+def test_prompt_error_is_reported(reads):
+    reads['prompt'] = {'success': False, 'error': 'Prompt file not found', 'retryable': False}
+    response = lambda_client_context.lambda_handler({'client_name': 'ClientA'}, None)
+    assert response['statusCode'] == 500
+    assert _body(response)['error'] == 'Prompt file not found'
+
+
+def test_both_errors_are_joined(reads):
+    reads['credentials'] = SecretBackendError('Rate exceeded', retryable=True)
+    reads['prompt'] = {'success': False, 'error': 'SlowDown', 'retryable': True}
+    body = _body(lambda_client_context.lambda_handler({'client_name': 'ClientA'}, None))
+    assert body['error'] == 'Rate exceeded; SlowDown'
+    assert body['retryable'] is True
+
+
+def test_not_retryable_when_any_failure_is_permanent(reads):
+    reads['credentials'] = SecretBackendError('Rate exceeded', retryable=True)
+    reads['prompt'] = {'success': False, 'error': 'Prompt file not found', 'retryable': False}
+    body = _body(lambda_client_context.lambda_handler({'client_name': 'ClientA'}, None))
+    assert body['retryable'] is False
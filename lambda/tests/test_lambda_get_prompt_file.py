@@ -0,0 +1,99 @@
+import io
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+import lambda_get_prompt_file
+
+
+class FakeS3:
+    """get_object stand-in serving prompt-files/{client}/prompt.txt from a dict."""
+
+    def __init__(self, prompts):
+        self.prompts = prompts
+        self.requests = []
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.requests.append((Key, kwargs))
+        client_name = Key.split('/')[1]
+        if client_name not in self.prompts:
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': 'Not Found'}}, 'GetObject')
+        etag = f'"{client_name}-etag"'
+        if kwargs.get('IfNoneMatch') == etag:
+            raise ClientError({'Error': {'Code': '304', 'Message': 'Not Modified'}}, 'GetObject')
+        body = self.prompts[client_name].encode('utf-8')
+        return {'ETag': etag, 'VersionId': None, 'ContentLength': len(body), 'Body': io.BytesIO(body)}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    fake = FakeS3({f'Client{index}': f'prompt {index}' for index in range(5)})
+    monkeypatch.setattr(lambda_get_prompt_file, 's3', fake)
+    monkeypatch.setattr(lambda_get_prompt_file, '_prompt_cache', lambda_get_prompt_file.OrderedDict())
+    return fake
+
+
+def _batch(event):
+    response = lambda_get_prompt_file.lambda_handler(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_batch_pages_through_clients_with_next_token(s3):
+    names = [f'Client{index}' for index in range(5)]
+    pages = []
+    next_token = None
+    while True:
+        status, body = _batch({'client_names': names, 'page_size': 2, 'next_token': next_token})
+        assert status == 200
+        pages.append(list(body['files']))
+        next_token = body['next_token']
+        if next_token is None:
+            break
+    assert pages == [['Client0', 'Client1'], ['Client2', 'Client3'], ['Client4']]
+
+
+@pytest.mark.parametrize('next_token', ['-1', -1, '1.5', 1.5, 'abc', True, [1]])
+def test_invalid_next_token_is_rejected(s3, next_token):
+    status, body = _batch({'client_names': ['Client0', 'Client1'], 'next_token': next_token})
+    assert status == 400
+    assert body['error'] == 'Invalid parameter: next_token or page_size'
+    assert not s3.requests
+
+
+def test_next_token_past_the_end_returns_an_empty_page(s3):
+    status, body = _batch({'client_names': ['Client0'], 'next_token': '5'})
+    assert status == 200
+    assert body['files'] == {} and body['next_token'] is None
+
+
+def test_oversized_page_is_split_rather_than_truncated(s3, monkeypatch):
+    monkeypatch.setattr(lambda_get_prompt_file, 'MAX_RESPONSE_BYTES', 400)
+    status, body = _batch({'client_names': ['Client0', 'Client1', 'Client2']})
+    assert status == 200
+    assert list(body['files']) == ['Client0', 'Client1']
+    assert body['next_token'] == '2'
+
+
+def test_missing_client_is_reported_per_file(s3):
+    status, body = _batch({'client_names': ['Client0', 'Unknown']})
+    assert status == 200
+    assert body['success'] is False and body['failed'] == ['Unknown']
+    assert body['files']['Client0']['file_content'] == 'prompt 0'
+
+
+def test_unchanged_prompt_is_served_from_the_cache(s3):
+    first = lambda_get_prompt_file.get_prompt_file('Client0')
+    second = lambda_get_prompt_file.get_prompt_file('Client0')
+    assert second == first
+    assert s3.requests[1] == ('prompt-files/Client0/prompt.txt', {'IfNoneMatch': '"Client0-etag"'})
+
+
+def test_cache_evicts_the_least_recently_used_prompt(s3, monkeypatch):
+    monkeypatch.setattr(lambda_get_prompt_file, 'MAX_CACHE_ENTRIES', 2)
+    for client_name in ('Client0', 'Client1'):
+        lambda_get_prompt_file.get_prompt_file(client_name)
+    # Touch Client0 so Client1 is the oldest
+    lambda_get_prompt_file.get_prompt_file('Client0')
+    lambda_get_prompt_file.get_prompt_file('Client2')
+    assert list(lambda_get_prompt_file._prompt_cache) == [('Client0', None), ('Client2', None)]
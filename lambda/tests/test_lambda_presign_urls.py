@@ -0,0 +1,103 @@
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import boto3
+import pytest
+from botocore.config import Config
+
+import lambda_presign_urls
+
+PREFIX = 'downloaded-files/ClientA/'
+
+
+@pytest.fixture
+def signer(monkeypatch):
+    """Signs with static fake credentials; generate_presigned_url never leaves the process."""
+    client = boto3.client(
+        's3',
+        region_name='us-east-1',
+        aws_access_key_id='AKIDEXAMPLE',
+        aws_secret_access_key='secret',
+        config=Config(signature_version='s3v4')
+    )
+    monkeypatch.setattr(lambda_presign_urls, 's3', client)
+    monkeypatch.setattr(lambda_presign_urls, 'signing_lifetime', lambda: 3600)
+    return client
+
+
+def _presign(event):
+    response = lambda_presign_urls.lambda_handler({'client_name': 'ClientA', **event}, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_signs_keys_in_the_client_folder(signer):
+    key = PREFIX + '2026/01/01/job1/report.pdf'
+    status, body = _presign({'keys': [key], 'expires_in': 600})
+    assert status == 200 and body['expires_in'] == 600
+    url = urlparse(body['urls'][key])
+    assert url.path.endswith('/' + key)
+    assert parse_qs(url.query)['X-Amz-Expires'] == ['600']
+
+
+@pytest.mark.parametrize('key', [
+    'downloaded-files/ClientB/2026/01/01/job1/report.pdf',
+    'prompt-files/ClientA/prompt.txt',
+    PREFIX + '../ClientB/report.pdf',
+    42,
+    None,
+])
+def test_keys_outside_the_client_folder_are_rejected(signer, key):
+    status, body = _presign({'keys': [PREFIX + 'report.pdf', key]})
+    assert status == 400
+    assert body['error'] == f'1 key(s) are outside {PREFIX}'
+
+
+@pytest.mark.parametrize('keys', [PREFIX + 'report.pdf', {'key': PREFIX + 'report.pdf'}])
+def test_keys_must_be_a_list(signer, keys):
+    status, body = _presign({'keys': keys})
+    assert status == 400
+    assert body['error'] == 'Invalid parameter: keys'
+
+
+@pytest.mark.parametrize('event', [{'expires_in': 0}, {'expires_in': 'soon'}, {'limit': -1}, {'limit': None}])
+def test_invalid_expires_in_or_limit_is_rejected(signer, event):
+    status, body = _presign({'keys': [PREFIX + 'report.pdf'], **event})
+    assert status == 400
+    assert body['error'] == 'Invalid parameter: expires_in or limit'
+
+
+def test_expiry_is_shortened_to_the_signing_credentials(signer, monkeypatch):
+    monkeypatch.setattr(lambda_presign_urls, 'signing_lifetime', lambda: 900)
+    status, body = _presign({'keys': [PREFIX + 'report.pdf'], 'expires_in': 86400})
+    assert status == 200 and body['expires_in'] == 900
+    assert 'shortened to 900s' in body['message']
+    assert parse_qs(urlparse(body['urls'][PREFIX + 'report.pdf']).query)['X-Amz-Expires'] == ['900']
+
+
+def test_expired_signing_credentials_are_retryable(signer, monkeypatch):
+    monkeypatch.setattr(lambda_presign_urls, 'signing_lifetime', lambda: 0)
+    status, body = _presign({'keys': [PREFIX + 'report.pdf']})
+    assert status == 503 and body['retryable'] is True
+
+
+def _session(expiry=None, token=None):
+    frozen = SimpleNamespace(token=token)
+    credentials = SimpleNamespace(get_frozen_credentials=lambda: frozen, _expiry_time=expiry)
+    return SimpleNamespace(get_credentials=lambda: credentials)
+
+
+def test_signing_lifetime_follows_the_credential_expiry(monkeypatch):
+    expiry = datetime.now(timezone.utc) + timedelta(minutes=20)
+    monkeypatch.setattr(lambda_presign_urls, 'boto_session', _session(expiry=expiry, token='token'))
+    assert 1100 <= lambda_presign_urls.signing_lifetime() <= 1200
+    monkeypatch.setattr(lambda_presign_urls, 'boto_session', _session(expiry=expiry - timedelta(hours=1)))
+    assert lambda_presign_urls.signing_lifetime() == 0
+
+
+def test_signing_lifetime_caps_temporary_credentials_without_an_expiry(monkeypatch):
+    monkeypatch.setattr(lambda_presign_urls, 'boto_session', _session(token='token'))
+    assert lambda_presign_urls.signing_lifetime() == lambda_presign_urls.UNKNOWN_EXPIRY_MAX_EXPIRES_IN
+    monkeypatch.setattr(lambda_presign_urls, 'boto_session', _session())
+    assert lambda_presign_urls.signing_lifetime() == lambda_presign_urls.MAX_EXPIRES_IN
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from secret_backends import LocalFileBackend, SecretBackendError, SecretNotFound, VersionedSecretCache, get_backend
+
+SECRET = {'login': 'user', 'password': 'pw', 'weburl': 'https://portal.example.com'}
+
+
+class CountingBackend:
+    """Backend stand-in that counts metadata checks and full reads."""
+
+    label = 'Counting'
+
+    def __init__(self):
+        self.version = 'v1'
+        self.version_checks = 0
+        self.fetches = 0
+        self.version_error = None
+
+    def get_version(self, client_name):
+        self.version_checks += 1
+        if self.version_error:
+            raise self.version_error
+        return self.version
+
+    def fetch(self, client_name):
+        self.fetches += 1
+        return self.version, {**SECRET, 'password': f'pw-{self.version}'}, [f'{client_name}-secret']
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr('secret_backends.time.monotonic', clock)
+    return clock
+
+
+def test_no_call_at_all_within_the_check_interval(clock):
+    backend = CountingBackend()
+    cache = VersionedSecretCache(backend, check_interval=60)
+    cache.get('ClientA')
+    clock.now += 59
+    secret, sources = cache.get('ClientA')
+    assert secret['password'] == 'pw-v1' and sources == ['ClientA-secret']
+    assert (backend.fetches, backend.version_checks) == (1, 0)
+
+
+def test_unchanged_version_is_not_read_again(clock):
+    backend = CountingBackend()
+    cache = VersionedSecretCache(backend, check_interval=60)
+    cache.get('ClientA')
+    clock.now += 61
+    cache.get('ClientA')
+    assert (backend.fetches, backend.version_checks) == (1, 1)
+    # The confirmed version restarts the interval
+    clock.now += 30
+    cache.get('ClientA')
+    assert backend.version_checks == 1
+
+
+def test_rotated_secret_is_read_once_its_version_changes(clock):
+    backend = CountingBackend()
+    cache = VersionedSecretCache(backend, check_interval=60)
+    cache.get('ClientA')
+    backend.version = 'v2'
+    clock.now += 61
+    secret, _ = cache.get('ClientA')
+    assert secret['password'] == 'pw-v2'
+    assert (backend.fetches, backend.version_checks) == (2, 1)
+
+
+def test_throttled_version_check_serves_the_cached_secret(clock):
+    backend = CountingBackend()
+    cache = VersionedSecretCache(backend, check_interval=60)
+    cache.get('ClientA')
+    backend.version_error = SecretBackendError('Rate exceeded', retryable=True)
+    clock.now += 61
+    assert cache.get('ClientA')[0]['password'] == 'pw-v1'
+    assert backend.fetches == 1
+
+
+def test_permanent_version_check_error_propagates(clock):
+    backend = CountingBackend()
+    cache = VersionedSecretCache(backend, check_interval=60)
+    cache.get('ClientA')
+    backend.version_error = SecretBackendError('Access denied')
+    clock.now += 61
+    with pytest.raises(SecretBackendError):
+        cache.get('ClientA')
+
+
+def test_clients_are_cached_separately(clock):
+    backend = CountingBackend()
+    cache = VersionedSecretCache(backend, check_interval=60)
+    cache.get('ClientA')
+    cache.get('ClientB')
+    cache.invalidate('ClientA')
+    cache.get('ClientA')
+    cache.get('ClientB')
+    assert backend.fetches == 3
+
+
+def test_local_file_backend_reads_clients_from_json(tmp_path):
+    path = tmp_path / 'secrets.json'
+    path.write_text(json.dumps({'ClientA': SECRET, 'ClientB': {'login': 'user'}}))
+    backend = LocalFileBackend(str(path))
+    version, secret, sources = backend.fetch('ClientA')
+    assert secret == SECRET and sources == [str(path)]
+    assert version == backend.get_version('ClientA')
+    with pytest.raises(SecretNotFound):
+        backend.fetch('Unknown')
+    with pytest.raises(Exception, match='missing: password, weburl'):
+        backend.fetch('ClientB')
+
+
+def test_unknown_backend_name_is_rejected():
+    with pytest.raises(ValueError):
+        get_backend('vault')
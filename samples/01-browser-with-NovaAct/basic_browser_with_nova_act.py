@@ -6,11 +6,12 @@ This script demonstrates AI-powered web automation by:
 - Performing automated searches and data extraction using browser
 """
 
-from bedrock_agentcore.tools.browser_client import browser_session
 from nova_act import NovaAct
 from rich.console import Console
 import argparse
-import json
+import sys
+sys.path.append("../../agents")
+from browser_providers import get_browser_provider
 
 console = Console()
 
@@ -20,17 +21,16 @@ boto_session = Session()
 region = boto_session.region_name
 print("using region", region)
 
-def browser_with_nova_act(prompt, starting_page, nova_act_key, region="us-west-2"):
+def browser_with_nova_act(prompt, starting_page, nova_act_key, region="us-west-2", backend="agentcore"):
     result = None
-    with browser_session(region) as client:
-        ws_url, headers = client.generate_ws_headers()
+    # size=0: a one-off run starts its session on demand instead of pre-creating a pool
+    provider = get_browser_provider(backend, region=region, size=0)
+    with provider.acquire() as browser_options:
         try:
             with NovaAct(
-                cdp_endpoint_url=ws_url,
-                cdp_headers=headers,
-                preview={"playwright_actuation": True},
                 nova_act_api_key=nova_act_key,
                 starting_page=starting_page,
+                **browser_options
             ) as nova_act:
                 result = nova_act.act(prompt)
         except Exception as e:
@@ -45,10 +45,11 @@ if __name__ == "__main__":
     parser.add_argument("--starting-page", required=True, help="Starting URL")
     parser.add_argument("--nova-act-key", required=True, help="Nova Act API key")
     parser.add_argument("--region", default="us-west-2", help="AWS region")
+    parser.add_argument("--backend", default="agentcore", choices=["agentcore", "local"], help="Remote AgentCore browser or local headless Chromium")
     args = parser.parse_args()
 
     result = browser_with_nova_act(
-        args.prompt, args.starting_page, args.nova_act_key, args.region
+        args.prompt, args.starting_page, args.nova_act_key, args.region, args.backend
     )
     console.print(f"\n[cyan] Response[/cyan] {result.response}")
     console.print(f"\n[bold green]Nova Act Result:[/bold green] {result}")
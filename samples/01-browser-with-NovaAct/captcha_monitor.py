@@ -0,0 +1,154 @@
+"""CAPTCHA detection and the wait for a human to solve one.
+
+Kept apart from captcha_with_nova_act.py so the polling logic can run against
+a stand-in page; nova_act is only imported when the model has to be asked.
+"""
+
+import time
+
+
+def contains_human_validation_error(err):
+    """
+    Recursively check if the error or its message attribute indicates HumanValidationError.
+    """
+    if err is None:
+        return False
+
+    # Direct string check
+    if isinstance(err, str) and "HumanValidationError" in err:
+        return True
+
+    # If err has 'message' attribute that's string or another error, recurse
+    if hasattr(err, "message"):
+        return contains_human_validation_error(err.message)
+
+    # If err has string representation containing the error text
+    if "HumanValidationError" in str(err):
+        return True
+
+    return False
+
+# Challenge frames that are only visible while a human still has to solve something;
+# the reCAPTCHA/hCaptcha checkbox frames and the v3 badge stay on the page after solving
+CAPTCHA_CHALLENGE_SELECTORS = [
+    "iframe[src*='recaptcha/api2/bframe']",
+    "iframe[src*='recaptcha/enterprise/bframe']",
+    "iframe[src*='hcaptcha'][src*='frame=challenge']",
+    "iframe[src*='arkoselabs']",
+    "iframe[src*='funcaptcha']",
+]
+# Tokens the widgets fill in once solved
+CAPTCHA_RESPONSE_SELECTORS = [
+    ".g-recaptcha [name='g-recaptcha-response']",
+    ".h-captcha [name='h-captcha-response']",
+    ".cf-turnstile [name='cf-turnstile-response']",
+]
+# Checkbox frames and the checked state of their checkbox
+CAPTCHA_CHECKBOXES = (
+    ("recaptcha", "/anchor", "#recaptcha-anchor[aria-checked='true']"),
+    ("hcaptcha", "frame=checkbox", "#checkbox[aria-checked='true']"),
+)
+# Known CAPTCHA widgets; on their own they do not say whether the CAPTCHA is solved
+CAPTCHA_SELECTORS = [
+    "iframe[src*='recaptcha']",
+    "iframe[src*='hcaptcha']",
+    "iframe[src*='challenges.cloudflare.com']",
+    ".g-recaptcha",
+    ".h-captcha",
+    ".cf-turnstile",
+    "#captcha",
+    "[id*='captcha' i]",
+    "[class*='captcha' i]",
+]
+
+
+def captcha_solved(page):
+    """True if a known widget reports it was solved: a filled response token or a checked checkbox."""
+    for element in page.query_selector_all(", ".join(CAPTCHA_RESPONSE_SELECTORS)):
+        if element.input_value():
+            return True
+    for frame in page.frames:
+        url = frame.url.lower()
+        for hint, path_hint, checked_selector in CAPTCHA_CHECKBOXES:
+            if hint in url and path_hint in url and frame.query_selector(checked_selector):
+                return True
+    return False
+
+
+def captcha_signals(page):
+    """
+    Cheap CAPTCHA check from the DOM and the widgets' own frames.
+    Returns True if a challenge is visible, False if a known widget is solved or none is on the
+    page, and None when it cannot tell (a widget that is merely present, or a page that could
+    not be inspected) so the caller can ask the model.
+    """
+    try:
+        if any(element.is_visible() for element in page.query_selector_all(", ".join(CAPTCHA_CHALLENGE_SELECTORS))):
+            return True
+        if captcha_solved(page):
+            return False
+        if any(element.is_visible() for element in page.query_selector_all(", ".join(CAPTCHA_SELECTORS))):
+            return None
+        return False
+    except Exception:
+        return None
+
+
+def wait_for_captcha_resolution(nova_act, max_wait=80, initial_delay=1, max_delay=10, model_check_interval=20):
+    """
+    Wait for a human to solve a CAPTCHA, returning True as soon as it is gone.
+
+    Polls with exponential backoff using cheap signals: navigation away from the
+    CAPTCHA page, visible challenge frames and the widgets' solved state. The model
+    is only asked "Is there a captcha on the screen?" when those signals are
+    inconclusive (a widget that is still on the page, or an unrecognised CAPTCHA
+    type), and at most once per model_check_interval.
+    """
+    page = nova_act.page
+    baseline_url = page.url
+    navigated = []
+
+    def on_navigation(frame):
+        if frame == page.main_frame:
+            navigated.append(frame.url)
+
+    page.on("framenavigated", on_navigation)
+    # Once a challenge has been seen, its disappearance or a solved widget is a reliable "solved" signal
+    widget_seen = captcha_signals(page) is True
+    deadline = time.monotonic() + max_wait
+    last_model_check = time.monotonic()
+    delay = initial_delay
+
+    try:
+        while time.monotonic() < deadline:
+            # wait_for_timeout, unlike time.sleep, lets Playwright deliver navigation events
+            page.wait_for_timeout(min(delay, max(0, deadline - time.monotonic())) * 1000)
+            delay = min(delay * 2, max_delay)
+
+            if navigated or page.url != baseline_url:
+                print("Page changed after CAPTCHA, resuming.")
+                return True
+
+            signal = captcha_signals(page)
+            if signal is True:
+                widget_seen = True
+                print("Captcha still present. Waiting...")
+                continue
+            if signal is False and widget_seen:
+                return True
+
+            # Inconclusive: a widget still on the page, no known widget at all, or the page could not be inspected
+            if time.monotonic() - last_model_check >= model_check_interval:
+                last_model_check = time.monotonic()
+                try:
+                    from nova_act import BOOL_SCHEMA
+
+                    captcha_result = nova_act.act("Is there a captcha on the screen?", schema=BOOL_SCHEMA)
+                    if captcha_result.matches_schema and not captcha_result.parsed_response:
+                        return True
+                    print("Captcha still present. Waiting...")
+                except Exception as captcha_check_err:
+                    print(f"Error checking captcha status: {str(captcha_check_err)}")
+        return False
+    finally:
+        page.remove_listener("framenavigated", on_navigation)
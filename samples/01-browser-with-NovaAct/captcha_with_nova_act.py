@@ -1,13 +1,15 @@
-from bedrock_agentcore.tools.browser_client import browser_session
-from nova_act import NovaAct, BOOL_SCHEMA, ActAgentError
+from nova_act import NovaAct, ActAgentError
 from rich.console import Console
 from rich.panel import Panel
 import sys
 import json
 import time
 import argparse
+from captcha_monitor import contains_human_validation_error, wait_for_captcha_resolution
 sys.path.append("../interactive_tools")
 from browser_viewer import BrowserViewerServer
+sys.path.append("../../agents")
+from browser_providers import AgentCoreBrowserPool
 
 
 console = Console()
@@ -18,27 +20,6 @@ boto_session = Session()
 region = boto_session.region_name
 print("using region", region)
 
-def contains_human_validation_error(err):
-    """
-    Recursively check if the error or its message attribute indicates HumanValidationError.
-    """
-    if err is None:
-        return False
-
-    # Direct string check
-    if isinstance(err, str) and "HumanValidationError" in err:
-        return True
-
-    # If err has 'message' attribute that's string or another error, recurse
-    if hasattr(err, "message"):
-        return contains_human_validation_error(err.message)
-
-    # If err has string representation containing the error text
-    if "HumanValidationError" in str(err):
-        return True
-
-    return False
-
 def live_view_with_nova_act(steps, starting_page, nova_act_key, region="us-west-2"):
     """Run the browser live viewer with display sizing."""
     console.print(
@@ -54,12 +35,12 @@ def live_view_with_nova_act(steps, starting_page, nova_act_key, region="us-west-
         )
     )
     result = None
+    # size=0: a one-off run starts its session on demand instead of pre-creating a pool
+    provider = AgentCoreBrowserPool(region, size=0)
 
     try:
-        # Step 1: Create browser session
-        with browser_session(region) as client:
-            ws_url, headers = client.generate_ws_headers()
-
+        # Step 1: Create browser session; the pool stops it when the block exits
+        with provider.session() as (client, browser_options):
             # Step 2: Start viewer server
             console.print("\n[cyan]Step 3: Starting viewer server...[/cyan]")
             viewer = BrowserViewerServer(client, port=8000)
@@ -78,11 +59,9 @@ def live_view_with_nova_act(steps, starting_page, nova_act_key, region="us-west-
 
             # Step 4: Use Nova Act to interact with the browser
             with NovaAct(
-                cdp_endpoint_url=ws_url,
-                cdp_headers=headers,
-                preview={"playwright_actuation": True},
                 nova_act_api_key=nova_act_key,
                 starting_page=starting_page,
+                **browser_options
             ) as nova_act:
 
                 for step_index, step in enumerate(steps):
@@ -100,31 +79,11 @@ def live_view_with_nova_act(steps, starting_page, nova_act_key, region="us-west-
                             # Check for human validation in the error message or structure
                             if contains_human_validation_error(err):
                                 print("CAPTCHA detected! Please solve it in the browser.")
-                                captcha_wait_attempts = 0
-                                max_captcha_wait_attempts = 8
-
-                                while captcha_wait_attempts < max_captcha_wait_attempts:
-                                    try:
-                                        time.sleep(10)  # Give user time to solve captcha
-                                        captcha_result = nova_act.act(
-                                            "Is there a captcha on the screen?", schema=BOOL_SCHEMA
-                                        )
-
-                                        if captcha_result.matches_schema and not captcha_result.parsed_response:
-                                            print("Captcha solved, continuing with current step...")
-                                            # Don't increment retry_count so we retry the current step without penalty
-                                            break
-                                        else:
-                                            print(f"Captcha still present. Waiting... (Attempt {captcha_wait_attempts + 1}/{max_captcha_wait_attempts})")
-                                            captcha_wait_attempts += 1
-
-                                    except Exception as captcha_check_err:
-                                        print(f"Error checking captcha status: {str(captcha_check_err)}")
-                                        captcha_wait_attempts += 1
-                                        time.sleep(5)
-
-                                if captcha_wait_attempts >= max_captcha_wait_attempts:
-                                    print("Maximum captcha wait attempts reached. Trying to continue anyway.")
+                                if wait_for_captcha_resolution(nova_act):
+                                    print("Captcha solved, continuing with current step...")
+                                    # Don't increment retry_count so we retry the current step without penalty
+                                else:
+                                    print("Maximum captcha wait reached. Trying to continue anyway.")
                                     retry_count += 1
 
                             else:
@@ -151,9 +110,6 @@ def live_view_with_nova_act(steps, starting_page, nova_act_key, region="us-west-
         traceback.print_exc()
     finally:
         console.print("\n\n[yellow]Shutting down...[/yellow]")
-        if "client" in locals():
-            client.stop()
-            console.print("✅ Browser session terminated")
     return result
 
 
@@ -1,12 +1,14 @@
-from bedrock_agentcore.tools.browser_client import browser_session
 from nova_act import NovaAct
 from rich.console import Console
 from rich.panel import Panel
 import sys
 import json
 import argparse
+import urllib.request
 sys.path.append("../interactive_tools")
 from browser_viewer import BrowserViewerServer
+sys.path.append("../../agents")
+from browser_providers import AgentCoreBrowserPool
 
 console = Console()
 
@@ -16,8 +18,41 @@ boto_session = Session()
 region = boto_session.region_name
 print("using region", region)
 
-def live_view_with_nova_act(prompt, starting_page, nova_act_key, region="us-west-2"):
-    """Run the browser live viewer with display sizing."""
+def _viewer_request(viewer_url, method, path, body=None):
+    request = urllib.request.Request(
+        f"{viewer_url.rstrip('/')}{path}",
+        data=json.dumps(body).encode("utf-8") if body is not None else None,
+        headers={"Content-Type": "application/json"},
+        method=method,
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def register_with_viewer(viewer_url, client, region, label=""):
+    """Register this browser session with a shared multi_session_viewer service."""
+    _viewer_request(viewer_url, "POST", "/api/sessions", {
+        "session_id": client.session_id,
+        "browser_identifier": client.identifier,
+        "region": region,
+        "label": label,
+    })
+    console.print(f"\n[cyan]Session registered with viewer: {viewer_url}[/cyan]")
+
+
+def unregister_from_viewer(viewer_url, client):
+    try:
+        _viewer_request(viewer_url, "DELETE", f"/api/sessions/{client.session_id}")
+    except Exception as e:
+        console.print(f"[yellow]Could not unregister from viewer: {e}[/yellow]")
+
+
+def live_view_with_nova_act(prompt, starting_page, nova_act_key, region="us-west-2", viewer_url=None, label=""):
+    """Run the browser live viewer with display sizing.
+
+    With viewer_url, the session is registered with a shared multi_session_viewer
+    service instead of starting a dedicated viewer on port 8000.
+    """
     console.print(
         Panel(
             "[bold cyan]Browser Live Viewer[/bold cyan]\n\n"
@@ -31,47 +66,50 @@ def live_view_with_nova_act(prompt, starting_page, nova_act_key, region="us-west
         )
     )
 
+    result = None
+    # size=0: a one-off run starts its session on demand instead of pre-creating a pool
+    provider = AgentCoreBrowserPool(region, size=0)
     try:
-        # Step 1: Create browser session
-        with browser_session(region) as client:
-            ws_url, headers = client.generate_ws_headers()
-
-            # Step 2: Start viewer server
-            console.print("\n[cyan]Step 3: Starting viewer server...[/cyan]")
-            viewer = BrowserViewerServer(client, port=8000)
-            viewer_url = viewer.start(open_browser=True)
-
-            # Step 3: Show features
-            console.print("\n[bold green]Viewer Features:[/bold green]")
-            console.print(
-                "• Default display: 1600×900 (configured via displayLayout callback)"
-            )
-            console.print("• Size options: 720p, 900p, 1080p, 1440p")
-            console.print("• Real-time display updates")
-            console.print("• Take/Release control functionality")
-
-            console.print("\n[yellow]Press Ctrl+C to stop[/yellow]")
-
-            # Step 4: Use Nova Act to interact with the browser
-            with NovaAct(
-                cdp_endpoint_url=ws_url,
-                cdp_headers=headers,
-                preview={"playwright_actuation": True},
-                nova_act_api_key=nova_act_key,
-                starting_page=starting_page,
-            ) as nova_act:
-                result = nova_act.act(prompt)
-                console.print(f"\n[bold green]Nova Act Result:[/bold green] {result}")
+        # Step 1: Create browser session; the pool stops it when the block exits
+        with provider.session() as (client, browser_options):
+            # Step 2: Start viewer server, or join the shared one
+            if viewer_url:
+                register_with_viewer(viewer_url, client, region, label)
+            else:
+                console.print("\n[cyan]Step 3: Starting viewer server...[/cyan]")
+                viewer = BrowserViewerServer(client, port=8000)
+                viewer.start(open_browser=True)
+
+            try:
+                # Step 3: Show features
+                console.print("\n[bold green]Viewer Features:[/bold green]")
+                console.print(
+                    "• Default display: 1600×900 (configured via displayLayout callback)"
+                )
+                console.print("• Size options: 720p, 900p, 1080p, 1440p")
+                console.print("• Real-time display updates")
+                console.print("• Take/Release control functionality")
+
+                console.print("\n[yellow]Press Ctrl+C to stop[/yellow]")
+
+                # Step 4: Use Nova Act to interact with the browser
+                with NovaAct(
+                    nova_act_api_key=nova_act_key,
+                    starting_page=starting_page,
+                    **browser_options
+                ) as nova_act:
+                    result = nova_act.act(prompt)
+                    console.print(f"\n[bold green]Nova Act Result:[/bold green] {result}")
+            finally:
+                console.print("\n\n[yellow]Shutting down...[/yellow]")
+                if viewer_url:
+                    unregister_from_viewer(viewer_url, client)
+        console.print("✅ Browser session terminated")
 
     except Exception as e:
         console.print(f"\n[red]Error: {e}[/red]")
         import traceback
         traceback.print_exc()
-    finally:
-        console.print("\n\n[yellow]Shutting down...[/yellow]")
-        if "client" in locals():
-            client.stop()
-            console.print("✅ Browser session terminated")
     return result
 
 if __name__ == "__main__":
@@ -81,6 +119,8 @@ if __name__ == "__main__":
     parser.add_argument("--starting-page", required=True, help="Starting URL")
     parser.add_argument("--nova-act-key", required=True, help="Nova Act API key")
     parser.add_argument("--region", default="us-west-2", help="AWS region")
+    parser.add_argument("--viewer-url", required=False, help="Shared multi_session_viewer URL, e.g. http://localhost:8000")
+    parser.add_argument("--label", default="", help="Label shown for this session in the shared viewer")
     args = parser.parse_args()
 
     # Read prompt from file if provided, else use --prompt argument
@@ -95,7 +135,7 @@ if __name__ == "__main__":
         sys.exit(1)
 
     result = live_view_with_nova_act(
-        prompt, args.starting_page, args.nova_act_key, args.region
+        prompt, args.starting_page, args.nova_act_key, args.region, args.viewer_url, args.label
     )
 
     with open('result.txt', 'w') as f:
@@ -0,0 +1,204 @@
+"""One live-view service for many AgentCore browser sessions.
+
+Jobs register their browser session with this service instead of each starting
+its own BrowserViewerServer on port 8000. The dashboard lists active sessions;
+attaching to one generates a short-lived live-view URL for it on demand. A
+session that nobody is watching never has a live-view URL generated, so no
+frames are streamed for unwatched jobs.
+
+Run:
+    python multi_session_viewer.py --port 8000
+
+Register a session from a job (see live_view_with_nova_act.py --viewer-url):
+    POST /api/sessions {"session_id", "browser_identifier", "region", "label"}
+"""
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import HTMLResponse
+from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel
+import argparse
+import html
+import json
+import os
+import uvicorn
+from viewer_sessions import SessionRegistry, UnknownSession
+
+
+class SessionRegistration(BaseModel):
+    session_id: str
+    browser_identifier: str
+    region: str = "us-west-2"
+    label: str = ""
+
+
+class ControlRequest(BaseModel):
+    action: str
+
+
+registry = SessionRegistry()
+app = FastAPI(title="AgentCore multi-session live viewer")
+
+# DCV web client SDK, same files the single-session viewer uses
+DCV_SDK_DIR = os.environ.get("DCV_SDK_DIR", "../interactive_tools/static/dcvjs")
+if os.path.isdir(DCV_SDK_DIR):
+    app.mount("/static/dcvjs", StaticFiles(directory=DCV_SDK_DIR), name="dcvjs")
+
+
+@app.post("/api/sessions")
+def register_session(registration: SessionRegistration):
+    registry.register(registration)
+    return {"status": "registered", "session_id": registration.session_id}
+
+
+@app.delete("/api/sessions/{session_id}")
+def unregister_session(session_id: str):
+    return {"status": "unregistered" if registry.unregister(session_id) else "not_found"}
+
+
+@app.get("/api/sessions")
+def list_sessions():
+    return {"sessions": registry.list()}
+
+
+@app.post("/api/sessions/{session_id}/attach")
+def attach_session(session_id: str):
+    try:
+        live_view_url = registry.attach(session_id)
+    except UnknownSession as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"session_id": session_id, "live_view_url": live_view_url}
+
+
+@app.post("/api/sessions/{session_id}/detach")
+def detach_session(session_id: str):
+    registry.detach(session_id)
+    return {"status": "detached"}
+
+
+@app.post("/api/sessions/{session_id}/control")
+def control_session(session_id: str, request: ControlRequest):
+    try:
+        registry.control(session_id, request.action)
+    except UnknownSession as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "ok", "action": request.action}
+
+
+DASHBOARD_HTML = """<!DOCTYPE html>
+<html>
+<head><title>AgentCore Live Sessions</title>
+<style>
+body { font-family: sans-serif; margin: 2em; }
+table { border-collapse: collapse; }
+td, th { padding: 0.4em 1em; border-bottom: 1px solid #ddd; text-align: left; }
+</style>
+</head>
+<body>
+<h2>Active browser sessions</h2>
+<table><thead><tr><th>Label</th><th>Session</th><th>Watchers</th><th></th></tr></thead>
+<tbody id="sessions"></tbody></table>
+<script>
+async function refresh() {
+  const response = await fetch('/api/sessions');
+  const { sessions } = await response.json();
+  const rows = sessions.map(s => {
+    const row = document.createElement('tr');
+    for (const value of [s.label || '-', s.session_id, s.watchers]) {
+      const cell = document.createElement('td');
+      cell.textContent = value;
+      row.appendChild(cell);
+    }
+    const link = document.createElement('a');
+    link.href = '/view/' + encodeURIComponent(s.session_id);
+    link.target = '_blank';
+    link.textContent = 'Watch';
+    const cell = document.createElement('td');
+    cell.appendChild(link);
+    row.appendChild(cell);
+    return row;
+  });
+  document.getElementById('sessions').replaceChildren(...rows);
+}
+refresh();
+setInterval(refresh, 5000);
+</script>
+</body>
+</html>"""
+
+VIEWER_HTML = """<!DOCTYPE html>
+<html>
+<head><title>Session __LABEL__</title>
+<script src="/static/dcvjs/dcv.js"></script>
+<style>body { margin: 0; font-family: sans-serif; } #bar { padding: 0.5em; } #dcv-display { width: 1600px; height: 900px; }</style>
+</head>
+<body>
+<div id="bar">
+  <strong>__LABEL__</strong>
+  <button onclick="control('take')">Take control</button>
+  <button onclick="control('release')">Release control</button>
+</div>
+<div id="dcv-display"></div>
+<script>
+const sessionId = __SESSION_ID__;
+const base = '/api/sessions/' + encodeURIComponent(sessionId);
+
+function control(action) {
+  fetch(base + '/control', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ action }) });
+}
+
+// Release our watcher slot when the tab closes so the session stops streaming
+window.addEventListener('pagehide', () => navigator.sendBeacon(base + '/detach'));
+
+fetch(base + '/attach', { method: 'POST' }).then(r => r.json()).then(({ live_view_url }) => {
+  const presigned = new URL(live_view_url);
+  dcv.authenticate(live_view_url, {
+    promptCredentials: () => {},
+    httpExtraSearchParams: () => presigned.searchParams,
+    error: (auth, error) => console.error('Authentication failed', error),
+    success: (auth, result) => {
+      const { sessionId: dcvSessionId, authToken } = result[0];
+      dcv.connect({
+        url: live_view_url,
+        sessionId: dcvSessionId,
+        authToken,
+        divId: 'dcv-display',
+        baseUrl: '/static/dcvjs',
+        callbacks: { httpExtraSearchParams: () => presigned.searchParams }
+      }).catch(error => console.error('Connection failed', error));
+    }
+  });
+});
+</script>
+</body>
+</html>"""
+
+
+@app.get("/", response_class=HTMLResponse)
+def dashboard():
+    return DASHBOARD_HTML
+
+
+@app.get("/view/{session_id}", response_class=HTMLResponse)
+def view_session(session_id: str):
+    label = next((s["label"] for s in registry.list() if s["session_id"] == session_id), None)
+    if label is None:
+        raise HTTPException(status_code=404, detail=f"Unknown session {session_id}")
+    return (VIEWER_HTML
+            .replace("__LABEL__", html.escape(label or session_id))
+            .replace("__SESSION_ID__", json_string(session_id)))
+
+
+def json_string(value):
+    # Safe inside a <script> block
+    return json.dumps(value).replace("<", "\\u003c")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port for the dashboard and API")
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
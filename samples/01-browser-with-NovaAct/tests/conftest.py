@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The sample scripts import their helpers by bare name from this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
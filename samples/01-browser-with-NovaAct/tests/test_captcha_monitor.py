@@ -0,0 +1,160 @@
+import sys
+import types
+
+import pytest
+
+import captcha_monitor
+from captcha_monitor import (
+    CAPTCHA_CHALLENGE_SELECTORS,
+    CAPTCHA_RESPONSE_SELECTORS,
+    CAPTCHA_SELECTORS,
+    captcha_signals,
+    contains_human_validation_error,
+    wait_for_captcha_resolution,
+)
+
+
+class Element:
+    def __init__(self, visible=True, value=""):
+        self.visible = visible
+        self.value = value
+
+    def is_visible(self):
+        return self.visible
+
+    def input_value(self):
+        return self.value
+
+
+class Frame:
+    def __init__(self, url, checked=False):
+        self.url = url
+        self.checked = checked
+
+    def query_selector(self, selector):
+        return Element() if self.checked else None
+
+
+class FakePage:
+    """Page whose CAPTCHA state follows a script, one entry per poll."""
+
+    def __init__(self, clock, states):
+        self.clock = clock
+        self.states = list(states)
+        self.state = self.states.pop(0)
+        self.url = "https://portal.example.com/login"
+        self.main_frame = Frame(self.url)
+        self.listeners = []
+        self.waits = []
+
+    @property
+    def frames(self):
+        return [self.main_frame] + self.state.get("frames", [])
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners.remove(handler)
+
+    def wait_for_timeout(self, milliseconds):
+        self.waits.append(milliseconds / 1000)
+        self.clock.now += milliseconds / 1000
+        if self.states:
+            self.state = self.states.pop(0)
+        if self.state.get("navigate"):
+            self.url = self.state["navigate"]
+            for handler in self.listeners:
+                handler(self.main_frame)
+
+    def query_selector_all(self, selector):
+        if self.state.get("broken"):
+            raise RuntimeError("Target closed")
+        if selector == ", ".join(CAPTCHA_CHALLENGE_SELECTORS):
+            return [Element()] if self.state.get("challenge") else []
+        if selector == ", ".join(CAPTCHA_RESPONSE_SELECTORS):
+            return [Element(value=self.state.get("token", ""))] if "token" in self.state else []
+        if selector == ", ".join(CAPTCHA_SELECTORS):
+            return [Element()] if self.state.get("widget") else []
+        raise AssertionError(f"unexpected selector {selector}")
+
+
+class FakeNovaAct:
+    def __init__(self, page, answers=()):
+        self.page = page
+        self.answers = list(answers)
+        self.questions = []
+
+    def act(self, prompt, schema=None):
+        self.questions.append(prompt)
+        captcha = self.answers.pop(0)
+        return types.SimpleNamespace(matches_schema=True, parsed_response=captcha)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(captcha_monitor.time, "monotonic", clock.monotonic)
+    # The model check imports BOOL_SCHEMA from nova_act, which is not needed to test the loop
+    monkeypatch.setitem(sys.modules, "nova_act", types.SimpleNamespace(BOOL_SCHEMA={"type": "boolean"}))
+    return clock
+
+
+def test_solved_challenge_ends_the_wait_without_asking_the_model(clock):
+    page = FakePage(clock, [{"challenge": True}, {"challenge": True}, {"widget": True, "token": "solved"}])
+    nova_act = FakeNovaAct(page)
+    assert wait_for_captcha_resolution(nova_act) is True
+    assert nova_act.questions == []
+    assert page.listeners == []
+
+
+def test_navigation_away_ends_the_wait(clock):
+    page = FakePage(clock, [{"widget": True}, {"widget": True, "navigate": "https://portal.example.com/home"}])
+    assert wait_for_captcha_resolution(FakeNovaAct(page)) is True
+
+
+def test_inconclusive_widget_asks_the_model_at_most_once_per_interval(clock):
+    page = FakePage(clock, [{"widget": True}])
+    nova_act = FakeNovaAct(page, answers=[True, False])
+    assert wait_for_captcha_resolution(nova_act, max_wait=80, model_check_interval=20) is True
+    assert len(nova_act.questions) == 2
+    # Backoff doubles from 1s and never exceeds max_delay
+    assert page.waits[:6] == [1, 2, 4, 8, 10, 10]
+
+
+def test_gives_up_after_max_wait(clock):
+    page = FakePage(clock, [{"challenge": True}])
+    nova_act = FakeNovaAct(page)
+    assert wait_for_captcha_resolution(nova_act, max_wait=30) is False
+    assert sum(page.waits) == pytest.approx(30)
+    assert nova_act.questions == []
+
+
+def test_checked_checkbox_frame_counts_as_solved(clock):
+    frames = [Frame("https://www.google.com/recaptcha/api2/anchor?k=abc", checked=True)]
+    page = FakePage(clock, [{"widget": True, "frames": frames}])
+    assert captcha_signals(page) is False
+
+
+def test_signals_are_inconclusive_when_the_page_cannot_be_inspected(clock):
+    assert captcha_signals(FakePage(clock, [{"broken": True}])) is None
+    assert captcha_signals(FakePage(clock, [{"widget": True}])) is None
+    assert captcha_signals(FakePage(clock, [{}])) is False
+
+
+def test_human_validation_error_is_found_in_nested_messages():
+    class ActError(Exception):
+        def __init__(self, message):
+            self.message = message
+
+    assert contains_human_validation_error(ActError(ActError("HumanValidationError: solve the CAPTCHA")))
+    assert not contains_human_validation_error(ActError("Timed out"))
+    assert not contains_human_validation_error(None)
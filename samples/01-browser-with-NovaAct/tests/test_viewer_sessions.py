@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+from viewer_sessions import LIVE_VIEW_URL_EXPIRES, SessionRegistry, UnknownSession
+
+
+class FakeClient:
+    def __init__(self, registration):
+        self.session_id = registration.session_id
+        self.urls = 0
+        self.control = []
+
+    def generate_live_view_url(self, expires):
+        self.urls += 1
+        return f"https://live.example.com/{self.session_id}/{self.urls}?expires={expires}"
+
+    def take_control(self):
+        self.control.append("take")
+
+    def release_control(self):
+        self.control.append("release")
+
+
+@pytest.fixture
+def registry():
+    built = []
+
+    def factory(registration):
+        built.append(FakeClient(registration))
+        return built[-1]
+
+    registry = SessionRegistry(client_factory=factory)
+    registry.built = built
+    return registry
+
+
+def _register(registry, session_id, label=""):
+    registry.register(SimpleNamespace(session_id=session_id, browser_identifier="aws.browser.v1",
+                                      region="us-west-2", label=label))
+
+
+def test_registered_sessions_are_listed_without_building_a_client(registry):
+    _register(registry, "s1", "ClientA")
+    _register(registry, "s2", "ClientB")
+    assert [(s["session_id"], s["label"], s["watchers"]) for s in registry.list()] == [
+        ("s1", "ClientA", 0), ("s2", "ClientB", 0)
+    ]
+    # Nobody is watching, so no live-view URL or client exists yet
+    assert registry.built == []
+
+
+def test_each_attach_gets_a_fresh_short_lived_url(registry):
+    _register(registry, "s1")
+    first = registry.attach("s1")
+    second = registry.attach("s1")
+    assert first != second and first.endswith(f"expires={LIVE_VIEW_URL_EXPIRES}")
+    assert len(registry.built) == 1
+    assert registry.list()[0]["watchers"] == 2
+
+
+def test_client_is_dropped_when_the_last_watcher_leaves(registry):
+    _register(registry, "s1")
+    registry.attach("s1")
+    registry.attach("s1")
+    registry.detach("s1")
+    registry.attach("s1")
+    assert len(registry.built) == 1
+    registry.detach("s1")
+    registry.detach("s1")
+    registry.detach("s1")
+    assert registry.list()[0]["watchers"] == 0
+    registry.attach("s1")
+    assert len(registry.built) == 2
+
+
+def test_unregistered_session_cannot_be_attached(registry):
+    _register(registry, "s1")
+    assert registry.unregister("s1") is True
+    assert registry.unregister("s1") is False
+    with pytest.raises(UnknownSession):
+        registry.attach("s1")
+    # Detaching after the job ended is harmless
+    registry.detach("s1")
+
+
+def test_control_actions(registry):
+    _register(registry, "s1")
+    registry.control("s1", "take")
+    registry.control("s1", "release")
+    assert registry.built[0].control == ["take", "release"]
+    with pytest.raises(ValueError):
+        registry.control("s1", "steal")
+    with pytest.raises(UnknownSession):
+        registry.control("missing", "take")
@@ -0,0 +1,107 @@
+"""Registry of browser sessions for multi_session_viewer.py.
+
+Kept free of the web framework so the session lifecycle (register, attach,
+detach, control) can be exercised without a server.
+"""
+
+import threading
+import time
+
+# Live-view URLs are presigned; keep them short so a leaked link is useless quickly
+LIVE_VIEW_URL_EXPIRES = 300
+
+
+class UnknownSession(LookupError):
+    pass
+
+
+def browser_client(registration):
+    """BrowserClient bound to a session another process started."""
+    from bedrock_agentcore.tools.browser_client import BrowserClient
+
+    client = BrowserClient(registration.region)
+    client.identifier = registration.browser_identifier
+    client.session_id = registration.session_id
+    return client
+
+
+class SessionRegistry:
+    def __init__(self, client_factory=browser_client):
+        """
+        Args:
+            client_factory: Builds the client for a registration the first time someone attaches
+        """
+        self.client_factory = client_factory
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def register(self, registration):
+        with self._lock:
+            self._sessions[registration.session_id] = {
+                "registration": registration,
+                "registered_at": time.time(),
+                "watchers": 0,
+                "client": None,
+            }
+
+    def unregister(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def list(self):
+        with self._lock:
+            return [
+                {
+                    "session_id": session_id,
+                    "label": entry["registration"].label,
+                    "region": entry["registration"].region,
+                    "registered_at": entry["registered_at"],
+                    "watchers": entry["watchers"],
+                }
+                for session_id, entry in self._sessions.items()
+            ]
+
+    def _entry(self, session_id):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            raise UnknownSession(f"Unknown session {session_id}")
+        return entry
+
+    def _client(self, entry):
+        # The client is only built for sessions someone attaches to
+        if entry["client"] is None:
+            entry["client"] = self.client_factory(entry["registration"])
+        return entry["client"]
+
+    def attach(self, session_id):
+        with self._lock:
+            entry = self._entry(session_id)
+            client = self._client(entry)
+            entry["watchers"] += 1
+        return client.generate_live_view_url(expires=LIVE_VIEW_URL_EXPIRES)
+
+    def detach(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return
+            entry["watchers"] = max(0, entry["watchers"] - 1)
+            if entry["watchers"] == 0:
+                entry["client"] = None
+
+    def control(self, session_id, action):
+        """Take or release control of the session.
+
+        Raises:
+            UnknownSession for a session that is not registered
+            ValueError for an action other than "take" or "release"
+        """
+        if action not in ("take", "release"):
+            raise ValueError("action must be 'take' or 'release'")
+        with self._lock:
+            entry = self._entry(session_id)
+            client = self._client(entry)
+        if action == "take":
+            client.take_control()
+        else:
+            client.release_control()
@@ -1,7 +1,133 @@
 
 # This Lambda function is designed to be used as an MCP tool in Bedrock AgentCore Gateway.
 # It routes requests based on the tool name provided in the invocation context.
+#
+# Tools register themselves with the @tool decorator. The registry maps each tool
+# name to its handler and a pre-compiled input schema, so routing is a single dict
+# lookup and no schema work happens per invocation. One warm Lambda can therefore
+# serve many tools behind a single gateway target.
 import json
+import logging
+import os
+
+logger = logging.getLogger()
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+
+# Gateway prefixes tool names with "<target name>___"
+DELIMITER = "___"
+
+# JSON schema type name -> accepted Python types
+_JSON_TYPES = {
+    'string': (str,),
+    'integer': (int,),
+    'number': (int, float),
+    'boolean': (bool,),
+    'object': (dict,),
+    'array': (list,),
+}
+
+TOOLS = {}
+
+
+def _compile_schema(input_schema):
+    """Reduce an MCP inputSchema to the checks run per call: required names, declared names and property types."""
+    required = tuple(input_schema.get('required', ()))
+    properties = input_schema.get('properties', {})
+    types = {}
+    for name, spec in properties.items():
+        if spec.get('type') in _JSON_TYPES:
+            types[name] = _JSON_TYPES[spec['type']]
+    return required, frozenset(properties), types
+
+
+def tool(name, input_schema=None):
+    """Register a handler for a tool name; the schema is compiled once at import time."""
+    def register(handler):
+        if name in TOOLS:
+            raise ValueError(f"Tool '{name}' is already registered")
+        TOOLS[name] = (handler, _compile_schema(input_schema or {}))
+        return handler
+    return register
+
+
+def _validate(arguments, compiled_schema):
+    required, declared, types = compiled_schema
+    if not isinstance(arguments, dict):
+        return "Arguments must be an object"
+    missing = [name for name in required if name not in arguments]
+    if missing:
+        return f"Missing required parameter(s): {', '.join(missing)}"
+    # Handlers take declared parameters only; anything else would fail the call with a TypeError
+    unknown = sorted(name for name in arguments if name not in declared)
+    if unknown:
+        return f"Unknown parameter(s): {', '.join(unknown)}"
+    for name, value in arguments.items():
+        expected = types.get(name)
+        # bool is a subclass of int; do not let True pass as an integer
+        if expected and (not isinstance(value, expected) or (isinstance(value, bool) and bool not in expected)):
+            return f"Parameter '{name}' has the wrong type"
+    return None
+
+
+def dispatch(tool_name, arguments):
+    """Route one tool call through the registry."""
+    if DELIMITER in tool_name:
+        tool_name = tool_name[tool_name.index(DELIMITER) + len(DELIMITER):]
+
+    entry = TOOLS.get(tool_name)
+    if entry is None:
+        return {'statusCode': 400, 'body': f"Unknown tool: {tool_name}"}
+
+    handler, compiled_schema = entry
+    error = _validate(arguments, compiled_schema)
+    if error:
+        return {'statusCode': 400, 'body': error}
+
+    try:
+        return {'statusCode': 200, 'body': handler(**arguments)}
+    except Exception as e:
+        logger.exception("Tool %s failed", tool_name)
+        return {'statusCode': 500, 'body': f"Tool {tool_name} failed: {str(e)}"}
+
+
+@tool('get_order_tool', {
+    'type': 'object',
+    'properties': {'orderId': {'type': 'string'}},
+    'required': ['orderId']
+})
+def get_order(orderId):
+    # Respond with order status for get_order_tool
+    return f"Order Id {orderId} is in shipped status"
+
+
+@tool('update_order_tool', {
+    'type': 'object',
+    'properties': {'orderId': {'type': 'string'}},
+    'required': ['orderId']
+})
+def update_order(orderId):
+    # Respond with update confirmation for update_order_tool
+    return "Updated the order details successfully"
+
+
+@tool('batch_tool', {
+    'type': 'object',
+    'properties': {'calls': {'type': 'array'}},
+    'required': ['calls']
+})
+def batch(calls):
+    # Run several tool calls in one invocation: [{"name": ..., "arguments": {...}}, ...]
+    results = []
+    for call in calls:
+        if not isinstance(call, dict):
+            results.append({'name': None, 'statusCode': 400, 'body': 'Each call must be an object'})
+            continue
+        name = call.get('name', '')
+        if name == 'batch_tool':
+            results.append({'name': name, 'statusCode': 400, 'body': 'Nested batches are not supported'})
+            continue
+        results.append({'name': name, **dispatch(name, call.get('arguments') or {})})
+    return results
 
 
 def lambda_handler(event, context):
@@ -18,20 +144,15 @@ def lambda_handler(event, context):
 
     # Extract the tool name from the custom context field
     toolName = context.client_context.custom['bedrockAgentCoreToolName']
-    print("Lambda invocation context:", context.client_context)
-    print("Event payload:", event)
-    print(f"Original toolName: {toolName}")
-
-    # If the tool name contains a delimiter (___), extract the actual tool name
-    delimiter = "___"
-    if delimiter in toolName:
-        toolName = toolName[toolName.index(delimiter) + len(delimiter):]
-    print(f"Converted toolName: {toolName}")
-
-    # Route logic based on tool name
-    if toolName == 'get_order_tool':
-        # Respond with order status for get_order_tool
-        return {'statusCode': 200, 'body': "Order Id 123 is in shipped status"}
-    else:
-        # Respond with update confirmation for other tools (e.g., update_order_tool)
-        return {'statusCode': 200, 'body': "Updated the order details successfully"}
+
+    # Full payloads are only serialized when debug logging is switched on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps({
+            'toolName': toolName,
+            'custom': context.client_context.custom,
+            'event': event
+        }, default=str))
+
+    response = dispatch(toolName, event)
+    logger.info(json.dumps({'toolName': toolName, 'statusCode': response['statusCode']}))
+    return response
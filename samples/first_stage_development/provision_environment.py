@@ -0,0 +1,259 @@
+"""Provision an AgentCore client environment as a dependency graph.
+
+The notebooks create Cognito, IAM roles, the gateway Lambda and the gateway
+one cell at a time. Here each piece is a step that names the steps it depends
+on; independent branches (IAM roles and the Lambda alongside the Cognito
+setup) run concurrently, so total time is the critical path rather than the
+sum of all steps.
+
+Progress is written to a local state manifest after every step. Re-running
+with the same manifest skips steps that already finished and resumes from the
+one that failed.
+
+Usage:
+    python provision_environment.py --config environment.json --state .provision_state.json
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import boto3
+import techresidential_utils as utils
+
+
+class Step:
+    def __init__(self, name, run, depends_on=(), persist=True):
+        """
+        Args:
+            name: Unique step name, also used as the key of its result
+            run: Callable taking a dict of dependency results, returning a JSON-serializable result
+            depends_on: Names of steps that must finish first
+            persist: Whether the result may be stored in the manifest; steps whose
+                     result holds secrets are re-run on resume instead
+        """
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        self.persist = persist
+
+
+def _load_state(state_path):
+    if state_path and os.path.exists(state_path):
+        with open(state_path) as f:
+            return json.load(f)
+    return {"steps": {}}
+
+
+def _save_state(state, state_path):
+    if not state_path:
+        return
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def run_steps(steps, state_path=None, max_workers=4):
+    """Run steps in dependency order, concurrently where possible.
+
+    Returns:
+        Dictionary of step name -> result
+    Raises:
+        RuntimeError if a step fails; finished steps stay recorded in the manifest
+    """
+    by_name = {step.name: step for step in steps}
+    for step in steps:
+        unknown = [dep for dep in step.depends_on if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Step '{step.name}' depends on unknown step(s): {', '.join(unknown)}")
+
+    state = _load_state(state_path)
+    results = {}
+    done = set()
+    for name, record in state["steps"].items():
+        if name in by_name and by_name[name].persist and record.get("status") == "done":
+            results[name] = record["result"]
+            done.add(name)
+            print(f"⏭️  {name}: already done (from {state_path})")
+
+    failures = {}
+    running = {}
+
+    def execute(step):
+        started = time.monotonic()
+        result = step.run({dep: results[dep] for dep in step.depends_on})
+        return result, time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            if not failures:
+                for step in steps:
+                    if step.name in done or step.name in running.values():
+                        continue
+                    if all(dep in done for dep in step.depends_on):
+                        print(f"▶️  {step.name}")
+                        running[executor.submit(execute, step)] = step.name
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    result, elapsed = future.result()
+                except Exception as e:
+                    failures[name] = e
+                    print(f"❌ {name}: {e}")
+                    record = {"status": "failed", "error": str(e)}
+                else:
+                    results[name] = result
+                    done.add(name)
+                    print(f"✅ {name} ({elapsed:.1f}s)")
+                    record = {"status": "done", "seconds": round(elapsed, 2)}
+                    if by_name[name].persist:
+                        record["result"] = result
+                state["steps"][name] = record
+                _save_state(state, state_path)
+
+    if failures:
+        raise RuntimeError(f"Provisioning failed at: {', '.join(failures)}. Re-run to resume from {state_path}")
+
+    blocked = [step.name for step in steps if step.name not in done]
+    if blocked:
+        raise RuntimeError(f"Steps could not run because of a dependency cycle: {', '.join(blocked)}")
+    return results
+
+
+def environment_steps(config, region):
+    """Steps for one client environment, mirroring first_stage_gateway.ipynb.
+
+    Args:
+        config: Dictionary with user_pool_name, resource_server_id, resource_server_name,
+                client_name, gateway_name, agent_name, lambda_code_path and optional
+                gateway_targets (list of {name, description, tools})
+        region: AWS region
+    """
+    # Shared clients are created here, on the calling thread, and reused by the steps
+    cognito = boto3.client("cognito-idp", region_name=region)
+    gateway_client = boto3.client("bedrock-agentcore-control", region_name=region)
+    resource_server_id = config["resource_server_id"]
+    scopes = [
+        {"ScopeName": "gateway:read", "ScopeDescription": "Read access"},
+        {"ScopeName": "gateway:write", "ScopeDescription": "Write access"}
+    ]
+
+    def user_pool(_):
+        return utils.get_or_create_user_pool(cognito, config["user_pool_name"])
+
+    def resource_server(deps):
+        return utils.get_or_create_resource_server(
+            cognito, deps["user_pool"], resource_server_id, config["resource_server_name"], scopes
+        )
+
+    def m2m_client(deps):
+        client_id, client_secret = utils.get_or_create_m2m_client(
+            cognito, deps["user_pool"], config["client_name"], resource_server_id
+        )
+        return {"client_id": client_id, "client_secret": client_secret}
+
+    # Steps run on worker threads; each builds its own session, since boto3's default session is not thread-safe
+    def gateway_role(_):
+        session = boto3.Session(region_name=region)
+        return utils.create_agentcore_gateway_role(config["gateway_name"], boto_session=session)["Role"]["Arn"]
+
+    def agentcore_role(_):
+        session = boto3.Session(region_name=region)
+        return utils.create_agentcore_role(config["agent_name"], boto_session=session)["Role"]["Arn"]
+
+    def gateway_lambda(_):
+        session = boto3.Session(region_name=region)
+        response = utils.create_gateway_lambda(config["lambda_code_path"], boto_session=session)
+        if response["exit_code"] != 0 and not response["lambda_function_arn"].startswith("arn:"):
+            raise RuntimeError(response["lambda_function_arn"])
+        return response["lambda_function_arn"]
+
+    def gateway(deps):
+        gateway_id = utils.get_gateway_id(gateway_client, config["gateway_name"])
+        if gateway_id:
+            response = gateway_client.get_gateway(gatewayIdentifier=gateway_id)
+        else:
+            # The gateway role may have been created moments ago; retry until the service can assume it
+            response = utils.retry_until_role_ready(lambda: gateway_client.create_gateway(
+                name=config["gateway_name"],
+                roleArn=deps["gateway_role"],
+                protocolType="MCP",
+                authorizerType="CUSTOM_JWT",
+                authorizerConfiguration={
+                    "customJWTAuthorizer": {
+                        "allowedClients": [deps["m2m_client"]["client_id"]],
+                        "discoveryUrl": f"https://cognito-idp.{region}.amazonaws.com/{deps['user_pool']}/.well-known/openid-configuration"
+                    }
+                },
+                description=f"AgentCore Gateway for {config['gateway_name']}"
+            ), f"gateway role for {config['gateway_name']}")
+        return {"gateway_id": response["gatewayId"], "gateway_url": response["gatewayUrl"]}
+
+    def gateway_targets(deps):
+        gateway_id = deps["gateway"]["gateway_id"]
+        existing = {
+            item["name"] for item in utils._paginate(
+                gateway_client.list_gateway_targets, "items", "nextToken", "nextToken",
+                gatewayIdentifier=gateway_id, maxResults=100
+            )
+        }
+        created = []
+        for target in config.get("gateway_targets", []):
+            if target["name"] in existing:
+                continue
+            gateway_client.create_gateway_target(
+                gatewayIdentifier=gateway_id,
+                name=target["name"],
+                description=target.get("description", ""),
+                targetConfiguration={"mcp": {"lambda": {
+                    "lambdaArn": deps["gateway_lambda"],
+                    "toolSchema": {"inlinePayload": target["tools"]}
+                }}},
+                credentialProviderConfigurations=[{"credentialProviderType": "GATEWAY_IAM_ROLE"}]
+            )
+            created.append(target["name"])
+        return created
+
+    return [
+        Step("user_pool", user_pool),
+        Step("resource_server", resource_server, ["user_pool"]),
+        # Holds the client secret, so it is looked up again on resume instead of stored
+        Step("m2m_client", m2m_client, ["user_pool", "resource_server"], persist=False),
+        Step("gateway_role", gateway_role),
+        Step("agentcore_role", agentcore_role),
+        Step("gateway_lambda", gateway_lambda),
+        Step("gateway", gateway, ["user_pool", "m2m_client", "gateway_role"]),
+        Step("gateway_targets", gateway_targets, ["gateway", "gateway_lambda"]),
+    ]
+
+
+def provision_environment(config, state_path=".provision_state.json", region=None, max_workers=4):
+    region = region or boto3.session.Session().region_name
+    started = time.monotonic()
+    results = run_steps(environment_steps(config, region), state_path, max_workers)
+    print(f"🏁 Environment ready in {time.monotonic() - started:.1f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", required=True, help="Path to JSON environment config")
+    parser.add_argument("--state", default=".provision_state.json", help="Path to the resume manifest")
+    parser.add_argument("--region", default=None, help="AWS region")
+    parser.add_argument("--max-workers", type=int, default=4, help="Steps run concurrently")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        environment_config = json.load(f)
+
+    results = provision_environment(environment_config, args.state, args.region, args.max_workers)
+    for name, result in results.items():
+        if name != "m2m_client":
+            print(f"{name}: {result}")
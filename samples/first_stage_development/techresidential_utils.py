@@ -5,7 +5,139 @@ from boto3.session import Session
 import botocore
 import requests
 import os
-import time
+import random
+import threading
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# name -> id indexes filled while paging through list APIs. Each entry keeps the
+# partially consumed page iterator, so a later lookup resumes where the last one
+# stopped instead of listing from the first page again.
+_resource_index = {}
+# Guards the dict of entries only; each entry has its own lock for its index and
+# page iterator (which cannot be shared across threads), so a page fetch for one
+# resource type never blocks lookups of another
+_resource_index_lock = threading.Lock()
+
+def _paginate(call, items_key, token_param, token_key, **kwargs):
+    """Yield items from a list API, fetching the next page only when needed."""
+    while True:
+        response = call(**kwargs)
+        yield from response.get(items_key, [])
+        token = response.get(token_key)
+        if not token:
+            return
+        kwargs[token_param] = token
+
+def _index_entry(index_key):
+    with _resource_index_lock:
+        return _resource_index.setdefault(index_key, {"index": {}, "pages": None, "lock": threading.Lock()})
+
+def _lookup(index_key, pages, name_field, id_field, name):
+    """Return the id for name, paging lazily and stopping at the first match.
+
+    pages is only used when no listing is in progress for index_key. A page
+    call that raises (e.g. throttling) propagates and drops the cached
+    iterator, so the next lookup lists again instead of reporting a miss.
+    """
+    entry = _index_entry(index_key)
+    with entry["lock"]:
+        if name in entry["index"]:
+            return entry["index"][name]
+        if entry["pages"] is None:
+            entry["pages"] = iter(pages)
+        try:
+            for item in entry["pages"]:
+                # setdefault keeps the first match if names are duplicated
+                entry["index"].setdefault(item[name_field], item[id_field])
+                if item[name_field] == name:
+                    return item[id_field]
+        except Exception:
+            # A generator that raised is finished; never resume from it
+            entry["pages"] = None
+            raise
+        return None
+
+def _remember(index_key, name, resource_id):
+    entry = _index_entry(index_key)
+    with entry["lock"]:
+        if resource_id is None:
+            entry["index"].pop(name, None)
+        else:
+            entry["index"][name] = resource_id
+
+def _forget_id(kind, resource_id):
+    with _resource_index_lock:
+        entries = [entry for (index_kind, _), entry in _resource_index.items() if index_kind == kind]
+    for entry in entries:
+        with entry["lock"]:
+            index = entry["index"]
+            for name in [name for name, value in index.items() if value == resource_id]:
+                del index[name]
+
+def reset_resource_index():
+    """Forget cached lookups, e.g. after resources were changed outside this process."""
+    with _resource_index_lock:
+        _resource_index.clear()
+
+# Upper bound for IAM propagation waits, overridable per call
+ROLE_READY_MAX_WAIT = int(os.environ.get("ROLE_READY_MAX_WAIT", "120"))
+
+class RoleNotReady(Exception):
+    pass
+
+def wait_until(check, description, max_wait=ROLE_READY_MAX_WAIT, initial_delay=1, max_delay=15, retry_on=(RoleNotReady,)):
+    """Poll check() with exponential backoff and full jitter until it returns a truthy value.
+
+    check may raise one of retry_on to signal "not ready yet"; any other error
+    propagates immediately. TimeoutError is raised once max_wait seconds pass.
+    """
+    deadline = time.monotonic() + max_wait
+    delay = initial_delay
+    last_error = None
+    while True:
+        try:
+            result = check()
+            if result:
+                return result
+        except retry_on as e:
+            last_error = e
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"{description} not ready after {max_wait}s" + (f": {last_error}" if last_error else ""))
+        time.sleep(min(random.uniform(0, delay), remaining))
+        delay = min(delay * 2, max_delay)
+
+def wait_for_role(iam_client, role_name, max_wait=ROLE_READY_MAX_WAIT):
+    """Return as soon as IAM reports the role.
+
+    This only proves the role exists in IAM, not that other services can assume
+    it yet; create the resource that uses the role with retry_until_role_ready.
+    """
+    waiter = iam_client.get_waiter("role_exists")
+    waiter.wait(RoleName=role_name, WaiterConfig={"Delay": 1, "MaxAttempts": max(1, int(max_wait))})
+    return iam_client.get_role(RoleName=role_name)
+
+# Errors services return while a new role has not propagated to them yet
+ROLE_NOT_READY_ERROR_CODES = {"InvalidParameterValueException", "ValidationException", "AccessDeniedException"}
+
+def retry_until_role_ready(create, description, max_wait=ROLE_READY_MAX_WAIT):
+    """Call create() until the service accepts a freshly created role, then return its result.
+
+    A new role is rejected ("cannot be assumed", "invalid role") until IAM has
+    propagated it to the calling service. Retrying the dependent call is the
+    probe, so waiting stops the moment the role works; other errors propagate.
+    """
+    def attempt():
+        try:
+            return create()
+        except botocore.exceptions.ClientError as error:
+            message = error.response['Error'].get('Message', '')
+            if error.response['Error']['Code'] in ROLE_NOT_READY_ERROR_CODES and ("assume" in message.lower() or "role" in message.lower()):
+                print(f"Waiting for IAM role to propagate ({description})...")
+                raise RoleNotReady(message)
+            raise
+    return wait_until(attempt, description, max_wait)
 
 def setup_cognito_user_pool():
     boto_session = Session()
@@ -84,25 +216,25 @@ def setup_cognito_user_pool():
         return None
 
 def get_or_create_user_pool(cognito, USER_POOL_NAME):
-    response = cognito.list_user_pools(MaxResults=60)
-    for pool in response["UserPools"]:
-        if pool["Name"] == USER_POOL_NAME:
-            user_pool_id = pool["Id"]
-            response = cognito.describe_user_pool(
-                UserPoolId=user_pool_id
-            )
-        
-            # Get the domain from user pool description
-            user_pool = response.get('UserPool', {})
-            domain = user_pool.get('Domain')
-        
-            if domain:
-                region = user_pool_id.split('_')[0] if '_' in user_pool_id else REGION
-                domain_url = f"https://{domain}.auth.{region}.amazoncognito.com"
-                print(f"Found domain for user pool {user_pool_id}: {domain} ({domain_url})")
-            else:
-                print(f"No domains found for user pool {user_pool_id}")
-            return pool["Id"]
+    index_key = ("user_pools", cognito.meta.region_name)
+    pages = _paginate(cognito.list_user_pools, "UserPools", "NextToken", "NextToken", MaxResults=60)
+    user_pool_id = _lookup(index_key, pages, "Name", "Id", USER_POOL_NAME)
+    if user_pool_id:
+        response = cognito.describe_user_pool(
+            UserPoolId=user_pool_id
+        )
+
+        # Get the domain from user pool description
+        user_pool = response.get('UserPool', {})
+        domain = user_pool.get('Domain')
+
+        if domain:
+            region = user_pool_id.split('_')[0] if '_' in user_pool_id else cognito.meta.region_name
+            domain_url = f"https://{domain}.auth.{region}.amazoncognito.com"
+            print(f"Found domain for user pool {user_pool_id}: {domain} ({domain_url})")
+        else:
+            print(f"No domains found for user pool {user_pool_id}")
+        return user_pool_id
     print('Creating new user pool')
     created = cognito.create_user_pool(PoolName=USER_POOL_NAME)
     user_pool_id = created["UserPool"]["Id"]
@@ -112,7 +244,8 @@ def get_or_create_user_pool(cognito, USER_POOL_NAME):
         UserPoolId=user_pool_id
     )
     print("Domain created as well")
-    return created["UserPool"]["Id"]
+    _remember(index_key, USER_POOL_NAME, user_pool_id)
+    return user_pool_id
 
 def get_or_create_resource_server(cognito, user_pool_id, RESOURCE_SERVER_ID, RESOURCE_SERVER_NAME, SCOPES):
     try:
@@ -132,11 +265,13 @@ def get_or_create_resource_server(cognito, user_pool_id, RESOURCE_SERVER_ID, RES
         return RESOURCE_SERVER_ID
 
 def get_or_create_m2m_client(cognito, user_pool_id, CLIENT_NAME, RESOURCE_SERVER_ID):
-    response = cognito.list_user_pool_clients(UserPoolId=user_pool_id, MaxResults=60)
-    for client in response["UserPoolClients"]:
-        if client["ClientName"] == CLIENT_NAME:
-            describe = cognito.describe_user_pool_client(UserPoolId=user_pool_id, ClientId=client["ClientId"])
-            return client["ClientId"], describe["UserPoolClient"]["ClientSecret"]
+    index_key = ("user_pool_clients", user_pool_id)
+    pages = _paginate(cognito.list_user_pool_clients, "UserPoolClients", "NextToken", "NextToken",
+                      UserPoolId=user_pool_id, MaxResults=60)
+    client_id = _lookup(index_key, pages, "ClientName", "ClientId", CLIENT_NAME)
+    if client_id:
+        describe = cognito.describe_user_pool_client(UserPoolId=user_pool_id, ClientId=client_id)
+        return client_id, describe["UserPoolClient"]["ClientSecret"]
     print('creating new m2m client')
     created = cognito.create_user_pool_client(
         UserPoolId=user_pool_id,
@@ -148,36 +283,212 @@ def get_or_create_m2m_client(cognito, user_pool_id, CLIENT_NAME, RESOURCE_SERVER
         SupportedIdentityProviders=["COGNITO"],
         ExplicitAuthFlows=["ALLOW_REFRESH_TOKEN_AUTH"]
     )
+    _remember(index_key, CLIENT_NAME, created["UserPoolClient"]["ClientId"])
     return created["UserPoolClient"]["ClientId"], created["UserPoolClient"]["ClientSecret"]
 
-def get_token(user_pool_id: str, client_id: str, client_secret: str, scope_string: str, REGION: str) -> dict:
-    try:
+class TokenProvider:
+    """Caches Cognito client-credentials tokens per (user pool, client, scope).
+
+    Tokens are reused until refresh_margin seconds before expires_in. Inside the
+    margin the cached token is still returned while one background thread fetches
+    a new one; once expired, the first caller refreshes and concurrent callers
+    wait for its result instead of issuing their own request. All requests share
+    one pooled HTTP session.
+    """
+
+    def __init__(self, refresh_margin=300, session=None):
+        self.refresh_margin = refresh_margin
+        self.session = session or requests.Session()
+        self._tokens = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _fetch(self, key, client_secret):
+        user_pool_id, client_id, scope_string, region = key
         # Cognito’s hosted domain for OAuth endpoints uses the user pool ID without underscores in its subdomain.
         user_pool_id_without_underscore = user_pool_id.replace("_", "")
         # OAuth2 token endpoint URL on cognito domain
-        url = f"https://{user_pool_id_without_underscore}.auth.{REGION}.amazoncognito.com/oauth2/token"
+        url = f"https://{user_pool_id_without_underscore}.auth.{region}.amazoncognito.com/oauth2/token"
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         data = {
             "grant_type": "client_credentials",
             "client_id": client_id,
             "client_secret": client_secret,
             "scope": scope_string,
-
         }
-        # print(client_id)
-        response = requests.post(url, headers=headers, data=data)
+        response = self.session.post(url, headers=headers, data=data, timeout=10)
         response.raise_for_status()
-        return response.json()
+        token = response.json()
+        entry = (token, time.time() + int(token.get("expires_in", 3600)))
+        with self._lock:
+            self._tokens[key] = entry
+        return entry
+
+    def _refresh_in_background(self, key, client_secret):
+        lock = self._key_lock(key)
+        # Another caller is already refreshing this token
+        if not lock.acquire(blocking=False):
+            return
+
+        def refresh():
+            try:
+                self._fetch(key, client_secret)
+            except requests.exceptions.RequestException as err:
+                # The cached token is still valid; the next call past expiry retries in the foreground
+                print(f"Background token refresh failed: {err}")
+            finally:
+                lock.release()
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get(self, user_pool_id, client_id, client_secret, scope_string, region):
+        key = (user_pool_id, client_id, scope_string, region)
+        with self._lock:
+            entry = self._tokens.get(key)
+
+        if entry is None or time.time() >= entry[1]:
+            with self._key_lock(key):
+                with self._lock:
+                    entry = self._tokens.get(key)
+                # A concurrent caller may have refreshed while we waited for the lock
+                if entry is None or time.time() >= entry[1]:
+                    entry = self._fetch(key, client_secret)
+        elif time.time() >= entry[1] - self.refresh_margin:
+            self._refresh_in_background(key, client_secret)
+
+        token, expires_at = entry
+        return {**token, "expires_in": max(0, int(expires_at - time.time()))}
+
+    def invalidate(self, user_pool_id, client_id, scope_string, region):
+        with self._lock:
+            self._tokens.pop((user_pool_id, client_id, scope_string, region), None)
+
+_token_provider = TokenProvider()
 
+def get_token(user_pool_id: str, client_id: str, client_secret: str, scope_string: str, REGION: str) -> dict:
+    """Return a client-credentials token, served from the shared cache while it is valid."""
+    try:
+        return _token_provider.get(user_pool_id, client_id, client_secret, scope_string, REGION)
     except requests.exceptions.RequestException as err:
         return {"error": str(err)}
     
-def create_agentcore_role(agent_name):
-    iam_client = boto3.client('iam')
+def _normalize_policy(document):
+    """Canonical form of an IAM policy so documents compare equal regardless of formatting."""
+    if isinstance(document, str):
+        document = json.loads(unquote(document))
+
+    def normalize(value, key=None):
+        if isinstance(value, dict):
+            return {k: normalize(v, k) for k, v in value.items()}
+        # IAM accepts a single string or a list for these; compare them as sets
+        if isinstance(value, str) and key in ("Action", "NotAction", "Resource", "NotResource", "Service", "AWS", "Federated"):
+            value = [value]
+        if isinstance(value, list):
+            return sorted((normalize(item) for item in value), key=lambda item: json.dumps(item, sort_keys=True))
+        return value
+
+    document = dict(document)
+    if isinstance(document.get("Statement"), dict):
+        document["Statement"] = [document["Statement"]]
+    return json.dumps(normalize(document), sort_keys=True)
+
+def _policy_changes(existing_policies, inline_policies):
+    """Inline policies to put and to delete so a role holds exactly inline_policies.
+
+    Args:
+        existing_policies: Policy name -> document currently on the role (as IAM returns it)
+        inline_policies: Policy name -> desired document
+    Returns:
+        (names to put, names to delete), each sorted
+    """
+    to_put = sorted(
+        policy_name for policy_name, policy in inline_policies.items()
+        if policy_name not in existing_policies or _normalize_policy(existing_policies[policy_name]) != _normalize_policy(policy)
+    )
+    return to_put, sorted(existing_policies.keys() - inline_policies.keys())
+
+def _create_or_reconcile_role(iam_client, role_name, trust_policy, inline_policies, reconcile=True):
+    """Create a role with inline policies, or bring an existing one in line with them.
+
+    With reconcile=True an existing role is compared against the desired trust and
+    inline policies and only the differences are applied, so an unchanged role
+    costs a few reads and no IAM propagation wait. With reconcile=False the role
+    is deleted and recreated, as before.
+    """
+    trust_policy_json = json.dumps(trust_policy)
+    try:
+        iam_client.create_role(
+            RoleName=role_name,
+            AssumeRolePolicyDocument=trust_policy_json
+        )
+        # Wait until IAM reports the role rather than sleeping a fixed time
+        agentcore_iam_role = wait_for_role(iam_client, role_name)
+        existing_policies = {}
+    except iam_client.exceptions.EntityAlreadyExistsException:
+        if not reconcile:
+            print("Role already exists -- deleting and creating it again")
+            for policy_name in iam_client.get_paginator("list_role_policies").paginate(RoleName=role_name).search("PolicyNames"):
+                iam_client.delete_role_policy(
+                    RoleName=role_name,
+                    PolicyName=policy_name
+                )
+            print(f"deleting {role_name}")
+            iam_client.delete_role(
+                RoleName=role_name
+            )
+            print(f"recreating {role_name}")
+            iam_client.create_role(
+                RoleName=role_name,
+                AssumeRolePolicyDocument=trust_policy_json
+            )
+            agentcore_iam_role = wait_for_role(iam_client, role_name)
+            existing_policies = {}
+        else:
+            print(f"Role {role_name} already exists -- reconciling policies")
+            agentcore_iam_role = iam_client.get_role(RoleName=role_name)
+            if _normalize_policy(agentcore_iam_role["Role"]["AssumeRolePolicyDocument"]) != _normalize_policy(trust_policy):
+                print(f"updating trust policy of {role_name}")
+                iam_client.update_assume_role_policy(
+                    RoleName=role_name,
+                    PolicyDocument=trust_policy_json
+                )
+            existing_policies = {
+                policy_name: iam_client.get_role_policy(RoleName=role_name, PolicyName=policy_name)["PolicyDocument"]
+                for policy_name in iam_client.get_paginator("list_role_policies").paginate(RoleName=role_name).search("PolicyNames")
+            }
+
+    to_put, to_delete = _policy_changes(existing_policies, inline_policies)
+    for policy_name in to_put:
+        print(f"attaching role policy {policy_name} to {role_name}")
+        try:
+            iam_client.put_role_policy(
+                PolicyDocument=json.dumps(inline_policies[policy_name]),
+                PolicyName=policy_name,
+                RoleName=role_name
+            )
+        except Exception as e:
+            print(e)
+
+    for policy_name in to_delete:
+        print(f"removing stale role policy {policy_name} from {role_name}")
+        iam_client.delete_role_policy(
+            RoleName=role_name,
+            PolicyName=policy_name
+        )
+
+    return agentcore_iam_role
+
+def create_agentcore_role(agent_name, reconcile=True, boto_session=None):
+    # Callers on worker threads pass their own session; the shared default session is not thread-safe
+    boto_session = boto_session or Session()
+    iam_client = boto_session.client('iam')
     agentcore_role_name = f'agentcore-{agent_name}-role'
-    boto_session = Session()
     region = boto_session.region_name
-    account_id = boto3.client("sts").get_caller_identity()["Account"]
+    account_id = boto_session.client("sts").get_caller_identity()["Account"]
     role_policy = {
         "Version": "2012-10-17",
         "Statement": [
@@ -294,60 +605,17 @@ def create_agentcore_role(agent_name):
         ]
     }
 
-    assume_role_policy_document_json = json.dumps(
-        assume_role_policy_document
+    return _create_or_reconcile_role(
+        iam_client, agentcore_role_name, assume_role_policy_document, {"AgentCorePolicy": role_policy}, reconcile
     )
-    role_policy_document = json.dumps(role_policy)
-    # Create IAM Role for the Lambda function
-    try:
-        agentcore_iam_role = iam_client.create_role(
-            RoleName=agentcore_role_name,
-            AssumeRolePolicyDocument=assume_role_policy_document_json
-        )
-
-        # Pause to make sure role is created
-        time.sleep(10)
-    except iam_client.exceptions.EntityAlreadyExistsException:
-        print("Role already exists -- deleting and creating it again")
-        policies = iam_client.list_role_policies(
-            RoleName=agentcore_role_name,
-            MaxItems=100
-        )
-        print("policies:", policies)
-        for policy_name in policies['PolicyNames']:
-            iam_client.delete_role_policy(
-                RoleName=agentcore_role_name,
-                PolicyName=policy_name
-            )
-        print(f"deleting {agentcore_role_name}")
-        iam_client.delete_role(
-            RoleName=agentcore_role_name
-        )
-        print(f"recreating {agentcore_role_name}")
-        agentcore_iam_role = iam_client.create_role(
-            RoleName=agentcore_role_name,
-            AssumeRolePolicyDocument=assume_role_policy_document_json
-        )
-
-    # Attach the AWSLambdaBasicExecutionRole policy
-    print(f"attaching role policy {agentcore_role_name}")
-    try:
-        iam_client.put_role_policy(
-            PolicyDocument=role_policy_document,
-            PolicyName="AgentCorePolicy",
-            RoleName=agentcore_role_name
-        )
-    except Exception as e:
-        print(e)
-
-    return agentcore_iam_role
 
-def create_agentcore_gateway_role(gateway_name):
-    iam_client = boto3.client('iam')
+def create_agentcore_gateway_role(gateway_name, reconcile=True, boto_session=None):
+    # Callers on worker threads pass their own session; the shared default session is not thread-safe
+    boto_session = boto_session or Session()
+    iam_client = boto_session.client('iam')
     agentcore_gateway_role_name = f'agentcore-{gateway_name}-role'
-    boto_session = Session()
     region = boto_session.region_name
-    account_id = boto3.client("sts").get_caller_identity()["Account"]
+    account_id = boto_session.client("sts").get_caller_identity()["Account"]
     role_policy = {
         "Version": "2012-10-17",
         "Statement": [{
@@ -388,62 +656,18 @@ def create_agentcore_gateway_role(gateway_name):
         ]
     }
 
-    assume_role_policy_document_json = json.dumps(
-        assume_role_policy_document
+    return _create_or_reconcile_role(
+        iam_client, agentcore_gateway_role_name, assume_role_policy_document, {"AgentCorePolicy": role_policy}, reconcile
     )
 
-    role_policy_document = json.dumps(role_policy)
-    # Create IAM Role for the Lambda function
-    try:
-        agentcore_iam_role = iam_client.create_role(
-            RoleName=agentcore_gateway_role_name,
-            AssumeRolePolicyDocument=assume_role_policy_document_json
-        )
-
-        # Pause to make sure role is created
-        time.sleep(10)
-    except iam_client.exceptions.EntityAlreadyExistsException:
-        print("Role already exists -- deleting and creating it again")
-        policies = iam_client.list_role_policies(
-            RoleName=agentcore_gateway_role_name,
-            MaxItems=100
-        )
-        print("policies:", policies)
-        for policy_name in policies['PolicyNames']:
-            iam_client.delete_role_policy(
-                RoleName=agentcore_gateway_role_name,
-                PolicyName=policy_name
-            )
-        print(f"deleting {agentcore_gateway_role_name}")
-        iam_client.delete_role(
-            RoleName=agentcore_gateway_role_name
-        )
-        print(f"recreating {agentcore_gateway_role_name}")
-        agentcore_iam_role = iam_client.create_role(
-            RoleName=agentcore_gateway_role_name,
-            AssumeRolePolicyDocument=assume_role_policy_document_json
-        )
-
-    # Attach the AWSLambdaBasicExecutionRole policy
-    print(f"attaching role policy {agentcore_gateway_role_name}")
-    try:
-        iam_client.put_role_policy(
-            PolicyDocument=role_policy_document,
-            PolicyName="AgentCorePolicy",
-            RoleName=agentcore_gateway_role_name
-        )
-    except Exception as e:
-        print(e)
-
-    return agentcore_iam_role
-
 
-def create_agentcore_gateway_role_s3_smithy(gateway_name):
-    iam_client = boto3.client('iam')
+def create_agentcore_gateway_role_s3_smithy(gateway_name, reconcile=True, boto_session=None):
+    # Callers on worker threads pass their own session; the shared default session is not thread-safe
+    boto_session = boto_session or Session()
+    iam_client = boto_session.client('iam')
     agentcore_gateway_role_name = f'agentcore-{gateway_name}-role'
-    boto_session = Session()
     region = boto_session.region_name
-    account_id = boto3.client("sts").get_caller_identity()["Account"]
+    account_id = boto_session.client("sts").get_caller_identity()["Account"]
     role_policy = {
         "Version": "2012-10-17",
         "Statement": [{
@@ -485,64 +709,20 @@ def create_agentcore_gateway_role_s3_smithy(gateway_name):
         ]
     }
 
-    assume_role_policy_document_json = json.dumps(
-        assume_role_policy_document
+    return _create_or_reconcile_role(
+        iam_client, agentcore_gateway_role_name, assume_role_policy_document, {"AgentCorePolicy": role_policy}, reconcile
     )
 
-    role_policy_document = json.dumps(role_policy)
-    # Create IAM Role for the Lambda function
-    try:
-        agentcore_iam_role = iam_client.create_role(
-            RoleName=agentcore_gateway_role_name,
-            AssumeRolePolicyDocument=assume_role_policy_document_json
-        )
-
-        # Pause to make sure role is created
-        time.sleep(10)
-    except iam_client.exceptions.EntityAlreadyExistsException:
-        print("Role already exists -- deleting and creating it again")
-        policies = iam_client.list_role_policies(
-            RoleName=agentcore_gateway_role_name,
-            MaxItems=100
-        )
-        print("policies:", policies)
-        for policy_name in policies['PolicyNames']:
-            iam_client.delete_role_policy(
-                RoleName=agentcore_gateway_role_name,
-                PolicyName=policy_name
-            )
-        print(f"deleting {agentcore_gateway_role_name}")
-        iam_client.delete_role(
-            RoleName=agentcore_gateway_role_name
-        )
-        print(f"recreating {agentcore_gateway_role_name}")
-        agentcore_iam_role = iam_client.create_role(
-            RoleName=agentcore_gateway_role_name,
-            AssumeRolePolicyDocument=assume_role_policy_document_json
-        )
-
-    # Attach the AWSLambdaBasicExecutionRole policy
-    print(f"attaching role policy {agentcore_gateway_role_name}")
-    try:
-        iam_client.put_role_policy(
-            PolicyDocument=role_policy_document,
-            PolicyName="AgentCorePolicy",
-            RoleName=agentcore_gateway_role_name
-        )
-    except Exception as e:
-        print(e)
-
-    return agentcore_iam_role
-
-def create_gateway_lambda(lambda_function_code_path) -> dict[str, int]:
-    boto_session = Session()
+def create_gateway_lambda(lambda_function_code_path, boto_session=None) -> dict[str, int]:
+    # Callers on worker threads pass their own session; the shared default session is not thread-safe
+    boto_session = boto_session or Session()
     region = boto_session.region_name
 
     return_resp = {"lambda_function_arn": "Pending", "exit_code": 1}
     
     # Initialize Cognito client
-    lambda_client = boto3.client('lambda', region_name=region)
-    iam_client = boto3.client('iam', region_name=region)
+    lambda_client = boto_session.client('lambda', region_name=region)
+    iam_client = boto_session.client('iam', region_name=region)
 
     role_name = 'gateway_lambda_iamrole'
     role_arn = ''
@@ -582,7 +762,7 @@ def create_gateway_lambda(lambda_function_code_path) -> dict[str, int]:
         )
 
         print(f"Role '{role_name}' created successfully: {role_arn}")
-        time.sleep(100)
+        wait_for_role(iam_client, role_name)
     except botocore.exceptions.ClientError as error:
         if error.response['Error']['Code'] == "EntityAlreadyExists":
             response = iam_client.get_role(RoleName=role_name)
@@ -596,8 +776,8 @@ def create_gateway_lambda(lambda_function_code_path) -> dict[str, int]:
     if role_arn != "":
         print("Creating lambda function")
         # Create lambda function    
-        try:
-            lambda_response = lambda_client.create_function(
+        def create_function():
+            return lambda_client.create_function(
                 FunctionName=lambda_function_name,
                 Role=role_arn,
                 Runtime='python3.12',
@@ -607,6 +787,10 @@ def create_gateway_lambda(lambda_function_code_path) -> dict[str, int]:
                 PackageType='Zip'
             )
 
+        try:
+            # A freshly created role is rejected until IAM has propagated it to Lambda
+            lambda_response = retry_until_role_ready(create_function, f"IAM role {role_name} for Lambda")
+
             return_resp['lambda_function_arn'] = lambda_response['FunctionArn']
             return_resp['exit_code'] = 0
         except botocore.exceptions.ClientError as error:
@@ -619,32 +803,102 @@ def create_gateway_lambda(lambda_function_code_path) -> dict[str, int]:
                 error_message = error.response['Error']['Code'] + "-" + error.response['Error']['Message']
                 print(f"Error creating lambda function: {error_message}")
                 return_resp['lambda_function_arn'] = error_message
+        except TimeoutError as error:
+            print(f"Error creating lambda function: {error}")
+            return_resp['lambda_function_arn'] = str(error)
 
     return return_resp
 
-def delete_gateway(gateway_client,gatewayId): 
-    print("Deleting all targets for gateway", gatewayId)
-    list_response = gateway_client.list_gateway_targets(
-            gatewayIdentifier = gatewayId,
-            maxResults=100
-    )
-    for item in list_response['items']:
-        targetId = item["targetId"]
+def get_gateway_id(gateway_client, gateway_name):
+    """Return the id of the gateway with this name, or None if it does not exist."""
+    index_key = ("gateways", gateway_client.meta.region_name)
+    pages = _paginate(gateway_client.list_gateways, "items", "nextToken", "nextToken", maxResults=100)
+    return _lookup(index_key, pages, "name", "gatewayId", gateway_name)
+
+def _delete_target(gateway_client, gatewayId, targetId):
+    try:
         print("Deleting target ", targetId)
         gateway_client.delete_gateway_target(
             gatewayIdentifier = gatewayId,
             targetId = targetId
         )
-    print("Deleting gateway ", gatewayId)
-    gateway_client.delete_gateway(gatewayIdentifier = gatewayId)
+        return {"gatewayId": gatewayId, "targetId": targetId, "status": "deleted"}
+    except botocore.exceptions.ClientError as error:
+        if error.response['Error']['Code'] == "ResourceNotFoundException":
+            return {"gatewayId": gatewayId, "targetId": targetId, "status": "already_deleted"}
+        return {"gatewayId": gatewayId, "targetId": targetId, "status": "failed", "error": str(error)}
+
+def _list_targets(gateway_client, gatewayId):
+    return _paginate(gateway_client.list_gateway_targets, "items", "nextToken", "nextToken",
+                     gatewayIdentifier=gatewayId, maxResults=100)
+
+def delete_gateway(gateway_client, gatewayId, target_executor=None, max_workers=8, max_wait=300):
+    """Delete a gateway after deleting its targets concurrently.
+
+    Targets are deleted on a bounded pool (or target_executor, when shared across
+    gateways), then the target list is polled until it is empty before the
+    gateway itself is removed.
+
+    Returns:
+        List of per-resource outcomes: {"gatewayId", "targetId"?, "status", "error"?}
+    """
+    print("Deleting all targets for gateway", gatewayId)
+    target_ids = [item["targetId"] for item in _list_targets(gateway_client, gatewayId)]
+
+    if target_ids:
+        executor = target_executor or ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            outcomes = list(executor.map(lambda targetId: _delete_target(gateway_client, gatewayId, targetId), target_ids))
+        finally:
+            if target_executor is None:
+                executor.shutdown()
+    else:
+        outcomes = []
+
+    if any(outcome["status"] == "failed" for outcome in outcomes):
+        outcomes.append({"gatewayId": gatewayId, "status": "skipped", "error": "Some targets could not be deleted"})
+        return outcomes
 
-def delete_all_gateways(gateway_client):
     try:
-        list_response = gateway_client.list_gateways(
-            maxResults=100
-        )
-        for item in list_response['items']:
-            gatewayId= item["gatewayId"]
-            delete_gateway(gatewayId)
-    except Exception as e:
-        print(e)
+        # Target deletion is asynchronous; the gateway cannot be removed while any remain
+        wait_until(lambda: next(iter(_list_targets(gateway_client, gatewayId)), None) is None,
+                   f"Target deletion for gateway {gatewayId}", max_wait=max_wait, retry_on=())
+        print("Deleting gateway ", gatewayId)
+        gateway_client.delete_gateway(gatewayIdentifier = gatewayId)
+        _forget_id("gateways", gatewayId)
+        outcomes.append({"gatewayId": gatewayId, "status": "deleted"})
+    except botocore.exceptions.ClientError as error:
+        if error.response['Error']['Code'] == "ResourceNotFoundException":
+            _forget_id("gateways", gatewayId)
+            outcomes.append({"gatewayId": gatewayId, "status": "already_deleted"})
+        else:
+            outcomes.append({"gatewayId": gatewayId, "status": "failed", "error": str(error)})
+    except TimeoutError as error:
+        outcomes.append({"gatewayId": gatewayId, "status": "failed", "error": str(error)})
+    return outcomes
+
+def delete_all_gateways(gateway_client, max_workers=8, max_wait=300):
+    """Delete every gateway in the region, with their targets, and report per-resource outcomes."""
+    gateway_ids = [item["gatewayId"] for item in _paginate(
+        gateway_client.list_gateways, "items", "nextToken", "nextToken", maxResults=100
+    )]
+    print(f"Deleting {len(gateway_ids)} gateway(s)")
+    outcomes = []
+    # Separate pools: gateway workers block on their targets, so sharing one pool could deadlock
+    with ThreadPoolExecutor(max_workers=max_workers) as target_executor, \
+            ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(gateway_ids)))) as gateway_executor:
+        futures = {
+            gateway_executor.submit(delete_gateway, gateway_client, gatewayId, target_executor, max_workers, max_wait): gatewayId
+            for gatewayId in gateway_ids
+        }
+        for future in as_completed(futures):
+            try:
+                outcomes.extend(future.result())
+            except Exception as e:
+                outcomes.append({"gatewayId": futures[future], "status": "failed", "error": str(e)})
+
+    failed = [outcome for outcome in outcomes if outcome["status"] in ("failed", "skipped")]
+    print(f"Teardown finished: {len(outcomes) - len(failed)} resource(s) removed, {len(failed)} failed")
+    for outcome in failed:
+        print(outcome)
+    return outcomes
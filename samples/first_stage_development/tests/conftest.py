@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The notebooks and provision_environment.py import these helpers by bare name from this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
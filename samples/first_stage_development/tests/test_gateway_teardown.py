@@ -0,0 +1,90 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("requests")
+
+import techresidential_utils as utils
+from botocore.exceptions import ClientError
+
+
+@pytest.fixture(autouse=True)
+def no_waiting(monkeypatch):
+    monkeypatch.setattr(utils.time, "sleep", lambda seconds: None)
+    utils.reset_resource_index()
+    yield
+    utils.reset_resource_index()
+
+
+def _error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "Delete")
+
+
+class FakeGatewayClient:
+    """Gateways and targets in memory; a deleted target stays listed for one more list call."""
+
+    def __init__(self, gateways, fail_targets=()):
+        self.meta = SimpleNamespace(region_name="us-east-1")
+        self.gateways = {gateway_id: set(targets) for gateway_id, targets in gateways.items()}
+        self.deleting = {}
+        self.fail_targets = set(fail_targets)
+        self.deleted_gateways = []
+        self.lock = threading.Lock()
+
+    def list_gateways(self, maxResults, nextToken=None):
+        return {"items": [{"gatewayId": gateway_id, "name": gateway_id} for gateway_id in self.gateways]}
+
+    def list_gateway_targets(self, gatewayIdentifier, maxResults, nextToken=None):
+        with self.lock:
+            pending = self.deleting.pop(gatewayIdentifier, set())
+            listed = self.gateways[gatewayIdentifier] | pending
+        return {"items": [{"targetId": target_id} for target_id in sorted(listed)]}
+
+    def delete_gateway_target(self, gatewayIdentifier, targetId):
+        if targetId in self.fail_targets:
+            raise _error("ConflictException")
+        with self.lock:
+            if targetId not in self.gateways[gatewayIdentifier]:
+                raise _error("ResourceNotFoundException")
+            self.gateways[gatewayIdentifier].discard(targetId)
+            self.deleting.setdefault(gatewayIdentifier, set()).add(targetId)
+
+    def delete_gateway(self, gatewayIdentifier):
+        with self.lock:
+            if self.gateways[gatewayIdentifier] or gatewayIdentifier in self.deleting:
+                raise _error("ConflictException")
+            del self.gateways[gatewayIdentifier]
+            self.deleted_gateways.append(gatewayIdentifier)
+
+
+def test_gateway_is_deleted_after_its_targets_are_gone():
+    client = FakeGatewayClient({"gw-1": {"t1", "t2", "t3"}})
+    outcomes = utils.delete_gateway(client, "gw-1")
+    assert sorted(outcome["targetId"] for outcome in outcomes if "targetId" in outcome) == ["t1", "t2", "t3"]
+    assert outcomes[-1] == {"gatewayId": "gw-1", "status": "deleted"}
+    assert client.deleted_gateways == ["gw-1"]
+
+
+def test_failed_target_keeps_the_gateway():
+    client = FakeGatewayClient({"gw-1": {"t1", "t2"}}, fail_targets={"t2"})
+    outcomes = utils.delete_gateway(client, "gw-1")
+    statuses = {outcome.get("targetId", "gateway"): outcome["status"] for outcome in outcomes}
+    assert statuses == {"t1": "deleted", "t2": "failed", "gateway": "skipped"}
+    assert "gw-1" in client.gateways
+
+
+def test_teardown_reports_every_gateway_and_target():
+    client = FakeGatewayClient({"gw-1": {"t1"}, "gw-2": {"t2", "t3"}, "gw-3": set()}, fail_targets={"t3"})
+    outcomes = utils.delete_all_gateways(client, max_workers=2)
+    gateway_statuses = {outcome["gatewayId"]: outcome["status"] for outcome in outcomes if "targetId" not in outcome}
+    assert gateway_statuses == {"gw-1": "deleted", "gw-2": "skipped", "gw-3": "deleted"}
+    assert sorted(client.deleted_gateways) == ["gw-1", "gw-3"]
+
+
+def test_deleted_gateway_is_forgotten_by_the_lookup_index():
+    client = FakeGatewayClient({"gw-1": set()})
+    assert utils.get_gateway_id(client, "gw-1") == "gw-1"
+    utils.delete_gateway(client, "gw-1")
+    assert utils.get_gateway_id(client, "gw-1") is None
@@ -0,0 +1,121 @@
+import json
+from urllib.parse import quote
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("requests")
+
+import techresidential_utils as utils
+
+TRUST = {
+    "Version": "2012-10-17",
+    "Statement": [{
+        "Effect": "Allow",
+        "Principal": {"Service": "bedrock-agentcore.amazonaws.com"},
+        "Action": "sts:AssumeRole",
+    }],
+}
+POLICY = {
+    "Version": "2012-10-17",
+    "Statement": [{
+        "Effect": "Allow",
+        "Action": ["s3:GetObject", "s3:PutObject"],
+        "Resource": ["arn:aws:s3:::bucket/*", "arn:aws:s3:::bucket"],
+    }],
+}
+
+
+def test_formatting_differences_compare_equal():
+    reordered = {
+        "Statement": {
+            "Resource": ["arn:aws:s3:::bucket", "arn:aws:s3:::bucket/*"],
+            "Action": ["s3:PutObject", "s3:GetObject"],
+            "Effect": "Allow",
+        },
+        "Version": "2012-10-17",
+    }
+    assert utils._normalize_policy(reordered) == utils._normalize_policy(POLICY)
+    # get_role returns the trust policy URL-encoded, list APIs may return it as a string
+    assert utils._normalize_policy(quote(json.dumps(TRUST))) == utils._normalize_policy(TRUST)
+    single = {**TRUST, "Statement": [{**TRUST["Statement"][0], "Action": ["sts:AssumeRole"]}]}
+    assert utils._normalize_policy(single) == utils._normalize_policy(TRUST)
+
+
+def test_normalizing_is_idempotent():
+    once = utils._normalize_policy(POLICY)
+    assert utils._normalize_policy(once) == once
+
+
+def test_real_changes_do_not_compare_equal():
+    widened = {**POLICY, "Statement": [{**POLICY["Statement"][0], "Action": ["s3:*"]}]}
+    assert utils._normalize_policy(widened) != utils._normalize_policy(POLICY)
+
+
+def test_only_changed_missing_and_stale_policies_are_touched():
+    existing = {"s3": json.dumps(POLICY), "old": json.dumps(POLICY), "logs": json.dumps(POLICY)}
+    desired = {"s3": POLICY, "logs": {**POLICY, "Statement": []}, "new": POLICY}
+    assert utils._policy_changes(existing, desired) == (["logs", "new"], ["old"])
+    assert utils._policy_changes({"s3": quote(json.dumps(POLICY))}, {"s3": POLICY}) == ([], [])
+
+
+class FakeIAM:
+    """IAM stand-in holding one existing role; records every write."""
+
+    class exceptions:
+        class EntityAlreadyExistsException(Exception):
+            pass
+
+    class Paginator:
+        def __init__(self, names):
+            self.names = names
+
+        def paginate(self, RoleName):
+            return self
+
+        def search(self, expression):
+            return iter(self.names)
+
+    def __init__(self, trust, policies):
+        self.trust = trust
+        self.policies = dict(policies)
+        self.writes = []
+
+    def create_role(self, RoleName, AssumeRolePolicyDocument):
+        raise self.exceptions.EntityAlreadyExistsException(RoleName)
+
+    def get_role(self, RoleName):
+        return {"Role": {"RoleName": RoleName, "AssumeRolePolicyDocument": quote(json.dumps(self.trust))}}
+
+    def get_paginator(self, name):
+        return self.Paginator(list(self.policies))
+
+    def get_role_policy(self, RoleName, PolicyName):
+        return {"PolicyDocument": self.policies[PolicyName]}
+
+    def update_assume_role_policy(self, RoleName, PolicyDocument):
+        self.writes.append(("update_assume_role_policy",))
+
+    def put_role_policy(self, PolicyDocument, PolicyName, RoleName):
+        self.writes.append(("put_role_policy", PolicyName))
+
+    def delete_role_policy(self, RoleName, PolicyName):
+        self.writes.append(("delete_role_policy", PolicyName))
+
+
+def test_unchanged_role_is_not_written():
+    iam = FakeIAM(TRUST, {"s3": POLICY})
+    role = utils._create_or_reconcile_role(iam, "role", TRUST, {"s3": POLICY})
+    assert role["Role"]["RoleName"] == "role"
+    assert iam.writes == []
+
+
+def test_drifted_role_gets_only_the_differences():
+    drifted_trust = {**TRUST, "Statement": [{**TRUST["Statement"][0], "Principal": {"Service": "lambda.amazonaws.com"}}]}
+    iam = FakeIAM(drifted_trust, {"s3": {**POLICY, "Statement": []}, "manual": POLICY})
+    utils._create_or_reconcile_role(iam, "role", TRUST, {"s3": POLICY})
+    assert iam.writes == [
+        ("update_assume_role_policy",),
+        ("put_role_policy", "s3"),
+        ("delete_role_policy", "manual"),
+    ]
@@ -0,0 +1,93 @@
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("requests")
+
+from provision_environment import Step, environment_steps, run_steps
+
+
+def _recorder(order, name, result=None, error=None):
+    def run(deps):
+        order.append((name, dict(deps)))
+        if error:
+            raise error
+        return result if result is not None else name
+
+    return run
+
+
+def test_steps_run_after_their_dependencies_and_receive_their_results():
+    order = []
+    steps = [
+        Step("gateway", _recorder(order, "gateway"), ["role", "pool"]),
+        Step("role", _recorder(order, "role", "arn:role")),
+        Step("pool", _recorder(order, "pool", "pool-1")),
+    ]
+    results = run_steps(steps)
+    names = [name for name, _ in order]
+    assert names.index("gateway") > names.index("role") and names.index("gateway") > names.index("pool")
+    assert dict(order)["gateway"] == {"role": "arn:role", "pool": "pool-1"}
+    assert results == {"gateway": "gateway", "role": "arn:role", "pool": "pool-1"}
+
+
+def test_independent_steps_run_concurrently():
+    both_started = threading.Barrier(2, timeout=5)
+
+    def run(deps):
+        # Deadlocks (and times out) unless the other branch is running at the same time
+        both_started.wait()
+        return "ok"
+
+    assert run_steps([Step("role", run), Step("lambda", run)], max_workers=2) == {"role": "ok", "lambda": "ok"}
+
+
+def test_failure_stops_dependents_and_resume_skips_finished_steps(tmp_path):
+    state_path = str(tmp_path / "state.json")
+    order = []
+    steps = [
+        Step("pool", _recorder(order, "pool")),
+        Step("client", _recorder(order, "client"), ["pool"], persist=False),
+        Step("gateway", _recorder(order, "gateway", error=RuntimeError("role not assumable")), ["client"]),
+        Step("targets", _recorder(order, "targets"), ["gateway"]),
+    ]
+    with pytest.raises(RuntimeError, match="failed at: gateway"):
+        run_steps(steps, state_path)
+    assert "targets" not in [name for name, _ in order]
+    with open(state_path) as f:
+        state = json.load(f)
+    assert state["steps"]["pool"] == {"status": "done", "seconds": state["steps"]["pool"]["seconds"], "result": "pool"}
+    assert "result" not in state["steps"]["client"]
+    assert state["steps"]["gateway"]["status"] == "failed"
+
+    order.clear()
+    steps[2] = Step("gateway", _recorder(order, "gateway"), ["client"])
+    run_steps(steps, state_path)
+    # The pool is taken from the manifest; the client holds a secret and is looked up again
+    assert [name for name, _ in order] == ["client", "gateway", "targets"]
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="unknown step"):
+        run_steps([Step("gateway", lambda deps: None, ["role"])])
+
+
+def test_dependency_cycle_is_reported():
+    steps = [Step("a", lambda deps: 1, ["b"]), Step("b", lambda deps: 2, ["a"])]
+    with pytest.raises(RuntimeError, match="dependency cycle"):
+        run_steps(steps)
+
+
+def test_environment_graph_runs_iam_and_lambda_alongside_cognito():
+    config = {
+        "user_pool_name": "pool", "resource_server_id": "rs", "resource_server_name": "rs",
+        "client_name": "client", "gateway_name": "gateway", "agent_name": "agent",
+        "lambda_code_path": "lambda.zip",
+    }
+    graph = {step.name: set(step.depends_on) for step in environment_steps(config, "us-east-1")}
+    for independent in ("user_pool", "gateway_role", "agentcore_role", "gateway_lambda"):
+        assert graph[independent] == set()
+    assert graph["gateway"] == {"user_pool", "m2m_client", "gateway_role"}
+    assert graph["gateway_targets"] == {"gateway", "gateway_lambda"}
@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("requests")
+
+import techresidential_utils as utils
+from botocore.exceptions import ClientError
+
+
+@pytest.fixture(autouse=True)
+def empty_index():
+    utils.reset_resource_index()
+    yield
+    utils.reset_resource_index()
+
+
+def _list_pools(pages, calls):
+    """Paged list_user_pools stand-in that records which pages were fetched."""
+    def list_user_pools(MaxResults, NextToken=None):
+        page = int(NextToken or 0)
+        calls.append(page)
+        response = {"UserPools": pages[page]}
+        if page + 1 < len(pages):
+            response["NextToken"] = str(page + 1)
+        return response
+
+    return list_user_pools
+
+
+POOLS = [
+    [{"Name": "pool-a", "Id": "id-a"}],
+    [{"Name": "pool-b", "Id": "id-b"}],
+    [{"Name": "MCPServerPool", "Id": "id-mcp"}],
+]
+
+
+def _lookup_pool(list_user_pools, name):
+    pages = utils._paginate(list_user_pools, "UserPools", "NextToken", "NextToken", MaxResults=60)
+    return utils._lookup(("user_pools", "us-east-1"), pages, "Name", "Id", name)
+
+
+def test_lookup_stops_at_the_first_match_and_resumes_later():
+    calls = []
+    list_user_pools = _list_pools(POOLS, calls)
+    assert _lookup_pool(list_user_pools, "pool-b") == "id-b"
+    assert calls == [0, 1]
+    # Already indexed: no call at all
+    assert _lookup_pool(list_user_pools, "pool-a") == "id-a"
+    assert calls == [0, 1]
+    # Continues from page 2 instead of listing again from page 0
+    assert _lookup_pool(list_user_pools, "MCPServerPool") == "id-mcp"
+    assert calls == [0, 1, 2]
+
+
+class ThrottledOnce:
+    """list_user_pools that throttles the second page once, then behaves."""
+
+    def __init__(self):
+        self.calls = []
+        self.throttled = False
+
+    def __call__(self, MaxResults, NextToken=None):
+        page = int(NextToken or 0)
+        self.calls.append(page)
+        if page == 1 and not self.throttled:
+            self.throttled = True
+            raise ClientError({"Error": {"Code": "Throttling", "Message": "Rate exceeded"}}, "ListUserPools")
+        response = {"UserPools": POOLS[page]}
+        if page + 1 < len(POOLS):
+            response["NextToken"] = str(page + 1)
+        return response
+
+
+def test_a_failed_page_call_is_retried_not_reported_as_missing():
+    list_user_pools = ThrottledOnce()
+    with pytest.raises(ClientError):
+        _lookup_pool(list_user_pools, "MCPServerPool")
+    # The retry lists again rather than returning None and creating a duplicate pool
+    assert _lookup_pool(list_user_pools, "MCPServerPool") == "id-mcp"
+    assert list_user_pools.calls == [0, 1, 0, 1, 2]
+
+
+def test_missing_name_returns_none_once_listing_is_complete():
+    calls = []
+    list_user_pools = _list_pools(POOLS, calls)
+    assert _lookup_pool(list_user_pools, "absent") is None
+    utils._remember(("user_pools", "us-east-1"), "absent", "id-new")
+    assert _lookup_pool(list_user_pools, "absent") == "id-new"
+    assert calls == [0, 1, 2]
+
+
+def test_a_slow_listing_does_not_block_other_resource_types():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_list_gateways(maxResults, nextToken=None):
+        started.set()
+        release.wait(5)
+        return {"items": [{"name": "gw", "gatewayId": "gw-1"}]}
+
+    pages = utils._paginate(slow_list_gateways, "items", "nextToken", "nextToken", maxResults=100)
+    worker = threading.Thread(target=utils._lookup, args=(("gateways", "us-east-1"), pages, "name", "gatewayId", "gw"))
+    worker.start()
+    try:
+        assert started.wait(5)
+        # The gateway page fetch is still in flight; a user pool lookup must not wait for it
+        assert _lookup_pool(_list_pools(POOLS, []), "pool-a") == "id-a"
+    finally:
+        release.set()
+        worker.join(5)
@@ -0,0 +1,105 @@
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("requests")
+
+import techresidential_utils as utils
+from botocore.exceptions import ClientError
+
+
+class Clock:
+    """Stands in for time.monotonic and time.sleep so waits take no real time."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(utils.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(utils.time, "sleep", clock.sleep)
+    # Take the top of each jitter range so the backoff is deterministic
+    monkeypatch.setattr(utils.random, "uniform", lambda low, high: high)
+    return clock
+
+
+def _ready_after(attempts, result="ready"):
+    calls = []
+
+    def check():
+        calls.append(1)
+        if len(calls) <= attempts:
+            raise utils.RoleNotReady("not yet")
+        return result
+
+    return check, calls
+
+
+def test_returns_as_soon_as_the_check_succeeds(clock):
+    check, calls = _ready_after(3)
+    assert utils.wait_until(check, "role") == "ready"
+    assert len(calls) == 4
+    assert clock.sleeps == [1, 2, 4]
+
+
+def test_backoff_is_capped(clock):
+    check, _ = _ready_after(6)
+    utils.wait_until(check, "role", max_wait=1000, max_delay=5)
+    assert clock.sleeps == [1, 2, 4, 5, 5, 5]
+
+
+def test_falsy_result_counts_as_not_ready(clock):
+    results = iter([None, False, {"Role": {}}])
+    assert utils.wait_until(lambda: next(results), "role") == {"Role": {}}
+    assert len(clock.sleeps) == 2
+
+
+def test_times_out_with_the_last_error(clock):
+    check, _ = _ready_after(100)
+    with pytest.raises(TimeoutError, match="role not ready after 10s: not yet"):
+        utils.wait_until(check, "role", max_wait=10)
+    # The last sleep is cut short at the deadline
+    assert sum(clock.sleeps) == pytest.approx(10)
+
+
+def test_other_errors_propagate_without_waiting(clock):
+    def check():
+        raise KeyError("broken")
+
+    with pytest.raises(KeyError):
+        utils.wait_until(check, "role")
+    assert not clock.sleeps
+
+
+def _client_error(code, message):
+    return ClientError({"Error": {"Code": code, "Message": message}}, "CreateFunction")
+
+
+def test_dependent_call_is_retried_until_the_role_propagates(clock):
+    errors = [_client_error("InvalidParameterValueException", "The role defined for the function cannot be assumed by Lambda.")] * 2
+
+    def create():
+        if errors:
+            raise errors.pop()
+        return {"FunctionArn": "arn"}
+
+    assert utils.retry_until_role_ready(create, "lambda") == {"FunctionArn": "arn"}
+    assert len(clock.sleeps) == 2
+
+
+def test_unrelated_client_errors_are_not_retried(clock):
+    def create():
+        raise _client_error("ValidationException", "Runtime python2.7 is not supported")
+
+    with pytest.raises(ClientError):
+        utils.retry_until_role_ready(create, "lambda")
+    assert not clock.sleeps
@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+
+pytest.importorskip("boto3")
+requests = pytest.importorskip("requests")
+
+import techresidential_utils as utils
+
+POOL = ("us-east-1_abc", "client", "secret", "gateway/read", "us-east-1")
+
+
+class FakeResponse:
+    def __init__(self, token):
+        self.token = token
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return dict(self.token)
+
+
+class FakeSession:
+    """Token endpoint stand-in; each post returns the next numbered token."""
+
+    def __init__(self):
+        self.posts = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.error = None
+
+    def post(self, url, headers, data, timeout):
+        self.gate.wait(5)
+        self.posts.append((url, data))
+        if self.error:
+            raise self.error
+        return FakeResponse({"access_token": f"token-{len(self.posts)}", "expires_in": 3600})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(utils.time, "time", lambda: now[0])
+    return now
+
+
+def _wait_for_refresh(provider):
+    key = POOL[:2] + POOL[3:]
+    lock = provider._key_lock(key)
+    assert lock.acquire(timeout=5)
+    lock.release()
+
+
+def test_token_is_reused_until_the_refresh_margin(clock):
+    session = FakeSession()
+    provider = utils.TokenProvider(refresh_margin=300, session=session)
+    first = provider.get(*POOL)
+    clock[0] += 3000
+    second = provider.get(*POOL)
+    assert first["access_token"] == second["access_token"] == "token-1"
+    assert second["expires_in"] == 600
+    url, data = session.posts[0]
+    assert url == "https://us-east-1abc.auth.us-east-1.amazoncognito.com/oauth2/token"
+    assert data["scope"] == "gateway/read"
+
+
+def test_token_inside_the_margin_is_served_while_one_refresh_runs(clock):
+    session = FakeSession()
+    provider = utils.TokenProvider(refresh_margin=300, session=session)
+    provider.get(*POOL)
+    clock[0] += 3400
+    session.gate.clear()
+    # Callers inside the margin keep getting the cached token and start at most one refresh
+    assert [provider.get(*POOL)["access_token"] for _ in range(3)] == ["token-1"] * 3
+    session.gate.set()
+    _wait_for_refresh(provider)
+    assert len(session.posts) == 2
+    assert provider.get(*POOL)["access_token"] == "token-2"
+
+
+def test_expired_token_is_refreshed_once_for_concurrent_callers(clock):
+    session = FakeSession()
+    provider = utils.TokenProvider(session=session)
+    provider.get(*POOL)
+    clock[0] += 4000
+    session.gate.clear()
+    tokens = []
+    callers = [threading.Thread(target=lambda: tokens.append(provider.get(*POOL)["access_token"])) for _ in range(5)]
+    for caller in callers:
+        caller.start()
+    session.gate.set()
+    for caller in callers:
+        caller.join(5)
+    assert tokens == ["token-2"] * 5
+    assert len(session.posts) == 2
+
+
+def test_tokens_are_cached_per_scope_and_can_be_invalidated(clock):
+    session = FakeSession()
+    provider = utils.TokenProvider(session=session)
+    provider.get(*POOL)
+    other_scope = POOL[:3] + ("gateway/write",) + POOL[4:]
+    assert provider.get(*other_scope)["access_token"] == "token-2"
+    provider.invalidate(*(POOL[:2] + POOL[3:]))
+    assert provider.get(*POOL)["access_token"] == "token-3"
+
+
+def test_failed_background_refresh_keeps_the_cached_token(clock):
+    session = FakeSession()
+    provider = utils.TokenProvider(refresh_margin=300, session=session)
+    provider.get(*POOL)
+    clock[0] += 3400
+    session.error = requests.ConnectionError("reset")
+    assert provider.get(*POOL)["access_token"] == "token-1"
+    _wait_for_refresh(provider)
+    assert provider.get(*POOL)["access_token"] == "token-1"
+
+
+def test_get_token_reports_request_errors(monkeypatch, clock):
+    session = FakeSession()
+    session.error = requests.ConnectionError("reset")
+    monkeypatch.setattr(utils, "_token_provider", utils.TokenProvider(session=session))
+    assert utils.get_token(*POOL) == {"error": "reset"}